@@ -0,0 +1,171 @@
+"""
+Benchmark + check: cold start of each Lambda package.
+
+Every scenario runs in a fresh interpreter under `python -X importtime`
+(no warm modules, like a new Lambda container): import lambda_function, then
+handle one representative event. Reports the median import and first-request
+time over --runs processes, the heaviest imports, and which heavy SDKs
+(boto3, groq, numpy, requests) were loaded by the end. Exits non-zero if a
+path loads an SDK it does not need (e.g. groq on the keyword fallback,
+numpy for a donut answer, boto3 in in-process mode).
+
+The GraphQL stages talk to the mock server; GROQ_API_KEY is removed, so the
+LLM paths take their fallbacks.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from mock_server import LAMBDA_ROOT, load_mock_graphql, serve_mock_graphql
+
+HEAVY_MODULES = ["boto3", "groq", "numpy", "requests"]
+RESULT_MARKER = "COLD_START_RESULT "
+
+CHILD = """
+import json, os, sys, time
+package_dir, event_path = sys.argv[1], sys.argv[2]
+sys.path.insert(0, package_dir)
+start = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+status = None
+if event_path:
+    with open(event_path, encoding="utf-8") as handle:
+        event = json.load(handle)
+    status = lambda_function.lambda_handler(event, None).get("statusCode")
+done = time.perf_counter()
+print(%r + json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (done - imported) * 1000,
+    "status": status,
+    # lazy_import placeholders are not in sys.modules until first use
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (RESULT_MARKER, HEAVY_MODULES)
+
+
+def scenarios(mock):
+    histogram = mock.HISTOGRAM_DATA
+    donut = mock.DONUT_DATA
+    return [
+        {"name": "orchestrator import (remote mode)", "package": "orchestrator", "event": None,
+         "absent": ["boto3", "groq", "numpy", "requests"]},
+        {"name": "orchestrator question (inprocess)", "package": "orchestrator",
+         "env": {"PIPELINE_MODE": "inprocess"},
+         "event": {"body": json.dumps({"question": "What is my total demand?"})},
+         "absent": ["boto3", "groq"]},
+        {"name": "intent local classifier", "package": "intent-classifier",
+         "event": {"body": json.dumps({"question": "What is my total demand?"})},
+         "absent": ["boto3", "groq", "numpy", "requests"]},
+        {"name": "intent keyword fallback", "package": "intent-classifier",
+         "env": {"LOCAL_CLASSIFIER_THRESHOLD": "1.01"},
+         "event": {"body": json.dumps({"question": "What is my total demand?"})},
+         "absent": ["boto3", "groq", "numpy", "requests"]},
+        {"name": "graphql donut query", "package": "graphql-client",
+         "event": {"body": json.dumps({"endpoint": "demandByFulfillmentDonut"})},
+         "absent": ["boto3", "groq", "numpy"]},
+        {"name": "response donut answer", "package": "response-generator",
+         "event": {"body": json.dumps({"question": "What is my total demand?", "endpoint": "demandByFulfillmentDonut",
+                                       "extraction_type": "total", "graphql_data": donut})},
+         "absent": ["boto3", "groq", "numpy", "requests"]},
+        {"name": "response histogram answer", "package": "response-generator",
+         "event": {"body": json.dumps({"question": "How many months do I have firm demand?",
+                                       "endpoint": "demandByFulfillmentHistogram",
+                                       "extraction_type": "monthly_count", "graphql_data": histogram})},
+         "absent": ["boto3", "groq", "requests"], "present": ["numpy"]},
+    ]
+
+
+def parse_importtime(stderr):
+    """(module, cumulative ms) for every import after interpreter startup."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.strip() == "site" and not name.startswith("  "):
+            # site (and the .pth imports under it) is interpreter startup
+            imports = []
+        elif cumulative.strip().isdigit():
+            imports.append((name.strip(), int(cumulative) / 1000))
+    return imports
+
+
+def run_scenario(scenario, env, event_path, runs):
+    package_dir = os.path.join(LAMBDA_ROOT, scenario["package"])
+    results, imports = [], {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", CHILD, package_dir, event_path or ""],
+            cwd=package_dir, env=dict(env, **scenario.get("env", {})), capture_output=True, text=True, timeout=120,
+        )
+        lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+        if completed.returncode or not lines:
+            raise RuntimeError(f"{scenario['name']} failed:\n{completed.stderr[-2000:]}")
+        results.append(json.loads(lines[-1][len(RESULT_MARKER):]))
+        for name, cumulative_ms in parse_importtime(completed.stderr):
+            if "." not in name and name != "lambda_function":
+                imports.setdefault(name, []).append(cumulative_ms)
+    return {
+        "import_ms": statistics.median(result["import_ms"] for result in results),
+        "first_request_ms": statistics.median(result["first_request_ms"] for result in results),
+        "status": results[-1]["status"],
+        "loaded": results[-1]["loaded"],
+        "heaviest": sorted(((name, statistics.median(ms)) for name, ms in imports.items()),
+                           key=lambda item: -item[1])[:4],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per scenario")
+    args = parser.parse_args()
+
+    env = {key: value for key, value in os.environ.items() if key != "GROQ_API_KEY"}
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    problems = []
+    rows = []
+
+    with serve_mock_graphql() as server, tempfile.TemporaryDirectory() as tmp:
+        env["GRAPHQL_URL"] = server.url
+        for index, scenario in enumerate(scenarios(load_mock_graphql())):
+            event_path = None
+            if scenario["event"] is not None:
+                event_path = os.path.join(tmp, f"event_{index}.json")
+                with open(event_path, "w", encoding="utf-8") as handle:
+                    json.dump(scenario["event"], handle)
+            result = run_scenario(scenario, env, event_path, args.runs)
+            rows.append((scenario, result))
+            if event_path and result["status"] != 200:
+                problems.append(f"{scenario['name']}: status {result['status']}")
+            for name in scenario.get("absent", []):
+                if name in result["loaded"]:
+                    problems.append(f"{scenario['name']}: loaded {name}")
+            for name in scenario.get("present", []):
+                if name not in result["loaded"]:
+                    problems.append(f"{scenario['name']}: expected {name} to be loaded")
+
+    print(f"median of {args.runs} fresh processes per scenario (ms)")
+    print(f"{'scenario':<36} {'import':>8} {'request':>8} {'total':>8}  {'SDKs loaded':<22} heaviest imports")
+    for scenario, result in rows:
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest"])
+        total = result["import_ms"] + result["first_request_ms"]
+        print(f"{scenario['name']:<36} {result['import_ms']:>8.1f} {result['first_request_ms']:>8.1f} {total:>8.1f}  "
+              f"{','.join(result['loaded']) or '-':<22} {heaviest}")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("\nNo path loads an SDK it does not use")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark + check: token-budgeted histogram context vs the full breakdown.
+
+Builds the answer prompt (build_generation_messages) for histograms of
+growing length, monthly and weekly, once with an unlimited budget (the full
+period-by-period breakdown) and once with the configured budget, and reports
+the estimated prompt tokens and the detail level chosen. Exits non-zero if a
+budgeted context exceeds the budget (other than the summary-only floor),
+drops the overall category totals, or changes the context of a range that
+already fits.
+
+Usage:
+    python benchmarks/bench_context_budget.py --budget 800
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from mock_server import LAMBDA_ROOT
+
+CATEGORIES = ["Firm Order", "Overdue", "Forecasted"]
+ENDPOINT = "demandByFulfillmentHistogram"
+
+
+def load_response_generator():
+    package_dir = os.path.join(LAMBDA_ROOT, "response-generator")
+    sys.path.insert(0, package_dir)
+    spec = importlib.util.spec_from_file_location(
+        "factorytwin_response_generator", os.path.join(package_dir, "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def histogram(periods, step, seed=11):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    result = []
+    for i in range(periods):
+        if step == "month":
+            when = datetime(start.year + (start.month - 1 + i) // 12, (start.month - 1 + i) % 12 + 1, 1)
+        else:
+            when = start + timedelta(weeks=i)
+        result.append({
+            "startDate": when.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "stackDataList": [
+                {"name": name, "quantity": rng.choice([0, rng.randint(100, 90000)]), "value": round(rng.uniform(0, 1e6), 2)}
+                for name in CATEGORIES
+            ],
+        })
+    return result
+
+
+def prompt(module, frame, budget):
+    module.HISTOGRAM_CONTEXT_TOKEN_BUDGET = budget
+    start = time.perf_counter()
+    messages = module.build_generation_messages(
+        "How has demand changed over this period?", ENDPOINT, "average", frame,
+        module.extract_value_from_histogram(frame, "average"),
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return messages, module.estimate_prompt_tokens(messages), elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=800)
+    args = parser.parse_args()
+
+    module = load_response_generator()
+    cases = [(19, "month"), (36, "month"), (60, "month"), (120, "month"), (156, "week"), (260, "week"), (520, "week")]
+    failures = []
+
+    print(f"context budget {args.budget} tokens (estimated)")
+    print(f"{'range':<14} {'full tokens':>12} {'budgeted':>10} {'detail':>10} {'build ms':>9}")
+    for count, step in cases:
+        frame = module.HistogramFrame.from_payload(histogram(count, step))
+        _, full_tokens, _ = prompt(module, frame, 10 ** 9)
+        messages, budgeted_tokens, elapsed_ms = prompt(module, frame, args.budget)
+        context, detail = module.build_budgeted_histogram_context(frame, args.budget)
+        print(f"{count:>4} {step + 's':<9} {full_tokens:>12,} {budgeted_tokens:>10,} {detail:>10} {elapsed_ms:>9.2f}")
+
+        label = f"{count} {step}s"
+        if detail != "summary" and module.estimate_tokens(context) > args.budget:
+            failures.append(f"{label}: {detail} context over budget")
+        for name, total in frame.category_totals().items():
+            if f"  - {name}: {module.format_quantity(total)}" not in context:
+                failures.append(f"{label}: missing total for {name}")
+        if context not in messages[0]["content"]:
+            failures.append(f"{label}: budgeted context not used in the prompt")
+        full_context = module.build_histogram_context(frame)
+        if module.estimate_tokens(full_context) <= args.budget and context != full_context:
+            failures.append(f"{label}: context changed although the full breakdown fits")
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("Budgeted contexts fit the budget and keep the overall totals")
+
+
+if __name__ == "__main__":
+    main()
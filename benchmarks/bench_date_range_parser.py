@@ -0,0 +1,98 @@
+"""
+Benchmark + check: deterministic date-range extraction in the intent classifier.
+
+Resolves a labelled list of date phrases (with "today" pinned to
+2026-03-10) and reports the time per question. Checks every range, and that
+numbers and words that only look like dates ("above 2050 units", "march may
+be overdue") do not become one, that "next 0 months" leaves the rest of the
+question to the other patterns, and that the normalizer keeps days of the
+month ("December 25, 2025") apart from two-digit years ("Dec 25"). Exits
+non-zero on any mismatch.
+
+Usage:
+    python benchmarks/bench_date_range_parser.py --iterations 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+from mock_server import LAMBDA_ROOT
+
+TODAY = date(2026, 3, 10)
+
+# (question, (from month, until month) as "YYYY-MM", or None)
+LABELLED = [
+    ("What is projected demand from Dec 25 to May 26?", ("2025-12", "2026-05")),
+    ("Show me demand from January 2025 to June 2025", ("2025-01", "2025-06")),
+    ("Demand between March and May 2026", ("2026-03", "2026-05")),
+    ("Demand Dec 2025 - May 2026", ("2025-12", "2026-05")),
+    ("Demand from may to july", ("2026-05", "2026-07")),
+    ("What was demand in March 2025?", ("2025-03", "2025-03")),
+    ("Which orders in march may be overdue?", ("2026-03", "2026-03")),
+    ("What is my total demand for 2026?", ("2026-01", "2026-12")),
+    ("Show demand above 2050 units", None),
+    ("Which months had more than 2030 orders?", None),
+    ("What may be overdue?", None),
+    ("Demand in Q3 2025", ("2025-07", "2025-09")),
+    ("Demand in 2025 Q3", ("2025-07", "2025-09")),
+    ("Demand in the third quarter of 2025", ("2025-07", "2025-09")),
+    ("Demand for the next 6 months", ("2026-03", "2026-08")),
+    ("Demand last month", ("2026-02", "2026-02")),
+    ("Demand year to date", ("2026-01", "2026-03")),
+    ("Demand since November 2025", ("2025-11", "2026-03")),
+    ("What is my total demand?", None),
+    ("Demand for the next 0 months in March 2025", ("2025-03", "2025-03")),
+    ("Demand over the last 0 months of 2025", ("2025-01", "2025-12")),
+    ("Demand on December 25, 2025", ("2025-12", "2025-12")),
+    ("Demand from December 25, 2025 to March 3, 2026", ("2025-12", "2026-03")),
+    ("Orders due May 5, 2026", ("2026-05", "2026-05")),
+    ("Demand in Dec 25", ("2025-12", "2025-12")),
+]
+
+# Two-digit years are expanded, days of the month are not
+NORMALIZED = [
+    ("Dec 25", "december 2025"),
+    ("december '25", "december 2025"),
+    ("December 25, 2025", "december 25 2025"),
+    ("from Dec 1 2025 to Jan 31 2026", "from december 1 2025 to january 31 2026"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="passes over the labelled questions")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(LAMBDA_ROOT, "shared"))
+    sys.path.insert(0, os.path.join(LAMBDA_ROOT, "intent-classifier"))
+    from date_range_parser import extract_date_range
+    from question_normalizer import normalize_question
+
+    problems = []
+    for question, expected in NORMALIZED:
+        if normalize_question(question) != expected:
+            problems.append(f"normalized {question!r}: {normalize_question(question)!r}, expected {expected!r}")
+    for question, expected in LABELLED:
+        date_range = extract_date_range(question, TODAY)
+        got = (date_range["from"][:7], date_range["until"][:7]) if date_range else None
+        if got != expected:
+            problems.append(f"{question!r}: {got}, expected {expected}")
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for question, _ in LABELLED:
+            extract_date_range(question, TODAY)
+    per_question_us = (time.perf_counter() - start) * 1e6 / (args.iterations * len(LABELLED))
+
+    print(f"{len(LABELLED)} labelled questions, {per_question_us:.1f} us per question")
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("Every labelled question resolves to its date range")
+
+
+if __name__ == "__main__":
+    main()
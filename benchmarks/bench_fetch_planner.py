@@ -0,0 +1,79 @@
+"""
+Benchmark + equivalence check: incremental month-bucket histogram fetches.
+
+Replays a conversation that keeps widening the histogram range (the
+"now extend that to July 2026" pattern) twice against the mock GraphQL
+server: once refetching every month each time, once through the fetch
+planner that only requests the missing buckets. Prints the months fetched
+upstream and the latency of each step, and exits non-zero if a stitched
+histogram differs from the full fetch.
+
+Usage:
+    python benchmarks/bench_fetch_planner.py --rounds 50
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+FOLLOW_UPS = [
+    ("Jan-Mar 2025", {"from": "2025-01-01T00:00:00Z", "until": "2025-03-31T23:59:59Z"}),
+    ("extend to Jun 2025", {"from": "2025-01-01T00:00:00Z", "until": "2025-06-30T23:59:59Z"}),
+    ("extend to Dec 2025", {"from": "2025-01-01T00:00:00Z", "until": "2025-12-31T23:59:59Z"}),
+    ("extend to Jul 2026", {"from": "2025-01-01T00:00:00Z", "until": "2026-07-31T23:59:59Z"}),
+    ("narrow to 2026", {"from": "2026-01-01T00:00:00Z", "until": "2026-07-31T23:59:59Z"}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    with serve_mock_graphql() as server:
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "graphql-client"))
+        import lambda_function as graphql_client
+
+        timings = {label: {"full": [], "planned": []} for label, _ in FOLLOW_UPS}
+        fetched = {label: {"full": 0, "planned": 0} for label, _ in FOLLOW_UPS}
+        mismatches = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.rounds):
+                expected = {}
+                for mode in ("full", "planned"):
+                    # Fresh conversation per mode: nothing cached from earlier runs
+                    graphql_client.graphql_cache.clear()
+                    graphql_client.histogram_buckets.cache.clear()
+                    for label, date_range in FOLLOW_UPS:
+                        start = time.perf_counter()
+                        result = graphql_client.execute_graphql_query(
+                            "demandByFulfillmentHistogram", date_range, use_cache=(mode == "planned")
+                        )
+                        timings[label][mode].append((time.perf_counter() - start) * 1000)
+                        fetched[label][mode] += result["fetch_plan"]["fetched"]
+                        if mode == "full":
+                            expected[label] = result["data"]
+                        elif result["data"] != expected[label]:
+                            mismatches.append(label)
+
+    print(f"{'step':<20} {'months full':>12} {'months planned':>15} {'full ms':>9} {'planned ms':>11}")
+    for label, _ in FOLLOW_UPS:
+        print(f"{label:<20} {fetched[label]['full'] / args.rounds:>12.1f} "
+              f"{fetched[label]['planned'] / args.rounds:>15.1f} "
+              f"{statistics.mean(timings[label]['full']):>9.3f} "
+              f"{statistics.mean(timings[label]['planned']):>11.3f}")
+    if mismatches:
+        print(f"MISMATCH: stitched histogram differs from the full fetch for {sorted(set(mismatches))}")
+        sys.exit(1)
+    print("All stitched histograms match the full fetch")
+
+
+if __name__ == "__main__":
+    main()
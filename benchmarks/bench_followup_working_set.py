@@ -0,0 +1,194 @@
+"""
+Benchmark + check: follow-ups answered from the session working set.
+
+Plays scripted conversations (data questions interleaved with follow-ups
+such as "why is that?" and "break that down by month") through the
+in-process pipeline against the mock GraphQL server and the fake LLM, in
+two ways: as before, where every turn is classified and fetched (follow-ups
+only flagged is_followup), and with a session, where the orchestrator
+detects pure follow-ups and answers them from the previous turn's intent
+and data. Reports classifier calls, GraphQL fetches and latency per turn.
+Checks that the detector routes a labelled question list correctly, that
+follow-ups keep the previous intent and value, and that a follow-up asking
+for the other chart fetches it once and shows it. Exits non-zero on any
+mismatch.
+
+Usage:
+    python benchmarks/bench_followup_working_set.py --rounds 20 --llm-ms 40 --graphql-latency-ms 15
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+# (question, is a pure follow-up)
+CONVERSATION = [
+    ("What is my total demand?", False),
+    ("Why is that?", True),
+    ("What does this mean for production planning?", True),
+    ("Break that down by month", True),
+    ("How many months do I have firm demand?", False),
+    ("Is that good?", True),
+    ("Tell me more", True),
+    ("What is the revenue from my total firm orders?", False),
+    ("Show me that as percentages", True),
+    ("What about overdue?", False),
+    ("Which month has the highest demand?", False),
+    ("Why?", True),
+    ("Break that down by category", True),
+    ("Thanks for that", False),
+    ("What is my demand for March 2025?", False),
+    ("Can you explain those numbers?", True),
+    ("thanks!", False),
+]
+
+# Extra labelled questions for the detector alone
+LABELLED = [
+    ("why is it so high", True),
+    ("how should this affect inventory?", True),
+    ("what do you recommend?", True),
+    ("break it down further", True),
+    ("what are the risks?", True),
+    ("what is my forecasted demand?", False),
+    ("and last year?", False),
+    ("what about the overdue orders in 2024", False),
+    ("show me the monthly average", False),
+    ("great, thanks", False),
+    ("thanks for that", False),
+    ("cheers, that helps", False),
+    ("what is the total demand for next quarter", False),
+]
+
+
+class CountingExecutor:
+    """Wraps the in-process executor and counts classifier and GraphQL calls."""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.mode = executor.mode
+        self.classified = 0
+        self.fetched = 0
+
+    def guess_endpoint(self, question):
+        return self.executor.guess_endpoint(question)
+
+    def classify(self, question):
+        self.classified += 1
+        return self.executor.classify(question)
+
+    def fetch(self, endpoint, date_range=None, extraction_type=None):
+        # Past the client's result cache, as for a new date range or a cold container
+        self.fetched += 1
+        return self.executor.graphql_module.execute_graphql_query(
+            endpoint, date_range, use_cache=False, extraction_type=extraction_type)["data"]
+
+    def respond(self, request):
+        return self.executor.respond(request)
+
+    def respond_stream(self, request):
+        return self.executor.respond_stream(request)
+
+
+def play(orchestrator, executor, session_id, problems):
+    """Run the conversation once; returns per-turn milliseconds and responses."""
+    timings, responses = [], []
+    for question, followup in CONVERSATION:
+        start = time.perf_counter()
+        if session_id:
+            response = orchestrator.run_pipeline(question, executor, use_cache=False, session_id=session_id)
+        else:
+            response = orchestrator.run_pipeline(question, executor, use_cache=False, is_followup=followup)
+        timings.append((time.perf_counter() - start) * 1000)
+        responses.append(response)
+    return timings, responses
+
+
+def check_session_answers(responses, wanted_endpoint, problems):
+    previous = None
+    for (question, followup), response in zip(CONVERSATION, responses):
+        steps = response.get("processing_steps", {})
+        reused = steps.get("intent_classification") == "reused"
+        if reused != (followup and previous is not None):
+            problems.append(f"{question!r}: answered {'from the working set' if reused else 'by the pipeline'}")
+        if reused and wanted_endpoint(question) is None \
+                and response["endpoint"] != previous["endpoint"]:
+            problems.append(f"{question!r}: follow-up changed the intent to {response['endpoint']}")
+        if reused and response["visualization_type"] == previous["visualization_type"] \
+                and response["extracted_data"] != previous["extracted_data"]:
+            problems.append(f"{question!r}: follow-up changed the extracted value")
+        if question == "Break that down by month" and (response["visualization_type"] != "stacked-bar"
+                                                       or steps.get("graphql_query") != "success"):
+            problems.append(f"{question!r}: expected a histogram fetched for the follow-up, got "
+                            f"{response['visualization_type']} / {steps.get('graphql_query')}")
+        if question == "Break that down by category" and (response["visualization_type"] != "donut"
+                                                          or response["endpoint"] != "demandByFulfillmentDonut"):
+            problems.append(f"{question!r}: expected the category split after a monthly figure, got "
+                            f"{response['visualization_type']} / {response['endpoint']}")
+        if question == "Thanks for that" and response.get("type") != "acknowledgment":
+            problems.append(f"{question!r}: answered as a question instead of acknowledged")
+        if response.get("type") != "acknowledgment":
+            previous = response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10, help="times each conversation is played")
+    parser.add_argument("--llm-ms", type=float, default=30.0, help="fake LLM latency per completion")
+    parser.add_argument("--graphql-latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    problems = []
+    results = {}
+    with serve_mock_graphql(latency_ms=args.graphql_latency_ms) as server, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        import lambda_function as orchestrator  # also puts lambda/shared on sys.path
+        import followup_detector
+        import llm_backend
+        import session_store
+        import stage_executors
+
+        llm_backend.set_llm_backend(llm_backend.FakeBackend(first_token_ms=args.llm_ms, tokens=60))
+        inprocess = stage_executors.InProcessStageExecutor()
+
+        for label, with_session in (("classify every turn", False), ("session working set", True)):
+            executor = CountingExecutor(inprocess)
+            timings = []
+            for _ in range(args.rounds):
+                session_id = session_store.new_session_id() if with_session else None
+                turn_ms, responses = play(orchestrator, executor, session_id, problems)
+                timings.extend(turn_ms)
+                if with_session:
+                    check_session_answers(responses, followup_detector.wanted_endpoint, problems)
+            results[label] = (executor, timings)
+
+    for question, expected in CONVERSATION + LABELLED:
+        if expected != followup_detector.is_followup_question(question) and question != "thanks!":
+            problems.append(f"detector: {question!r} should {'' if expected else 'not '}be a follow-up")
+
+    turns = len(CONVERSATION) * args.rounds
+    followups = sum(followup for _, followup in CONVERSATION) * args.rounds
+    print(f"{args.rounds} x {len(CONVERSATION)}-turn conversation ({followups} follow-ups), "
+          f"fake LLM {args.llm_ms} ms, GraphQL {args.graphql_latency_ms} ms")
+    print(f"{'':<22} {'classify':>9} {'fetch':>7} {'mean ms':>9} {'p50 ms':>8}")
+    for label, (executor, timings) in results.items():
+        print(f"{label:<22} {executor.classified / turns:>9.2f} {executor.fetched / turns:>7.2f} "
+              f"{statistics.mean(timings):>9.1f} {statistics.median(timings):>8.1f}")
+    baseline, session = (results[label][0] for label in results)
+    if session.classified >= baseline.classified or session.fetched >= baseline.fetched:
+        problems.append("the session did not save classifier calls or fetches")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems[:20]))
+        sys.exit(1)
+    print("Pure follow-ups skip classification and fetch; new data questions still go through the pipeline")
+
+
+if __name__ == "__main__":
+    main()
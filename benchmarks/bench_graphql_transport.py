@@ -0,0 +1,73 @@
+"""
+Benchmark: per-query requests.post() vs the pooled keep-alive GraphQL transport.
+
+Sends the same histogram query to the mock GraphQL server with both
+transports and reports latency plus the number of TCP connections the
+server accepted. Over loopback connection setup is cheap; against the real
+FactoryTwin server (and over TLS) each avoided connection saves a full
+handshake round-trip.
+
+Usage:
+    python benchmarks/bench_graphql_transport.py --requests 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+sys.path.insert(0, os.path.join(LAMBDA_ROOT, "graphql-client"))
+sys.path.insert(0, os.path.join(LAMBDA_ROOT, "shared"))
+from graphql_transport import GraphQLTransport  # noqa: E402
+
+PAYLOAD = {
+    "query": (
+        "query HistogramQuery($simulationId: UUID!, $periodBoundaries: [Instant!]!, $sites: [UUID!]!, $buffer: Float!) {"
+        " simulation(identifier: $simulationId) { charts { demandByFulfillmentHistogram("
+        "periodBoundaries: $periodBoundaries sites: $sites onTimeDeliveryBuffer: $buffer) { startDate } } } }"
+    ),
+    "variables": {"simulationId": "bench", "periodBoundaries": ["2025-01-01T00:00:00Z", "2025-02-01T00:00:00Z"],
+                  "sites": [], "buffer": 0.0},
+}
+
+
+def run(send, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = send()
+        response.json()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    results = {}
+    with serve_mock_graphql() as server:
+        samples = run(lambda: requests.post(server.url, json=PAYLOAD, timeout=30), args.requests)
+        results["requests.post"] = (samples, server.connection_count)
+
+        server.connection_count = 0
+        transport = GraphQLTransport(pool_size=4)
+        samples = run(lambda: transport.post(server.url, PAYLOAD), args.requests)
+        results["pooled session"] = (samples, server.connection_count)
+
+    print(f"GraphQL transport, {args.requests} sequential queries against the mock server")
+    print(f"{'transport':<16} {'mean ms':>9} {'p95 ms':>9} {'connections':>12}")
+    for name, (samples, connections) in results.items():
+        p95 = sorted(samples)[int(0.95 * (len(samples) - 1))]
+        print(f"{name:<16} {statistics.mean(samples):>9.3f} {p95:>9.3f} {connections:>12}")
+    print(f"\nTransport stats: {transport.stats()}")
+
+
+if __name__ == "__main__":
+    main()
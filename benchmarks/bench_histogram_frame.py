@@ -0,0 +1,181 @@
+"""
+Benchmark + equivalence check: columnar HistogramFrame vs dict-walking extraction.
+
+Builds a multi-year weekly histogram with hundreds of categories and runs
+every histogram extraction type plus the LLM context statistics twice: with
+the previous dict-walking implementation (kept below as the reference) and
+with the response generator's HistogramFrame path (frame built once per
+request, as build_response does). Exits non-zero if the results differ.
+
+Usage:
+    python benchmarks/bench_histogram_frame.py --years 5 --categories 300
+"""
+
+import argparse
+import importlib.util
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from mock_server import LAMBDA_ROOT
+
+EXTRACTION_TYPES = ["monthly_count", "average", "highest_month"]
+
+
+def load_response_generator():
+    package_dir = os.path.join(LAMBDA_ROOT, "response-generator")
+    sys.path.insert(0, package_dir)
+    spec = importlib.util.spec_from_file_location(
+        "factorytwin_response_generator", os.path.join(package_dir, "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def weekly_histogram(years, categories, seed=7):
+    rng = random.Random(seed)
+    names = ["Firm Order", "Overdue", "Forecasted"] + [f"Category {i}" for i in range(categories - 3)]
+    start = datetime(2024, 1, 1)
+    periods = []
+    for week in range(years * 52):
+        periods.append({
+            "startDate": (start + timedelta(weeks=week)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "stackDataList": [
+                {"name": name, "quantity": rng.choice([0, rng.randint(1, 500)]), "value": round(rng.uniform(0, 1e5), 2)}
+                for name in names
+            ],
+        })
+    return periods
+
+
+# --- previous implementation (reference) -------------------------------------
+
+def legacy_extract(data, extraction_type):
+    if extraction_type == "monthly_count":
+        count = 0
+        for period in data:
+            for item in period.get("stackDataList", []):
+                if item.get("name") == "Firm Order" and item.get("quantity", 0) > 0:
+                    count += 1
+                    break
+        return count
+    elif extraction_type == "average":
+        total_quantity = 0.0
+        period_count = 0
+        for period in data:
+            total_quantity += sum(float(item.get("quantity", 0)) for item in period.get("stackDataList", []))
+            period_count += 1
+        return total_quantity / period_count if period_count > 0 else 0.0
+    elif extraction_type == "highest_month":
+        max_quantity = 0.0
+        max_period = None
+        for period in data:
+            period_total = sum(float(item.get("quantity", 0)) for item in period.get("stackDataList", []))
+            if period_total > max_quantity:
+                max_quantity = period_total
+                max_period = period
+        return {"startDate": max_period.get("startDate") if max_period else None, "quantity": max_quantity}
+    return None
+
+
+def legacy_context(periods, format_quantity):
+    context_parts = [f"Data contains {len(periods)} time periods with the following breakdown:\n"]
+    for period in periods:
+        if period and period.get("stackDataList"):
+            start_date = period.get("startDate", "Unknown")
+            try:
+                date_str = datetime.fromisoformat(start_date.replace('Z', '+00:00')).strftime("%B %Y")
+            except Exception:
+                date_str = start_date
+            period_data = []
+            total_period_qty = 0
+            for item in period["stackDataList"]:
+                if item and item.get("name"):
+                    qty = item.get("quantity", 0)
+                    if qty > 0:
+                        period_data.append(f"  - {item['name']}: {format_quantity(qty)}")
+                        total_period_qty += qty
+            if period_data:
+                context_parts.append(f"\n{date_str}:")
+                context_parts.extend(period_data)
+                context_parts.append(f"  Total: {format_quantity(total_period_qty)}")
+    all_quantities = []
+    category_totals = {}
+    for period in periods:
+        if period and period.get("stackDataList"):
+            for item in period["stackDataList"]:
+                if item and item.get("name") and item.get("quantity", 0) > 0:
+                    category_totals[item["name"]] = category_totals.get(item["name"], 0) + item.get("quantity", 0)
+                    all_quantities.append(item.get("quantity", 0))
+    if category_totals:
+        context_parts.append(f"\n\nOverall Summary:")
+        for name, total_qty in category_totals.items():
+            context_parts.append(f"  - {name}: {format_quantity(total_qty)}")
+        if all_quantities:
+            context_parts.append(f"\n  Average per period: {format_quantity(sum(all_quantities) / len(all_quantities))}")
+            context_parts.append(f"  Peak period: {format_quantity(max(all_quantities))}")
+            context_parts.append(f"  Lowest period: {format_quantity(min(all_quantities))}")
+    return "\n".join(context_parts)
+
+
+# ------------------------------------------------------------------------------
+
+def same(expected, actual):
+    if isinstance(expected, dict):
+        return expected.keys() == actual.keys() and all(same(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, float):
+        return math.isclose(expected, actual, rel_tol=1e-9)
+    return expected == actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--categories", type=int, default=300)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    generator = load_response_generator()
+    periods = weekly_histogram(args.years, args.categories)
+
+    def run_legacy():
+        values = {t: legacy_extract(periods, t) for t in EXTRACTION_TYPES}
+        return values, legacy_context(periods, generator.format_quantity)
+
+    def run_frame():
+        frame = generator.HistogramFrame.from_payload(periods)
+        values = {t: generator.extract_value_from_histogram(frame, t) for t in EXTRACTION_TYPES}
+        return values, generator.build_histogram_context(frame)
+
+    results = {}
+    timings = {}
+    for name, run in (("dict-walking", run_legacy), ("HistogramFrame", run_frame)):
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            results[name] = run()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[name] = statistics.median(samples)
+
+    print(f"{len(periods)} weekly periods x {args.categories} categories, median of {args.iterations} runs")
+    for name, elapsed in timings.items():
+        print(f"{name:<15} {elapsed:9.2f} ms")
+    print(f"speedup: {timings['dict-walking'] / timings['HistogramFrame']:.1f}x")
+
+    (legacy_values, legacy_text), (frame_values, frame_text) = results["dict-walking"], results["HistogramFrame"]
+    mismatched = [t for t in EXTRACTION_TYPES if not same(legacy_values[t], frame_values[t])]
+    if legacy_text != frame_text:
+        mismatched.append("context")
+    if mismatched:
+        print(f"MISMATCH: {mismatched}")
+        sys.exit(1)
+    print("Extractions and context match the dict-walking implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark + equivalence check: donut answers from the histogram range index.
+
+Fetches the monthly histogram once from the mock GraphQL server, then, for
+every month-aligned sub-range, compares the donut built from the prefix-sum
+index with totals summed day by day from the mock's raw daily rows, and
+times the index against a donut query to the server. Exits non-zero if any
+range disagrees.
+
+Usage:
+    python benchmarks/bench_histogram_index.py
+"""
+
+import calendar
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+FIRST_MONTH = (2025, 1)
+MONTH_COUNT = 19
+
+
+def month_range(start_offset, end_offset):
+    year, month = divmod(FIRST_MONTH[0] * 12 + FIRST_MONTH[1] - 1 + start_offset, 12)
+    end_year, end_month = divmod(FIRST_MONTH[0] * 12 + FIRST_MONTH[1] - 1 + end_offset, 12)
+    last_day = calendar.monthrange(end_year, end_month + 1)[1]
+    return {
+        "from": f"{year:04d}-{month + 1:02d}-01T00:00:00Z",
+        "until": f"{end_year:04d}-{end_month + 1:02d}-{last_day:02d}T23:59:59Z",
+    }
+
+
+def by_name(donut):
+    return {item["name"]: (item["quantity"], item["value"]) for item in donut["stackDataList"]}
+
+
+def brute_force_totals(dataset, simulation, date_range):
+    """(quantity, value) per category summed over the raw daily rows of every day in date_range."""
+    quantities, values = dataset.series(simulation)
+    first = date.fromisoformat(date_range["from"][:10])
+    last = date.fromisoformat(date_range["until"][:10])
+    totals = {}
+    for c, name in enumerate(dataset.categories):
+        quantity = value_cents = 0
+        day = first
+        while day <= last:
+            index = (day - dataset.start).days
+            # Row for one day: the step of the cumulative series over that day
+            quantity += quantities[c][index + 1] - quantities[c][index]
+            value_cents += values[c][index + 1] - values[c][index]
+            day += timedelta(days=1)
+        totals[name] = (quantity, value_cents / 100)
+    return totals
+
+
+def main():
+    with serve_mock_graphql() as server:
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "graphql-client"))
+        import lambda_function as graphql_client
+
+        ranges = [month_range(a, b) for a in range(MONTH_COUNT) for b in range(a, MONTH_COUNT)]
+        mismatches = []
+        index_ms, upstream_ms = [], []
+        with contextlib.redirect_stdout(io.StringIO()):
+            graphql_client.execute_graphql_query("demandByFulfillmentHistogram", month_range(0, MONTH_COUNT - 1))
+            for date_range in ranges:
+                start = time.perf_counter()
+                local = graphql_client.execute_graphql_query("demandByFulfillmentDonut", date_range)
+                index_ms.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                graphql_client.execute_graphql_query("demandByFulfillmentDonut", date_range, use_cache=False)
+                upstream_ms.append((time.perf_counter() - start) * 1000)
+
+                expected = brute_force_totals(server.service.dataset, graphql_client.SIMULATION_ID, date_range)
+                actual = by_name(local["data"])
+                if local.get("source") != "histogram_index" or expected.keys() != actual.keys() or any(
+                    expected[name][0] != actual[name][0] or abs(expected[name][1] - actual[name][1]) > 0.01
+                    for name in expected
+                ):
+                    mismatches.append((date_range, expected, actual))
+
+    print(f"{len(ranges)} month-aligned ranges checked against day-by-day sums of the raw rows")
+    print(f"index    mean {statistics.mean(index_ms):.4f} ms")
+    print(f"upstream mean {statistics.mean(upstream_ms):.4f} ms")
+    if mismatches:
+        for date_range, expected, actual in mismatches[:5]:
+            print(f"MISMATCH {date_range}: raw rows={expected} index={actual}")
+        sys.exit(1)
+    print("All index answers match the raw daily rows")
+
+
+if __name__ == "__main__":
+    main()
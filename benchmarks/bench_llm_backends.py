@@ -0,0 +1,156 @@
+"""
+Benchmark + check: offline LLM backends (lambda/shared/llm_backend.py).
+
+1. Fake backend: measured time to first token and total stream time against
+   the configured latency, and the observed failure rate against the
+   configured one (same seed, same failures).
+2. Record/replay: every question runs through the in-process pipeline with
+   the intent classifier forced onto the LLM path, recording the fake
+   backend's completions, then again replay-only. The replayed answers and
+   intents must match the recorded run, with no completion missing.
+3. End-to-end latency of the pipeline with the simulated LLM latency, with
+   no network and no GROQ_API_KEY.
+
+Exits non-zero if any check fails.
+
+Usage:
+    python benchmarks/bench_llm_backends.py --first-token-ms 40 --token-ms 2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_pipeline_modes import QUESTIONS, percentile
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+MESSAGES = [{"role": "system", "content": "Answer briefly."}, {"role": "user", "content": "What is my total demand?"}]
+
+
+def check_fake_latency(llm_backend, first_token_ms, token_ms, tokens):
+    fake = llm_backend.FakeBackend(first_token_ms=first_token_ms, token_ms=token_ms, tokens=tokens)
+    start = time.perf_counter()
+    chunks = []
+    first_ms = None
+    for chunk in fake.stream(MESSAGES, "fake", 0.5, 700, purpose="answer"):
+        if first_ms is None:
+            first_ms = (time.perf_counter() - start) * 1000
+        chunks.append(chunk)
+    total_ms = (time.perf_counter() - start) * 1000
+    expected_ms = first_token_ms + token_ms * (len(chunks) - 1)
+    print(f"fake stream: {len(chunks)} tokens, first token {first_ms:.1f} ms (configured {first_token_ms:.1f}), "
+          f"total {total_ms:.1f} ms (configured {expected_ms:.1f})")
+    problems = []
+    if len(chunks) != tokens:
+        problems.append(f"fake stream produced {len(chunks)} tokens, configured {tokens}")
+    if first_ms < first_token_ms or total_ms < expected_ms:
+        problems.append("fake stream faster than configured")
+    if total_ms > expected_ms * 1.5 + 20:
+        problems.append("fake stream much slower than configured")
+    if "".join(chunks) != fake.complete(MESSAGES, "fake", 0.5, 700, purpose="answer"):
+        problems.append("fake stream and completion differ")
+    return problems
+
+
+def check_fake_failures(llm_backend, failure_rate, calls=4000):
+    def run(seed):
+        fake = llm_backend.FakeBackend(failure_rate=failure_rate, seed=seed)
+        outcomes = []
+        for _ in range(calls):
+            try:
+                fake.complete(MESSAGES, "fake", 0.5, 700)
+                outcomes.append(True)
+            except llm_backend.LLMBackendError:
+                outcomes.append(False)
+        return outcomes
+
+    outcomes = run(seed=7)
+    observed = outcomes.count(False) / calls
+    print(f"fake failures: {observed:.3f} observed over {calls} calls (configured {failure_rate:.3f})")
+    problems = []
+    if abs(observed - failure_rate) > 0.03:
+        problems.append(f"fake failure rate {observed:.3f}, configured {failure_rate:.3f}")
+    if run(seed=7) != outcomes:
+        problems.append("fake failures differ between runs with the same seed")
+    return problems
+
+
+def run_questions(run_pipeline, executor, iterations):
+    results, samples = [], []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        for i in range(iterations):
+            start = time.perf_counter()
+            response = run_pipeline(QUESTIONS[i % len(QUESTIONS)], executor, use_cache=False)
+            samples.append((time.perf_counter() - start) * 1000)
+            results.append((response["endpoint"], response["answer"]))
+            sink.seek(0)
+            sink.truncate()
+    return results, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=40.0)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ.pop("GROQ_API_KEY", None)
+    recordings = tempfile.mkdtemp(prefix="llm_recordings_")
+    problems = []
+
+    with serve_mock_graphql() as server:
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        from lambda_function import run_pipeline  # also puts lambda/shared on sys.path
+        import llm_backend
+        import stage_executors
+
+        problems += check_fake_latency(llm_backend, args.first_token_ms, args.token_ms, args.tokens)
+        problems += check_fake_failures(llm_backend, args.failure_rate)
+
+        executor = stage_executors.InProcessStageExecutor()
+        # Every question takes the LLM intent path, uncached
+        executor.intent_module.LOCAL_CLASSIFIER_THRESHOLD = 1.01
+        executor.intent_module.intent_cache.maxsize = 0
+
+        fake = llm_backend.FakeBackend(first_token_ms=args.first_token_ms, token_ms=args.token_ms, tokens=args.tokens)
+        recorder = llm_backend.RecordReplayBackend(recordings, mode="record", inner=fake)
+        llm_backend.set_llm_backend(recorder)
+        recorded, samples = run_questions(run_pipeline, executor, args.iterations)
+
+        replayer = llm_backend.RecordReplayBackend(recordings, mode="replay")
+        llm_backend.set_llm_backend(replayer)
+        replayed, replay_samples = run_questions(run_pipeline, executor, args.iterations)
+        llm_backend.set_llm_backend(None)
+    shutil.rmtree(recordings, ignore_errors=True)
+
+    print(f"record/replay: {fake.calls} fake completions, {recorder.recorded} recorded, {replayer.hits} replayed")
+    if fake.calls != args.iterations * 2:
+        problems.append(f"expected an intent and an answer completion per question, got {fake.calls} completions")
+    if replayer.hits != fake.calls:
+        problems.append(f"replayed {replayer.hits} completions, recorded {fake.calls}")
+    if replayed != recorded:
+        problems.append("replayed answers differ from the recorded run")
+
+    print(f"\npipeline, {args.iterations} questions, LLM intent + answer (ms)")
+    print(f"{'backend':<10} {'p50':>8} {'p95':>8}")
+    print(f"{'fake':<10} {percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f}")
+    print(f"{'replay':<10} {percentile(replay_samples, 50):>8.2f} {percentile(replay_samples, 95):>8.2f}")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("\nFake latency and failures match the configuration; replay reproduces the recorded run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark + check: the local intent classifier.
+
+Classifies a labelled question list with the knowledge-graph classifier
+alone and reports the time per question. Checks each question's endpoint
+and extraction type (words that merely contain "late", "forecast" or
+"overdue", such as "calculate" or "related", must not pick a category), and
+runs "Calculate my total demand" through the in-process pipeline against the
+mock GraphQL server to check it gets the same value as "What is my total
+demand?". Exits non-zero on any mismatch.
+
+Usage:
+    python benchmarks/bench_local_classifier.py --iterations 2000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+DONUT = "demandByFulfillmentDonut"
+HISTOGRAM = "demandByFulfillmentHistogram"
+
+# (question, endpoint, extraction type)
+LABELLED = [
+    ("What is my total demand?", DONUT, "total"),
+    ("Calculate my total demand", DONUT, "total"),
+    ("Calculate the total demand across all categories", DONUT, "total"),
+    ("Show me the related total demand", DONUT, "total"),
+    ("What is my latest total demand?", DONUT, "total"),
+    ("Show me my firm orders", DONUT, "firm_order"),
+    ("What is my firm demand?", DONUT, "firm_order"),
+    ("How much demand is overdue?", DONUT, "overdue"),
+    ("How much demand is late?", DONUT, "overdue"),
+    ("What is my forecasted demand?", DONUT, "forecasted"),
+    ("Show the forecast demand", DONUT, "forecasted"),
+    ("How many months do I have firm demand?", HISTOGRAM, "monthly_count"),
+    ("Which month has the highest demand?", HISTOGRAM, "highest_month"),
+    ("Thanks for that", "conversational", "none"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000, help="passes over the labelled questions")
+    args = parser.parse_args()
+
+    problems = []
+    with serve_mock_graphql() as server, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        import lambda_function as orchestrator  # also puts lambda/shared on sys.path
+        import llm_backend
+        import stage_executors
+
+        llm_backend.set_llm_backend(llm_backend.FakeBackend())
+        executor = stage_executors.InProcessStageExecutor()
+        classifier = executor.intent_module.local_classifier
+
+        for question, endpoint, extraction_type in LABELLED:
+            result = classifier.classify(question)
+            if (result["endpoint"], result["extraction_type"]) != (endpoint, extraction_type):
+                problems.append(f"{question!r}: {result['endpoint']} / {result['extraction_type']}, "
+                                f"expected {endpoint} / {extraction_type}")
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            for question, _, _ in LABELLED:
+                classifier.classify(question)
+        per_question_us = (time.perf_counter() - start) * 1e6 / (args.iterations * len(LABELLED))
+
+        expected, calculated = (
+            orchestrator.run_pipeline(question, executor, use_cache=False)["extracted_data"]
+            for question in ("What is my total demand?", "Calculate my total demand")
+        )
+        if calculated.get("quantity") != expected.get("quantity"):
+            problems.append(f"'Calculate my total demand' answered {calculated.get('formatted_value')}, "
+                            f"expected {expected.get('formatted_value')}")
+
+    print(f"{len(LABELLED)} labelled questions, local classifier {per_question_us:.1f} us per question")
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("Every labelled question gets its endpoint and extraction type")
+
+
+if __name__ == "__main__":
+    main()
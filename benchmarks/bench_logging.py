@@ -0,0 +1,109 @@
+"""
+Benchmark: per-request logging cost, full-payload prints vs structured logging.
+
+Replays the log calls one histogram request used to make on the hot path
+(full event dumps in every handler, indented GraphQL variables, the first
+500 characters of the response text, orchestrator payload prefixes) and the
+structured logger calls that replace them, at INFO and at DEBUG with payload
+sampling. Output goes to a null sink, so only formatting cost and log volume
+are measured.
+
+Usage:
+    python benchmarks/bench_logging.py --requests 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from mock_server import LAMBDA_ROOT, load_mock_graphql
+
+sys.path.insert(0, os.path.join(LAMBDA_ROOT, "shared"))
+import structured_log  # noqa: E402
+
+
+class NullSink:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text)
+
+
+def sample_request():
+    mock = load_mock_graphql()
+    boundaries = [f"{2025 + (m // 12)}-{m % 12 + 1:02d}-01T00:00:00Z" for m in range(20)]
+    variables = {"simulationId": "test-simulation", "periodBoundaries": boundaries, "sites": [], "buffer": 0.0}
+    response_text = json.dumps({"data": {"simulation": {"charts": {
+        "demandByFulfillmentHistogram": mock.histogram_for_boundaries(boundaries)
+    }}}})
+    data = json.loads(response_text)["data"]["simulation"]["charts"]["demandByFulfillmentHistogram"]
+    event = {"body": json.dumps({"question": "Show monthly demand for 2025", "graphql_data": data,
+                                 "endpoint": "demandByFulfillmentHistogram", "extraction_type": "monthly_count"})}
+    return event, variables, response_text, data
+
+
+def legacy_logging(sink, event, variables, response_text, data):
+    write = lambda line: sink.write(line + "\n")  # noqa: E731
+    write(f"Orchestrator received event: {json.dumps({'body': json.dumps({'question': 'q'})})}")
+    for payload in ({"question": "q"}, {"endpoint": "demandByFulfillmentHistogram"}, json.loads(event["body"])):
+        write(f"Payload: {json.dumps({'body': json.dumps(payload)})[:200]}...")
+    write(f"Received event: {json.dumps({'body': json.dumps({'question': 'q'})})}")
+    write(f"Received event: {json.dumps({'body': json.dumps({'endpoint': 'demandByFulfillmentHistogram'})})}")
+    write(f"Variables: {json.dumps(variables, indent=2)}")
+    write(f"Response text: {response_text[:500]}")
+    write(f"Data structure: {json.dumps(data, indent=2)[:500]}...")
+    write(f"Received event: {json.dumps(event)}")
+
+
+def structured_logging(logger, event, variables, response_text, data):
+    structured_log.bind_request()
+    logger.payload("event", {"body": json.dumps({"question": "q"})})
+    for stage in ("intent_classification", "graphql_query", "response_generation"):
+        with logger.stage(stage, endpoint="demandByFulfillmentHistogram"):
+            logger.payload("invoke_payload", lambda: {"body": json.dumps(json.loads(event["body"]))})
+    logger.debug("graphql_query", endpoint="demandByFulfillmentHistogram", simulation_id="test-simulation")
+    logger.payload("graphql_variables", variables)
+    logger.debug("graphql_response", status=200, bytes=lambda: len(response_text))
+    logger.payload("graphql_response_body", lambda: response_text)
+    logger.payload("graphql_data_body", data)
+    logger.payload("event", event)
+
+
+def measure(run, requests):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sample-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    request = sample_request()
+    structured_log.LOG_PAYLOAD_SAMPLE_RATE = args.sample_rate
+    results = []
+
+    sink = NullSink()
+    results.append(("full-payload prints", measure(lambda: legacy_logging(sink, *request), args.requests), sink.bytes))
+    for name, level in (("structured INFO", structured_log.INFO), ("structured DEBUG", structured_log.DEBUG)):
+        sink = NullSink()
+        logger = structured_log.StructuredLogger("bench", level=level, write=lambda line, s=sink: s.write(line + "\n"))
+        results.append((name, measure(lambda: structured_logging(logger, *request), args.requests), sink.bytes))
+
+    print(f"{args.requests} requests, payload sample rate {args.sample_rate} (DEBUG only)")
+    print(f"{'logging':<20} {'median us/request':>18} {'bytes/request':>14}")
+    for name, median_us, total_bytes in results:
+        print(f"{name:<20} {median_us:>18.1f} {total_bytes / args.requests:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: remote (Lambda invoke) vs in-process orchestrator pipeline.
+
+Runs the same questions through run_pipeline() with both stage executors
+against the mock GraphQL server. The remote mode uses a local stand-in for
+the boto3 Lambda client that performs the same work as a real invoke on our
+side of the wire (json.dumps the payload, hand it to the handler, json.dumps
+the result, parse it back), plus an optional simulated per-hop invoke
+latency to model the Lambda API round-trip.
+
+No GROQ_API_KEY is needed: without one the LLM stages use their built-in
+fallbacks, so the numbers isolate the orchestration overhead.
+
+Usage:
+    python benchmarks/bench_pipeline_modes.py --iterations 200 --invoke-latency-ms 15
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+QUESTIONS = [
+    "What is my total demand?",
+    "How many months do I have firm demand?",
+    "What is the revenue from my total firm orders?",
+    "Which month has the highest demand?",
+]
+
+
+class LocalLambdaClient:
+    """Stands in for boto3.client('lambda') by calling the handlers in this process."""
+
+    def __init__(self, handlers, invoke_latency_s=0.0):
+        self.handlers = handlers
+        self.invoke_latency_s = invoke_latency_s
+        self.bytes_transferred = 0
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        if self.invoke_latency_s:
+            time.sleep(self.invoke_latency_s)
+        self.bytes_transferred += len(Payload)
+        result = json.dumps(self.handlers[FunctionName](json.loads(Payload), None))
+        self.bytes_transferred += len(result)
+        return {"Payload": io.BytesIO(result.encode("utf-8"))}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_pipeline(run_pipeline, executor, iterations):
+    samples = []
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        for i in range(iterations):
+            question = QUESTIONS[i % len(QUESTIONS)]
+            start = time.perf_counter()
+            run_pipeline(question, executor)
+            samples.append((time.perf_counter() - start) * 1000)
+            sink.seek(0)
+            sink.truncate()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--invoke-latency-ms", type=float, default=0.0,
+                        help="simulated Lambda invoke API round-trip per hop (remote mode only)")
+    args = parser.parse_args()
+
+    os.environ.pop("GROQ_API_KEY", None)
+
+    with serve_mock_graphql() as server:
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        from lambda_function import run_pipeline  # also puts lambda/shared on sys.path
+        import stage_executors
+
+        inprocess = stage_executors.InProcessStageExecutor()
+        lambda_client = LocalLambdaClient(
+            {
+                stage_executors.INTENT_CLASSIFIER_FUNCTION: inprocess.intent_module.lambda_handler,
+                stage_executors.GRAPHQL_CLIENT_FUNCTION: inprocess.graphql_module.lambda_handler,
+                stage_executors.RESPONSE_GENERATOR_FUNCTION: inprocess.response_module.lambda_handler,
+            },
+            invoke_latency_s=args.invoke_latency_ms / 1000.0,
+        )
+        remote = stage_executors.RemoteStageExecutor(lambda_client=lambda_client)
+
+        # Warm both paths once (imports, connection setup)
+        time_pipeline(run_pipeline, inprocess, 1)
+        time_pipeline(run_pipeline, remote, 1)
+        lambda_client.bytes_transferred = 0
+
+        results = {
+            "remote": time_pipeline(run_pipeline, remote, args.iterations),
+            "inprocess": time_pipeline(run_pipeline, inprocess, args.iterations),
+        }
+
+    print(f"Pipeline modes, {args.iterations} requests each "
+          f"(simulated invoke latency {args.invoke_latency_ms:.1f} ms/hop)")
+    print(f"{'mode':<10} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode, samples in results.items():
+        print(f"{mode:<10} {statistics.mean(samples):>9.2f} "
+              f"{percentile(samples, 50):>9.2f} {percentile(samples, 95):>9.2f}")
+
+    saved = statistics.mean(results["remote"]) - statistics.mean(results["inprocess"])
+    print(f"\nOverhead saved per request: {saved:.2f} ms")
+    print(f"Invoke payload bytes avoided per request: "
+          f"{lambda_client.bytes_transferred // args.iterations:,}")
+
+
+if __name__ == "__main__":
+    main()
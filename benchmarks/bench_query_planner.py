@@ -0,0 +1,130 @@
+"""
+Benchmark + check: field projection and automatic persisted queries.
+
+Sends the same donut and histogram questions to the mock GraphQL server
+three ways: the full selection as text (the old behaviour), the projected
+selection for the extraction type, and the projected selection by
+persisted-query hash. Reports request and response bytes on the wire
+(gzip as negotiated by the transport) and latency per request. Checks
+that every category quantity is the same in all three, and that against a
+server without persisted-query support the client falls back to the text
+after one attempt and still returns the same data. Exits non-zero on any
+mismatch.
+
+Usage:
+    python benchmarks/bench_query_planner.py --requests 100 --categories 12
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+from mock_service import MockService  # noqa: E402  (mock_server puts lambda/mock-graphql on sys.path)
+from synthetic_factory import SyntheticDataset  # noqa: E402
+
+CASES = [
+    ("donut, 6 months", "demandByFulfillmentDonut", "total",
+     {"from": "2025-01-01T00:00:00Z", "until": "2025-06-30T23:59:59Z"}),
+    ("histogram, 12 months", "demandByFulfillmentHistogram", "average",
+     {"from": "2025-01-01T00:00:00Z", "until": "2025-12-31T23:59:59Z"}),
+    ("histogram, 36 months", "demandByFulfillmentHistogram", "highest_month",
+     {"from": "2024-01-01T00:00:00Z", "until": "2026-12-31T23:59:59Z"}),
+]
+MODES = [
+    ("full text", False, False),
+    ("projected", True, False),
+    ("projected + APQ", True, True),
+]
+
+
+def quantities(endpoint, data):
+    periods = data if endpoint == "demandByFulfillmentHistogram" else [data]
+    return [(period.get("startDate") if endpoint == "demandByFulfillmentHistogram" else None,
+             sorted((item["name"], item["quantity"]) for item in period["stackDataList"]))
+            for period in periods]
+
+
+def run_case(graphql_client, server, endpoint, extraction_type, date_range, requests):
+    timings, data = [], None
+    received, sent = server.bytes_received, server.bytes_sent
+    for _ in range(requests):
+        start = time.perf_counter()
+        data = graphql_client.execute_graphql_query(endpoint, date_range, use_cache=False,
+                                                    extraction_type=extraction_type)["data"]
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "request_bytes": (server.bytes_received - received) / requests,
+        "response_bytes": (server.bytes_sent - sent) / requests,
+        "mean_ms": statistics.mean(timings),
+        "data": data,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="requests per case and mode")
+    parser.add_argument("--categories", type=int, default=3, help="stackDataList categories in the mock data")
+    args = parser.parse_args()
+
+    problems = []
+    rows = []
+    dataset = SyntheticDataset(categories=args.categories)
+    with serve_mock_graphql(service=MockService(dataset)) as server, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "graphql-client"))
+        import lambda_function as graphql_client
+
+        for label, endpoint, extraction_type, date_range in CASES:
+            expected = None
+            for mode, projection, persisted in MODES:
+                graphql_client.FIELD_PROJECTION = projection
+                graphql_client.persisted_queries = graphql_client.PersistedQueries(enabled=persisted)
+                # One untimed request registers the persisted query
+                graphql_client.execute_graphql_query(endpoint, date_range, use_cache=False,
+                                                     extraction_type=extraction_type)
+                result = run_case(graphql_client, server, endpoint, extraction_type, date_range, args.requests)
+                rows.append((label, mode, result))
+                expected = expected or quantities(endpoint, result["data"])
+                if quantities(endpoint, result["data"]) != expected:
+                    problems.append(f"{label} / {mode}: quantities differ from the full selection")
+                if persisted and graphql_client.persisted_queries.stats()["hash_only"] < args.requests:
+                    problems.append(f"{label} / {mode}: requests were not sent by hash")
+
+    with serve_mock_graphql(service=MockService(dataset, persisted_queries=False)) as server, \
+            contextlib.redirect_stdout(io.StringIO()):
+        graphql_client.GRAPHQL_URL = server.url
+        graphql_client.FIELD_PROJECTION = True
+        graphql_client.persisted_queries = graphql_client.PersistedQueries(enabled=True)
+        for label, endpoint, extraction_type, date_range in CASES:
+            data = graphql_client.execute_graphql_query(endpoint, date_range, use_cache=False,
+                                                        extraction_type=extraction_type)["data"]
+            baseline = next(result for case, mode, result in rows if case == label and mode == "full text")
+            if quantities(endpoint, data) != quantities(endpoint, baseline["data"]):
+                problems.append(f"{label}: fallback to the query text returned different data")
+        stats = graphql_client.persisted_queries.stats()
+        attempts = server.service.stats()["requests"]
+        if stats["unsupported_servers"] != 1 or attempts != len(CASES) + 1:
+            problems.append(f"fallback: {attempts} requests for {len(CASES)} queries, stats {stats}")
+
+    print(f"bytes on the wire per request ({args.categories} categories, {args.requests} requests per row)")
+    print(f"{'case':<22} {'mode':<16} {'request B':>10} {'response B':>11} {'mean ms':>9}")
+    for label, mode, result in rows:
+        print(f"{label:<22} {mode:<16} {result['request_bytes']:>10.0f} {result['response_bytes']:>11.0f} "
+              f"{result['mean_ms']:>9.3f}")
+    print(f"\nserver without persisted queries: fell back to the query text after 1 attempt "
+          f"({attempts} requests for {len(CASES)} queries)")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("Projected and persisted requests return the same quantities as the full selection")
+
+
+if __name__ == "__main__":
+    main()
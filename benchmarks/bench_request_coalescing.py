@@ -0,0 +1,220 @@
+"""
+Benchmark + check: request coalescing in the orchestrator.
+
+Sends bursts of identical questions from many users at the same moment (a
+barrier releases the threads together) through the in-process pipeline
+against the mock GraphQL server and the fake LLM, with coalescing off and
+on. Reports pipeline executions, coalesced requests, LLM calls, GraphQL
+requests and latency per burst. Checks that with coalescing on each burst
+runs the pipeline once and every user gets the same answer, that each
+user's session still records its own turn, that different questions in the
+same burst are not merged, that streaming requests that join a run get the
+chart, the answer and "done", and that a failing run raises in every
+waiting request. Exits non-zero on any mismatch.
+
+Usage:
+    python benchmarks/bench_request_coalescing.py --users 16 --rounds 5 --llm-ms 40
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+
+from bench_pipeline_modes import QUESTIONS, percentile
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+
+class FailingExecutor:
+    """In-process executor whose classifier fails after a delay, so requests pile up on the run."""
+
+    def __init__(self, executor, delay_s):
+        self.executor = executor
+        self.mode = executor.mode
+        self.delay_s = delay_s
+
+    def guess_endpoint(self, question):
+        return self.executor.guess_endpoint(question)
+
+    def classify(self, question):
+        time.sleep(self.delay_s)
+        raise RuntimeError("classifier unavailable")
+
+
+def burst(users, target):
+    """Run target(index) in users threads released together; returns (results, errors, milliseconds)."""
+    barrier = threading.Barrier(users)
+    results, errors, timings = [None] * users, [None] * users, [0.0] * users
+
+    def user(index):
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            results[index] = target(index)
+        except Exception as e:
+            errors[index] = e
+        timings[index] = (time.perf_counter() - start) * 1000
+
+    threads = [threading.Thread(target=user, args=(index,)) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors, timings
+
+
+def run_bursts(orchestrator, session_store, executor, args, problems, label):
+    """Identical-question bursts; returns the per-request latencies."""
+    store = session_store.get_session_store()
+    timings = []
+    for round_index in range(args.rounds):
+        question = QUESTIONS[round_index % len(QUESTIONS)]
+        sessions = [session_store.new_session_id() for _ in range(args.users)]
+        responses, errors, burst_ms = burst(args.users, lambda index: orchestrator.run_pipeline(
+            question, executor, use_cache=False, session_id=sessions[index]))
+        timings.extend(burst_ms)
+        if any(errors):
+            problems.append(f"{label}: {question!r} raised {next(e for e in errors if e)!r}")
+            continue
+        for session_id in sessions:
+            if [turn["question"] for turn in store.turns(session_id)] != [question]:
+                problems.append(f"{label}: session {session_id[:8]} did not record its own turn")
+                break
+        if {response["session_id"] for response in responses} != set(sessions):
+            problems.append(f"{label}: responses carry the wrong session ids")
+        if label == "coalescing on" and len({response["answer"] for response in responses}) != 1:
+            problems.append(f"{label}: users asking {question!r} got different answers")
+    return timings
+
+
+def check_distinct_questions(orchestrator, flights, executor, users, problems):
+    """Two questions in one burst: two runs, and each user gets the answer to their own question."""
+    questions = QUESTIONS[:2]
+    before = flights.executions
+    responses, errors, _ = burst(users, lambda index: orchestrator.run_pipeline(
+        questions[index % 2], executor, use_cache=False))
+    if any(errors):
+        problems.append(f"distinct questions raised {next(e for e in errors if e)!r}")
+        return
+    if flights.executions - before != 2:
+        problems.append(f"distinct questions: {flights.executions - before} runs for 2 questions")
+    for question in questions:
+        answers = {response["answer"] for response in responses if response["question"] == question}
+        if len(answers) != 1:
+            problems.append(f"distinct questions: {question!r} got {len(answers)} different answers")
+    if responses[0]["endpoint"] == responses[1]["endpoint"] \
+            and responses[0]["extracted_data"] == responses[1]["extracted_data"]:
+        problems.append("distinct questions: both questions got the same answer")
+
+
+def check_streaming(orchestrator, flights, executor, users, problems):
+    """Streaming users joining one run each get chart, tokens and done with the same answer."""
+    before = flights.executions
+
+    def stream(index):
+        return list(orchestrator.stream_pipeline(QUESTIONS[0], executor, use_cache=False))
+
+    streams, errors, _ = burst(users, stream)
+    if any(errors):
+        problems.append(f"streaming raised {next(e for e in errors if e)!r}")
+        return
+    if flights.executions - before != 1:
+        problems.append(f"streaming: {flights.executions - before} runs for one question")
+    answers = set()
+    for events in streams:
+        names = [name for name, _ in events]
+        if names[0] != "chart" or names[-1] != "done" or "token" not in names:
+            problems.append(f"streaming: events {names[:3]}...{names[-1:]}")
+            continue
+        done = events[-1][1]
+        text = "".join(payload["text"] for name, payload in events if name == "token")
+        if text != done["answer"]:
+            problems.append(f"streaming: tokens do not add up to the answer (coalesced={done['coalesced']})")
+        answers.add(done["answer"])
+    if len(answers) > 1:
+        problems.append(f"streaming: {len(answers)} different answers")
+
+
+def check_errors(orchestrator, flights, executor, users, problems):
+    """A failing run raises in every request that joined it."""
+    before = flights.executions
+    _, errors, _ = burst(users, lambda index: orchestrator.run_pipeline(
+        "What is my forecasted demand?", executor, use_cache=False))
+    if flights.executions - before != 1:
+        problems.append(f"errors: {flights.executions - before} runs for one failing question")
+    if not all(isinstance(e, RuntimeError) for e in errors):
+        problems.append(f"errors: {sum(isinstance(e, RuntimeError) for e in errors)} of {users} requests raised")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16, help="concurrent users per burst")
+    parser.add_argument("--rounds", type=int, default=4, help="bursts per mode (one question each)")
+    parser.add_argument("--llm-ms", type=float, default=40.0, help="fake LLM latency per completion")
+    parser.add_argument("--graphql-latency-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    problems = []
+    results = {}
+    with serve_mock_graphql(latency_ms=args.graphql_latency_ms) as server, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        import lambda_function as orchestrator  # also puts lambda/shared on sys.path
+        import llm_backend
+        import request_coalescing
+        import session_store
+        import stage_executors
+
+        backend = llm_backend.FakeBackend(first_token_ms=args.llm_ms, tokens=60)
+        llm_backend.set_llm_backend(backend)
+        executor = stage_executors.InProcessStageExecutor()
+        flights = request_coalescing.pipeline_flights
+
+        for label, enabled in (("coalescing off", False), ("coalescing on", True)):
+            request_coalescing.REQUEST_COALESCING = enabled
+            executions, coalesced = flights.executions, flights.coalesced
+            llm_calls, graphql_requests = backend.calls, server.service.requests
+            timings = run_bursts(orchestrator, session_store, executor, args, problems, label)
+            results[label] = {
+                # With coalescing off requests do not go through the flights: every one is a run
+                "executions": flights.executions - executions if enabled else args.users * args.rounds,
+                "coalesced": flights.coalesced - coalesced,
+                "llm_calls": backend.calls - llm_calls,
+                "graphql_requests": server.service.requests - graphql_requests,
+                "timings": timings,
+            }
+
+        check_distinct_questions(orchestrator, flights, executor, args.users, problems)
+        check_streaming(orchestrator, flights, executor, args.users, problems)
+        check_errors(orchestrator, flights, FailingExecutor(executor, args.llm_ms / 1000), args.users, problems)
+
+    bursts = args.rounds
+    print(f"{args.rounds} bursts of {args.users} users asking the same question, "
+          f"fake LLM {args.llm_ms} ms, GraphQL {args.graphql_latency_ms} ms")
+    print(f"{'':<16} {'runs':>6} {'coalesced':>10} {'LLM calls':>10} {'GraphQL':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, result in results.items():
+        print(f"{label:<16} {result['executions'] / bursts:>6.1f} {result['coalesced'] / bursts:>10.1f} "
+              f"{result['llm_calls'] / bursts:>10.1f} {result['graphql_requests'] / bursts:>8.1f} "
+              f"{statistics.median(result['timings']):>8.1f} {percentile(result['timings'], 95):>8.1f}")
+    print("(per burst)")
+
+    on = results["coalescing on"]
+    if on["executions"] != bursts:
+        problems.append(f"coalescing on: {on['executions']} runs for {bursts} bursts")
+    if on["coalesced"] != bursts * (args.users - 1):
+        problems.append(f"coalescing on: {on['coalesced']} coalesced requests, expected {bursts * (args.users - 1)}")
+    if args.users > 1 and on["llm_calls"] >= results["coalescing off"]["llm_calls"]:
+        problems.append("coalescing on: no LLM calls saved")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems[:20]))
+        sys.exit(1)
+    print("Concurrent identical questions share one pipeline run; sessions, streams and errors are kept per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark + check: server-side sessions vs re-sending the transcript.
+
+Runs one long conversation through the in-process pipeline (mock GraphQL,
+fake LLM) twice: as before, with the caller re-sending the whole transcript
+as conversation_history on every follow-up (uncapped), and with a session id,
+where the orchestrator keeps structured turns and sends a token-capped
+digest (the flagged follow-ups are answered from the first turn's data). Reports the estimated prompt tokens per turn for both. Then checks
+the session stores: memory and SQLite return the same turns and digests,
+turns are capped per session, the LRU evicts and idle sessions expire, SQLite
+sessions survive a new store on the same file and concurrent appends are not
+lost. Exits non-zero on any mismatch or if the session prompt grows with the
+conversation.
+
+Usage:
+    python benchmarks/bench_session_history.py --turns 120 --budget 300
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from bench_pipeline_modes import QUESTIONS
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+REPORT_TURNS = (1, 2, 5, 10, 25, 50, 100, 200, 500)
+
+
+def run_conversation(orchestrator, executor, turns, session_id=None):
+    """Prompt tokens per turn; without a session id the transcript is re-sent in full."""
+    tokens, transcript = [], ""
+    for turn in range(turns):
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        followup = turn > 0
+        if session_id:
+            response = orchestrator.run_pipeline(question, executor, use_cache=False,
+                                                 session_id=session_id, is_followup=followup)
+        else:
+            _, state = orchestrator.classify_and_fetch(question, executor)
+            response = executor.respond(orchestrator.response_request(question, state, False, transcript, followup))
+            transcript += f"User: {question}\nAssistant: {response['response']}\n"
+        tokens.append(response["prompt_tokens"])
+    return tokens
+
+
+def check_stores(session_store, db_path, problems):
+    turns = [session_store.make_turn(f"question {i} about demand", {
+        "endpoint": "demandByFulfillmentHistogram" if i % 2 else "demandByFulfillmentDonut",
+        "extraction_type": "average" if i % 2 else "total",
+        "date_range": {"from": "2025-01-01T00:00:00Z", "until": "2025-12-31T23:59:59Z"} if i % 3 == 0 else None,
+    }, {"quantity": i * 1000, "formatted_value": f"{i * 1000:,} units"}) for i in range(30)]
+
+    memory = session_store.MemorySessionStore(maxsize=4, ttl=60, max_turns=20)
+    sqlite = session_store.SQLiteSessionStore(db_path, ttl=60, max_turns=20)
+    timings = {}
+    for store in (memory, sqlite):
+        start = time.perf_counter()
+        for turn in turns:
+            store.append("chat", turn)
+            session_store.history_digest(store.turns("chat"))
+        timings[store.backend] = (time.perf_counter() - start) * 1e6 / len(turns)
+    if memory.turns("chat") != turns[-20:] or sqlite.turns("chat") != turns[-20:]:
+        problems.append("stores: a session does not keep exactly its last max_turns turns")
+    if session_store.history_digest(memory.turns("chat")) != session_store.history_digest(sqlite.turns("chat")):
+        problems.append("stores: memory and SQLite digests differ")
+
+    for i in range(5):
+        memory.append(f"other-{i}", turns[0])
+    if memory.turns("chat") or len(memory) != 4:
+        problems.append("memory: the least recently used session was not evicted")
+
+    reopened = session_store.SQLiteSessionStore(db_path, ttl=60, max_turns=20)
+    if reopened.turns("chat") != turns[-20:]:
+        problems.append("sqlite: turns did not survive reopening the file")
+
+    short_memory = session_store.MemorySessionStore(ttl=0.05)
+    short_sqlite = session_store.SQLiteSessionStore(db_path, ttl=0.05)
+    for store in (short_memory, short_sqlite):
+        store.append("idle", turns[0])
+    time.sleep(0.1)
+    if short_memory.turns("idle") or short_sqlite.turns("idle"):
+        problems.append("stores: an idle session did not expire")
+
+    concurrent = session_store.SQLiteSessionStore(db_path, ttl=60, max_turns=1000)
+    stores = [concurrent, session_store.SQLiteSessionStore(db_path, ttl=60, max_turns=1000)]
+
+    def writer(index):
+        for turn in turns[:25]:
+            stores[index % 2].append("shared", dict(turn, writer=index))
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if len(concurrent.turns("shared")) != 8 * 25:
+        problems.append(f"sqlite: {len(concurrent.turns('shared'))} of {8 * 25} concurrent appends kept")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=120)
+    parser.add_argument("--budget", type=int, default=300, help="SESSION_HISTORY_TOKEN_BUDGET")
+    args = parser.parse_args()
+
+    problems = []
+    with serve_mock_graphql() as server, contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GRAPHQL_URL"] = server.url
+        os.environ["SESSION_HISTORY_TOKEN_BUDGET"] = str(args.budget)
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        import lambda_function as orchestrator  # also puts lambda/shared on sys.path
+        import llm_backend
+        import session_store
+        import stage_executors
+        from token_estimate import estimate_tokens
+
+        llm_backend.set_llm_backend(llm_backend.FakeBackend(tokens=250))
+        executor = stage_executors.InProcessStageExecutor()
+        # The old behaviour: whatever the caller sends goes into the prompt
+        executor.response_module.CONVERSATION_HISTORY_TOKEN_BUDGET = 10 ** 9
+        transcript = run_conversation(orchestrator, executor, args.turns)
+        executor.response_module.CONVERSATION_HISTORY_TOKEN_BUDGET = args.budget
+
+        session_id = session_store.new_session_id()
+        start = time.perf_counter()
+        session = run_conversation(orchestrator, executor, args.turns, session_id)
+        session_ms = (time.perf_counter() - start) * 1000 / args.turns
+        digest = session_store.history_digest(session_store.get_session_store().turns(session_id))
+        if estimate_tokens(digest) > args.budget:
+            problems.append(f"digest is {estimate_tokens(digest)} tokens, budget {args.budget}")
+
+        timings = check_stores(session_store, os.path.join(tempfile.mkdtemp(), "sessions.sqlite3"), problems)
+
+    print(f"estimated prompt tokens per turn ({args.turns}-turn conversation, history budget {args.budget})")
+    print(f"{'turn':>6} {'transcript':>11} {'session':>8}")
+    for turn in REPORT_TURNS:
+        if turn <= args.turns:
+            print(f"{turn:>6} {transcript[turn - 1]:>11} {session[turn - 1]:>8}")
+    print(f"total  {sum(transcript):>11} {sum(session):>8}")
+    print(f"\nsession pipeline: {session_ms:.2f} ms per turn; store append + digest per turn: "
+          + ", ".join(f"{backend} {us:.0f} us" for backend, us in timings.items()))
+
+    # Once the digest fills its budget, the same question costs the same however long the chat:
+    # compare a cycle of questions half-way through with the last full cycle
+    cycle = len(QUESTIONS)
+    middle, last = (args.turns // 2) // cycle * cycle, (args.turns - cycle) // cycle * cycle
+    growth = sum(session[last:last + cycle]) / max(1, sum(session[middle:middle + cycle])) - 1
+    if args.turns >= cycle * 4 and growth > 0.02:
+        problems.append(f"session prompts grew {growth:.1%} between turn {middle + 1} and turn {last + 1}")
+    if args.turns >= cycle * 4 and statistics.mean(session[-cycle:]) >= statistics.mean(transcript[-cycle:]):
+        problems.append("session prompts are not smaller than re-sent transcripts")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("Session prompts stay within the history budget; memory and SQLite stores agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark + check: speculative GraphQL prefetch in the orchestrator.
+
+Runs undated and dated questions through run_pipeline() with both stage
+executors and each SPECULATIVE_PREFETCH mode against the mock GraphQL server
+(GraphQL cache off), and reports the prefetch status and the GraphQL
+requests beyond the "off" run of the same question. Checks that an undated
+question is a hit with no extra request in in-process "likely" mode, that a
+question naming a date or period is never speculated on, and that remote
+"likely" mode (no keyword guess in the orchestrator) skips speculation
+instead of fetching both endpoints. Exits non-zero on any mismatch.
+
+Usage:
+    python benchmarks/bench_speculative_prefetch.py
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from bench_pipeline_modes import LocalLambdaClient
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+UNDATED = ["What is my total demand?", "Which month has the highest demand?"]
+DATED = [
+    "What was my total demand in March 2025?",
+    "Show me demand from Dec 25 to May 26",
+    "How much demand is overdue for the next 6 months?",
+]
+MODES = ["off", "likely", "all"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graphql-latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    os.environ.pop("GROQ_API_KEY", None)
+    os.environ["GRAPHQL_CACHE_SIZE"] = "0"
+
+    problems = []
+    rows = []
+    with serve_mock_graphql(latency_ms=args.graphql_latency_ms) as server, \
+            contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        from lambda_function import run_pipeline  # also puts lambda/shared on sys.path
+        import speculative_prefetch
+        import stage_executors
+
+        inprocess = stage_executors.InProcessStageExecutor()
+        remote = stage_executors.RemoteStageExecutor(lambda_client=LocalLambdaClient({
+            stage_executors.INTENT_CLASSIFIER_FUNCTION: inprocess.intent_module.lambda_handler,
+            stage_executors.GRAPHQL_CLIENT_FUNCTION: inprocess.graphql_module.lambda_handler,
+            stage_executors.RESPONSE_GENERATOR_FUNCTION: inprocess.response_module.lambda_handler,
+        }))
+
+        for executor in (inprocess, remote):
+            for question in UNDATED + DATED:
+                baseline = None
+                for mode in MODES:
+                    speculative_prefetch.SPECULATIVE_PREFETCH = mode
+                    before = server.service.requests
+                    start = time.perf_counter()
+                    response = run_pipeline(question, executor, use_cache=False)
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    # A discarded speculative fetch may still be in flight
+                    time.sleep(args.graphql_latency_ms * 3 / 1000)
+                    requests = server.service.requests - before
+                    baseline = requests if baseline is None else baseline
+                    status = response["processing_steps"]["speculative_prefetch"]
+                    rows.append((executor.mode, mode, question, status, requests - baseline, elapsed_ms))
+
+                    if mode == "off":
+                        expected = "off"
+                    elif question in DATED:
+                        expected = "skipped"
+                    elif mode == "likely" and executor is remote:
+                        expected = "skipped"
+                    else:
+                        expected = "hit"
+                    if status != expected:
+                        problems.append(f"{executor.mode}/{mode} {question!r}: prefetch {status}, expected {expected}")
+                    # "all" may also fetch the other endpoint; everything else must not add a request
+                    if mode != "all" and requests > baseline:
+                        problems.append(f"{executor.mode}/{mode} {question!r}: "
+                                        f"{requests - baseline} extra GraphQL requests")
+
+    print(f"{'executor':<10} {'mode':<7} {'prefetch':<9} {'extra':>5} {'ms':>7}  question")
+    for executor_mode, mode, question, status, extra, elapsed_ms in rows:
+        print(f"{executor_mode:<10} {mode:<7} {status:<9} {extra:>5} {elapsed_ms:>7.1f}  {question}")
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("Dated questions and unguessable endpoints make no speculative GraphQL requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Per-span latency breakdown of the pipeline, plus a tracing propagation check.
+
+Runs questions through run_pipeline() in both pipeline modes against the mock
+GraphQL server (remote mode through a local stand-in for the Lambda client,
+as in bench_pipeline_modes.py), each inside a trace, and prints p50/p95 per
+span. Exits non-zero if a trace is broken: spans from another trace id,
+parents that do not resolve, stages missing, or an OTLP export that does not
+round-trip.
+
+No GROQ_API_KEY is needed (the LLM stages use their fallbacks); with a key,
+the intent.llm / response.llm spans show the real Groq latency.
+
+Usage:
+    python benchmarks/bench_trace_breakdown.py --iterations 50 --export traces.jsonl
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+from bench_pipeline_modes import QUESTIONS, LocalLambdaClient, percentile
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+STAGES = {"intent_classification", "graphql_query", "response_generation"}
+
+
+def traced_run(tracing, run_pipeline, executor, question, export_path):
+    trace = tracing.start_trace("orchestrator")
+    try:
+        with tracing.span("orchestrator.request", "orchestrator", tracing.SPAN_KIND_SERVER):
+            run_pipeline(question, executor, use_cache=False)
+    finally:
+        tracing.finish_trace(trace)
+    tracing.export_trace(trace, export_path)
+    return trace
+
+
+def check_trace(trace, mode):
+    problems = []
+    timings = trace.timings()
+    span_ids = {span["span_id"] for span in timings["spans"]}
+    if any(span["trace_id"] != trace.trace_id for span in trace.spans):
+        problems.append(f"{mode}: span from another trace")
+    if any(span["parent_span_id"] and span["parent_span_id"] not in span_ids for span in timings["spans"]):
+        problems.append(f"{mode}: span parent not in trace")
+    if set(timings["stages"]) != STAGES:
+        problems.append(f"{mode}: stages {sorted(timings['stages'])}")
+    services = {span["service"] for span in timings["spans"]}
+    if not {"intent-classifier", "graphql-client", "response-generator"} <= services:
+        problems.append(f"{mode}: missing stage spans, services {sorted(services)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=40)
+    parser.add_argument("--export", help="also keep the OTLP/JSON export at this path")
+    args = parser.parse_args()
+
+    os.environ.pop("GROQ_API_KEY", None)
+    export_path = args.export or os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    durations = {}
+    problems = []
+    exported_spans = 0
+
+    with serve_mock_graphql() as server:
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        from lambda_function import run_pipeline  # also puts lambda/shared on sys.path
+        import stage_executors
+        import tracing
+
+        inprocess = stage_executors.InProcessStageExecutor()
+        remote = stage_executors.RemoteStageExecutor(lambda_client=LocalLambdaClient({
+            stage_executors.INTENT_CLASSIFIER_FUNCTION: inprocess.intent_module.lambda_handler,
+            stage_executors.GRAPHQL_CLIENT_FUNCTION: inprocess.graphql_module.lambda_handler,
+            stage_executors.RESPONSE_GENERATOR_FUNCTION: inprocess.response_module.lambda_handler,
+        }))
+
+        sink = io.StringIO()
+        with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+            for mode, executor in (("inprocess", inprocess), ("remote", remote)):
+                for i in range(args.iterations):
+                    trace = traced_run(tracing, run_pipeline, executor, QUESTIONS[i % len(QUESTIONS)], export_path)
+                    problems.extend(check_trace(trace, mode))
+                    exported_spans += len(trace.spans)
+                    for span in trace.timings()["spans"]:
+                        durations.setdefault((mode, span["name"]), []).append(span["duration_ms"])
+                    sink.seek(0)
+                    sink.truncate()
+
+    with open(export_path, encoding="utf-8") as handle:
+        requests = [json.loads(line) for line in handle]
+    if not args.export:
+        os.remove(export_path)
+    otlp_spans = sum(
+        len(scope["spans"]) for request in requests for resource in request["resourceSpans"] for scope in resource["scopeSpans"]
+    )
+    if otlp_spans != exported_spans:
+        problems.append(f"OTLP export has {otlp_spans} spans, recorded {exported_spans}")
+
+    print(f"{args.iterations} questions per mode (durations in ms)")
+    print(f"{'mode':<10} {'span':<26} {'count':>6} {'p50':>8} {'p95':>8}")
+    for (mode, name), samples in sorted(durations.items()):
+        print(f"{mode:<10} {name:<26} {len(samples):>6} {percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f}")
+
+    if problems:
+        print("FAILED:\n  " + "\n  ".join(sorted(set(problems))))
+        sys.exit(1)
+    print(f"\nAll traces connected; {len(requests)} OTLP export lines, {otlp_spans} spans")
+
+
+if __name__ == "__main__":
+    main()
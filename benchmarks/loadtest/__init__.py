@@ -0,0 +1,22 @@
+"""
+End-to-end load test of the orchestrator pipeline with a regression gate.
+
+Drives run_pipeline() at a fixed concurrency against the mock GraphQL server
+and an offline LLM backend (the fake from lambda/shared/llm_backend.py by
+default), with a question mix drawn from knowledge-graph.json
+sampleQuestions. Reports latency percentiles, throughput and a per-stage
+breakdown from the pipeline's traces, saves the report as a JSON baseline
+and compares later runs against it.
+
+Usage (from the repository root):
+    python -m benchmarks.loadtest --concurrency 8 --requests 400 --save baseline.json
+    python -m benchmarks.loadtest --concurrency 8 --requests 400 --baseline baseline.json --tolerance 0.2
+"""
+
+import os
+import sys
+
+# The shared benchmark helpers (mock_server, bench_pipeline_modes) live one level up
+BENCHMARKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
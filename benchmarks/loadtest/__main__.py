@@ -0,0 +1,141 @@
+"""
+Command line entry point: python -m benchmarks.loadtest --help
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+
+from . import __doc__ as PACKAGE_DOC
+from .questions import load_questions, parse_mix, question_stream
+from .report import compare, format_report, load_report, save_report, summarize
+from .runner import run_load
+
+from bench_pipeline_modes import LocalLambdaClient
+from mock_server import LAMBDA_ROOT, serve_mock_graphql
+
+
+class NullWriter:
+    """Discards the pipeline's log lines (they are still formatted)."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def build_executor(stage_executors, mode, invoke_latency_ms):
+    inprocess = stage_executors.InProcessStageExecutor()
+    if mode == "inprocess":
+        return inprocess
+    return stage_executors.RemoteStageExecutor(lambda_client=LocalLambdaClient({
+        stage_executors.INTENT_CLASSIFIER_FUNCTION: inprocess.intent_module.lambda_handler,
+        stage_executors.GRAPHQL_CLIENT_FUNCTION: inprocess.graphql_module.lambda_handler,
+        stage_executors.RESPONSE_GENERATOR_FUNCTION: inprocess.response_module.lambda_handler,
+    }, invoke_latency_s=invoke_latency_ms / 1000.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=PACKAGE_DOC,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=None, help="untimed requests first (default: 2 x concurrency)")
+    parser.add_argument("--mode", choices=("inprocess", "remote"), default="inprocess",
+                        help="stage executor; remote goes through a local stand-in for the Lambda client")
+    parser.add_argument("--invoke-latency-ms", type=float, default=0.0, help="simulated invoke round-trip per hop (remote)")
+    parser.add_argument("--mix", help="endpoint weights, e.g. demandByFulfillmentDonut=3,demandByFulfillmentHistogram=1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--use-cache", action="store_true", help="let repeated questions hit the answer cache")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="let concurrent identical questions share one pipeline run (request coalescing)")
+    parser.add_argument("--llm", choices=("fake", "env"), default="fake",
+                        help="fake: simulated LLM (options below); env: the backend configured by LLM_BACKEND")
+    parser.add_argument("--llm-first-token-ms", type=float, default=150.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--llm-tokens", type=int, default=80)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--graphql-latency-ms", type=float, default=0.0, help="latency the mock GraphQL server adds")
+    parser.add_argument("--graphql-jitter-ms", type=float, default=0.0, help="uniform jitter on top of it")
+    parser.add_argument("--graphql-error-rate", type=float, default=0.0, help="fraction of GraphQL requests answered 503")
+    parser.add_argument("--save", help="write the report to this JSON file (a new baseline)")
+    parser.add_argument("--baseline", help="compare against this JSON report and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown as a fraction (default 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                        help="ignore slowdowns smaller than this, however large relative to the baseline")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    questions = load_questions(mix=mix)
+    if args.llm == "fake":
+        llm = (f"fake first_token={args.llm_first_token_ms}ms token={args.llm_token_ms}ms "
+               f"tokens={args.llm_tokens} failure_rate={args.llm_failure_rate}")
+    else:
+        llm = os.environ.get("LLM_BACKEND", "groq")
+    config = {
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "invoke_latency_ms": args.invoke_latency_ms if args.mode == "remote" else 0.0,
+        "mix": mix or "uniform",
+        "questions": len(questions),
+        "seed": args.seed,
+        "use_cache": args.use_cache,
+        "llm": llm,
+        "graphql": {"latency_ms": args.graphql_latency_ms, "jitter_ms": args.graphql_jitter_ms,
+                    "error_rate": args.graphql_error_rate},
+    }
+    if args.coalesce:
+        # Only present when on, so baselines recorded before coalescing existed still gate
+        config["coalesce"] = True
+
+    with serve_mock_graphql(latency_ms=args.graphql_latency_ms, jitter_ms=args.graphql_jitter_ms,
+                            error_rate=args.graphql_error_rate, seed=args.seed) as server:
+        os.environ["GRAPHQL_URL"] = server.url
+        sys.path.insert(0, os.path.join(LAMBDA_ROOT, "orchestrator"))
+        from lambda_function import run_pipeline  # also puts lambda/shared on sys.path
+        import llm_backend
+        import request_coalescing
+        import stage_executors
+        import tracing
+
+        if args.llm == "fake":
+            llm_backend.set_llm_backend(llm_backend.FakeBackend(
+                first_token_ms=args.llm_first_token_ms, token_ms=args.llm_token_ms,
+                tokens=args.llm_tokens, failure_rate=args.llm_failure_rate, seed=args.seed,
+            ))
+        request_coalescing.REQUEST_COALESCING = args.coalesce
+        executor = build_executor(stage_executors, args.mode, args.invoke_latency_ms)
+
+        stream = question_stream(questions, args.seed)
+        warmup = args.concurrency * 2 if args.warmup is None else args.warmup
+        with contextlib.redirect_stdout(NullWriter()):
+            if warmup:
+                run_load(run_pipeline, executor, tracing, stream, args.concurrency, warmup, args.use_cache)
+            samples, wall_s = run_load(run_pipeline, executor, tracing, stream, args.concurrency,
+                                       args.requests, args.use_cache)
+
+    report = summarize(samples, wall_s, config)
+    print(format_report(report))
+    if args.save:
+        save_report(report, args.save)
+        print(f"\nReport saved to {args.save}")
+
+    failures = []
+    if report["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {report['error_rate']:.2%} above {args.max_error_rate:.2%}")
+    if args.baseline:
+        failures += compare(report, load_report(args.baseline), args.tolerance, args.min_delta_ms)
+    if failures:
+        print("\nREGRESSION:\n  " + "\n  ".join(failures))
+        return 1
+    if args.baseline:
+        print(f"\nNo regression against {args.baseline} (tolerance {args.tolerance:.0%}, min delta {args.min_delta_ms} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Question mix for the load test, from knowledge-graph.json sampleQuestions.
+"""
+
+import json
+import os
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mock_server import REPO_ROOT
+
+KNOWLEDGE_GRAPH_PATH = os.path.join(REPO_ROOT, "config", "knowledge-graph.json")
+
+# The charts the intent classifier routes to (its ENDPOINTS); the knowledge
+# graph also describes endpoints the pipeline cannot answer yet
+PIPELINE_ENDPOINTS = ("demandByFulfillmentDonut", "demandByFulfillmentHistogram")
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """"endpointA=3,endpointB=1" -> {"endpointA": 3.0, "endpointB": 1.0}."""
+    mix = {}
+    for part in filter(None, (spec or "").split(",")):
+        endpoint, _, weight = part.partition("=")
+        mix[endpoint.strip()] = float(weight or 1)
+    return mix
+
+
+def load_questions(path: str = KNOWLEDGE_GRAPH_PATH, mix: Optional[Dict[str, float]] = None) -> List[Tuple[str, str, float]]:
+    """
+    (endpoint, question, weight) for every sample question. Without a mix
+    the questions of PIPELINE_ENDPOINTS are equally likely; with one, each
+    endpoint named gets its weight (split over its questions), including
+    endpoints the pipeline does not answer, and the rest are left out.
+    """
+    with open(path, encoding="utf-8") as handle:
+        endpoints = json.load(handle)["endpoints"]
+    unknown = set(mix or {}) - set(endpoints)
+    if unknown:
+        raise ValueError(f"unknown endpoints in mix: {sorted(unknown)} (have {sorted(endpoints)})")
+
+    questions = []
+    for endpoint, spec in endpoints.items():
+        samples = spec.get("sampleQuestions", [])
+        wanted = mix.get(endpoint) if mix else endpoint in PIPELINE_ENDPOINTS
+        if not samples or not wanted:
+            continue
+        weight = mix[endpoint] / len(samples) if mix else 1.0
+        questions.extend((endpoint, question, weight) for question in samples)
+    if not questions:
+        raise ValueError("question mix is empty")
+    return questions
+
+
+def question_stream(questions: List[Tuple[str, str, float]], seed: int = 0) -> Iterator[Tuple[str, str]]:
+    """Endless weighted random (endpoint, question) draws, reproducible per seed."""
+    rng = random.Random(seed)
+    weights = [weight for _, _, weight in questions]
+    while True:
+        endpoint, question, _ = rng.choices(questions, weights)[0]
+        yield endpoint, question
@@ -0,0 +1,128 @@
+"""
+Load test report: summary statistics, JSON baselines and the regression gate.
+"""
+
+import json
+import platform
+import statistics
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from bench_pipeline_modes import percentile
+
+PERCENTILES = (50, 95, 99)
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    stats = {f"p{pct}": round(percentile(samples, pct), 3) for pct in PERCENTILES}
+    stats["mean"] = round(statistics.mean(samples), 3)
+    stats["max"] = round(max(samples), 3)
+    return stats
+
+
+def summarize(samples: List[Dict[str, Any]], wall_s: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    ok = [sample for sample in samples if not sample["error"]]
+    stages: Dict[str, List[float]] = {}
+    spans: Dict[str, List[float]] = {}
+    endpoints: Dict[str, List[float]] = {}
+    for sample in ok:
+        for name, duration_ms in sample["stages"].items():
+            stages.setdefault(name, []).append(duration_ms)
+        for name, duration_ms in sample["spans"]:
+            spans.setdefault(name, []).append(duration_ms)
+        endpoints.setdefault(sample["endpoint"], []).append(sample["latency_ms"])
+    errors: Dict[str, int] = {}
+    for sample in samples:
+        if sample["error"]:
+            errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": config,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0,
+        "error_messages": errors,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(samples) / wall_s, 2) if wall_s else 0.0,
+        "coalesced": sum(1 for sample in ok if sample.get("coalesced")),
+        "latency_ms": latency_stats([sample["latency_ms"] for sample in ok]),
+        "stages": {name: latency_stats(values) for name, values in sorted(stages.items())},
+        "spans": {name: dict(latency_stats(values), count=len(values)) for name, values in sorted(spans.items())},
+        "by_endpoint": {name: dict(latency_stats(values), count=len(values)) for name, values in sorted(endpoints.items())},
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    config = report["config"]
+    lines = [
+        f"{report['requests']} requests, concurrency {config['concurrency']}, {config['mode']} mode, "
+        f"LLM {config['llm']}",
+        f"throughput {report['throughput_rps']:.1f} req/s, errors {report['errors']} ({report['error_rate']:.1%})"
+        + (f", coalesced {report['coalesced']}" if config.get("coalesce") else ""),
+        "",
+        f"{'latency ms':<32} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9}",
+    ]
+
+    def row(label, stats):
+        return (f"{label:<32} {stats.get('p50', 0):>9.2f} {stats.get('p95', 0):>9.2f} "
+                f"{stats.get('p99', 0):>9.2f} {stats.get('mean', 0):>9.2f}")
+
+    lines.append(row("end to end", report["latency_ms"]))
+    for name, stats in report["stages"].items():
+        lines.append(row(f"  stage {name}", stats))
+    for name, stats in report["by_endpoint"].items():
+        lines.append(row(f"  {name}", stats))
+    lines.append("")
+    lines.append(f"{'span':<32} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9}")
+    for name, stats in report["spans"].items():
+        lines.append(row(name, stats))
+    for message, count in report["error_messages"].items():
+        lines.append(f"error x{count}: {message}")
+    return "\n".join(lines)
+
+
+def save_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+        handle.write("\n")
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Regressions of report against baseline: an end-to-end percentile or a
+    stage p95 more than `tolerance` (fraction) and `min_delta_ms` slower,
+    throughput more than `tolerance` lower, or a higher error rate. Runs
+    with a different load configuration are not comparable and fail.
+    """
+    if report["config"] != baseline["config"]:
+        differing = sorted(key for key in set(report["config"]) | set(baseline["config"])
+                           if report["config"].get(key) != baseline["config"].get(key))
+        return [f"baseline was recorded with a different configuration ({', '.join(differing)})"]
+
+    regressions = []
+
+    def check(label, current, base):
+        if current is None or base is None:
+            return
+        if current > base * (1 + tolerance) and current - base > min_delta_ms:
+            regressions.append(f"{label}: {current:.2f} ms vs baseline {base:.2f} ms (+{(current / base - 1) if base else float('inf'):.0%})")
+
+    for pct in PERCENTILES:
+        check(f"end to end p{pct}", report["latency_ms"].get(f"p{pct}"), baseline["latency_ms"].get(f"p{pct}"))
+    for name, stats in baseline["stages"].items():
+        check(f"stage {name} p95", report["stages"].get(name, {}).get("p95"), stats.get("p95"))
+
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput: {report['throughput_rps']:.1f} req/s vs baseline {baseline['throughput_rps']:.1f} req/s")
+    if report["error_rate"] > baseline["error_rate"]:
+        regressions.append(f"error rate: {report['error_rate']:.2%} vs baseline {baseline['error_rate']:.2%}")
+    return regressions
@@ -0,0 +1,61 @@
+"""
+Closed-loop load generator: `concurrency` workers each send the next question
+as soon as their previous one is answered, until `requests` are done.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+
+def timed_request(run_pipeline: Callable, executor: Any, tracing: Any, endpoint: str, question: str,
+                  use_cache: bool) -> Dict[str, Any]:
+    """One traced question: latency, stage durations and every span."""
+    trace = tracing.start_trace("orchestrator")
+    error = None
+    response = {}
+    start = time.perf_counter()
+    try:
+        with tracing.span("orchestrator.request", "orchestrator", tracing.SPAN_KIND_SERVER):
+            response = run_pipeline(question, executor, use_cache=use_cache)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        latency_ms = (time.perf_counter() - start) * 1000
+        tracing.finish_trace(trace)
+    timings = trace.timings()
+    return {
+        "endpoint": endpoint,
+        "question": question,
+        "latency_ms": latency_ms,
+        "stages": timings["stages"],
+        "spans": [(span["name"], span["duration_ms"]) for span in timings["spans"]],
+        "error": error,
+        "coalesced": bool(response.get("coalesced")),
+    }
+
+
+def run_load(run_pipeline: Callable, executor: Any, tracing: Any, questions: Iterator[Tuple[str, str]],
+             concurrency: int, requests: int, use_cache: bool = False) -> Tuple[List[Dict[str, Any]], float]:
+    """Returns the per-request samples (completion order) and the wall time in seconds."""
+    lock = threading.Lock()
+    remaining = [requests]
+    samples: List[Dict[str, Any]] = []
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                endpoint, question = next(questions)
+            sample = timed_request(run_pipeline, executor, tracing, endpoint, question, use_cache)
+            with lock:
+                samples.append(sample)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadtest") as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - start
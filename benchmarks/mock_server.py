@@ -0,0 +1,50 @@
+"""
+Local HTTP server around the mock GraphQL endpoint (lambda/mock-graphql).
+
+Used by the benchmark scripts so the GraphQL client can be exercised over a
+real socket without access to the FactoryTwin API.
+"""
+
+import contextlib
+import importlib.util
+import os
+import sys
+import threading
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LAMBDA_ROOT = os.path.join(REPO_ROOT, "lambda")
+MOCK_GRAPHQL_DIR = os.path.join(LAMBDA_ROOT, "mock-graphql")
+
+# The mock's helper modules (mock_service, http_server, ...) have unique names
+if MOCK_GRAPHQL_DIR not in sys.path:
+    sys.path.append(MOCK_GRAPHQL_DIR)
+
+
+def load_mock_graphql():
+    """Import lambda/mock-graphql/lambda_function.py under its own module name."""
+    spec = importlib.util.spec_from_file_location(
+        "factorytwin_mock_graphql", os.path.join(MOCK_GRAPHQL_DIR, "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def serve_mock_graphql(port=0, service=None, **options):
+    """
+    Run the mock GraphQL server on localhost; yields the server (server.url,
+    server.service, server.connection_count). options (latency_ms,
+    jitter_ms, error_rate, ...) configure a MockService when none is given.
+    """
+    from http_server import make_server
+    from mock_service import MockService
+
+    server = make_server("127.0.0.1", port, service or MockService.from_env(**options))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
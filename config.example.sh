@@ -12,6 +12,10 @@ export SIMULATION_ID="your-simulation-id-here"
 export GROQ_API_KEY="your-groq-api-key-here"
 export GROQ_MODEL="llama-3.3-70b-versatile"
 
+# Optional: offline LLM backend (groq, replay or fake), see README
+# export LLM_BACKEND="replay"
+# export LLM_RECORDINGS_DIR="llm_recordings"
+
 # Optional: Authentication token for GraphQL
 # export AUTH_TOKEN="your-token-here"
 
@@ -1,10 +1,16 @@
 // FactoryTwin AI Frontend
 const API_URL = 'http://localhost:5001/query';
+// Server-Sent Events endpoint: the chart arrives first, then the answer token by token.
+// Set USE_STREAMING to false to wait for the complete JSON response instead.
+const STREAM_URL = 'http://localhost:5001/query/stream';
+const USE_STREAMING = true;
 
 let currentChart = null;
 
 // Initialize
 let selectedSimulationId = null;
+// Conversation session: assigned by the orchestrator on the first answer, which keeps the turns server-side
+let sessionId = null;
 let availableSimulations = [];
 
 // Auto-select first simulation when available
@@ -84,6 +90,13 @@ async function sendQuestion() {
         if (selectedSimulationId) {
             requestBody.simulation_id = selectedSimulationId;
         }
+        if (sessionId) {
+            requestBody.session_id = sessionId;
+        }
+
+        if (USE_STREAMING && await streamQuestion(requestBody, loadingId)) {
+            return;
+        }
 
         const response = await fetch(API_URL, {
             method: 'POST',
@@ -115,29 +128,7 @@ async function sendQuestion() {
         // Remove loading
         removeMessage(loadingId);
 
-        // Handle greeting response
-        if (data.type === 'greeting') {
-            addMessage('assistant', data.message);
-        } else if (data.type === 'acknowledgment') {
-            // Handle acknowledgment (thank you, etc.) - no visualization needed
-            addMessage('assistant', data.answer);
-            hideVisualization();
-        } else {
-            // Regular question response
-            addMessage('assistant', data.answer);
-
-            // Show visualization if chart data exists (agentic decision)
-            if (data.chart_data && data.visualization_type) {
-                showVisualization(data.chart_data, data.visualization_type, data.endpoint);
-                
-                // Show agentic decision reasoning if available
-                if (data.agentic_decision) {
-                    console.log('🤖 Agentic Decision:', data.agentic_decision);
-                }
-            } else {
-                hideVisualization();
-            }
-        }
+        renderResponse(data);
 
     } catch (error) {
         console.error('Error:', error);
@@ -151,6 +142,136 @@ async function sendQuestion() {
     }
 }
 
+// Render a complete (non-streamed) response
+function renderResponse(data) {
+    rememberSession(data);
+    // Handle greeting response
+    if (data.type === 'greeting') {
+        addMessage('assistant', data.message);
+    } else if (data.type === 'acknowledgment') {
+        // Handle acknowledgment (thank you, etc.) - no visualization needed
+        addMessage('assistant', data.answer);
+        hideVisualization();
+    } else {
+        // Regular question response
+        addMessage('assistant', data.answer);
+
+        // Show visualization if chart data exists (agentic decision)
+        if (data.chart_data && data.visualization_type) {
+            showVisualization(data.chart_data, data.visualization_type, data.endpoint);
+            
+            // Show agentic decision reasoning if available
+            if (data.agentic_decision) {
+                console.log('🤖 Agentic Decision:', data.agentic_decision);
+            }
+        } else {
+            hideVisualization();
+        }
+    }
+}
+
+// Keep the session id the orchestrator assigned, so later questions continue the conversation
+function rememberSession(data) {
+    if (data && data.session_id) {
+        sessionId = data.session_id;
+    }
+}
+
+// Parse one Server-Sent Event frame ("event: name" + "data: json" lines)
+function parseSseEvent(frame) {
+    let event = 'message';
+    const dataLines = [];
+    frame.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            dataLines.push(line.slice(5).trim());
+        }
+    });
+    return { event, data: dataLines.length ? JSON.parse(dataLines.join('\n')) : null };
+}
+
+// Stream the answer: show the chart as soon as it arrives, then append text chunks.
+// Returns false if the server has no streaming endpoint, so the caller can fall back.
+async function streamQuestion(requestBody, loadingId) {
+    const response = await fetch(STREAM_URL, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(requestBody),
+    });
+
+    if (response.status === 404 || !response.body) {
+        return false;
+    }
+    if (!response.ok) {
+        let errorMessage = `Server error: ${response.status}`;
+        try {
+            const errorData = await response.json();
+            errorMessage = errorData.message || errorData.error || errorMessage;
+        } catch (e) {
+            // Not JSON
+        }
+        throw new Error(errorMessage);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let messageId = null;
+    let answerText = '';
+
+    const appendText = (text) => {
+        if (!messageId) {
+            removeMessage(loadingId);
+            messageId = addMessage('assistant', '');
+        }
+        answerText += text;
+        const textDiv = document.querySelector(`#${messageId} .message-text`);
+        textDiv.textContent = answerText;
+        const messagesContainer = document.getElementById('chatMessages');
+        messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const { event, data } = parseSseEvent(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+
+            if (event === 'chart') {
+                if (data.chart_data && data.visualization_type) {
+                    showVisualization(data.chart_data, data.visualization_type, data.endpoint);
+                }
+            } else if (event === 'token') {
+                appendText(data.text);
+            } else if (event === 'done') {
+                rememberSession(data);
+                if (messageId && data.answer) {
+                    // Replace the streamed text with the final, trimmed answer
+                    answerText = '';
+                    appendText(data.answer);
+                } else {
+                    removeMessage(loadingId);
+                    renderResponse(data);
+                }
+            } else if (event === 'error') {
+                throw new Error(data.message || data.error || 'Streaming failed');
+            }
+        }
+    }
+
+    removeMessage(loadingId);
+    return true;
+}
+
 // Add message to chat
 function addMessage(sender, text, isError = false) {
     const messagesContainer = document.getElementById('chatMessages');
@@ -0,0 +1,144 @@
+"""
+Incremental month-bucket fetch planner for histogram queries
+
+Purpose: Lets a histogram request reuse the buckets it shares with earlier
+requests, so widening a range ("now extend that to July 2026") fetches only
+the new months instead of the whole series.
+
+A histogram request is a list of periodBoundaries; each consecutive pair
+(boundaries[i], boundaries[i + 1]) is one bucket. Fetched buckets are cached
+per (scope, start, end), where scope is (server, simulation, sites, buffer).
+A bucket ending at a month's last second (23:59:59, the classifier's
+"until" convention) shares its key with the one ending at the next month
+start, so "Jan-Mar" and "Jan-Jun" reuse the same March bucket.
+For a new request the planner:
+1. looks up every bucket in the store
+2. groups the missing buckets into contiguous spans
+3. fetches all spans in one GraphQL document (one aliased histogram field per span)
+4. stitches cached and fetched buckets back into request order
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from histogram_index import month_aligned_range, month_from_index, month_index, month_start, parse_instant
+from ttl_cache import TTLCache
+
+Bucket = Tuple[str, str]  # (start boundary, end boundary)
+Span = Tuple[int, int]  # bucket indexes [start, end)
+
+HISTOGRAM_FIELDS = """startDate
+                        stackDataList {
+                            name
+                            quantity
+                            value
+                        }"""
+
+
+def period_buckets(boundaries: List[str]) -> List[Bucket]:
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def bucket_key(bucket: Bucket) -> Bucket:
+    """Store key for a bucket; whole-month buckets always end at the next month start."""
+    months = month_aligned_range({"from": bucket[0], "until": bucket[1]})
+    if months is None or months[0] != months[1]:
+        return bucket
+    return month_start(months[0]), month_start(month_from_index(month_index(months[1]) + 1))
+
+
+def missing_spans(cached: List[Optional[Dict[str, Any]]]) -> List[Span]:
+    """Contiguous runs of missing (None) buckets as [start, end) index pairs."""
+    spans = []
+    start = None
+    for i, period in enumerate(cached):
+        if period is None and start is None:
+            start = i
+        elif period is not None and start is not None:
+            spans.append((start, i))
+            start = None
+    if start is not None:
+        spans.append((start, len(cached)))
+    return spans
+
+
+def span_boundaries(boundaries: List[str], span: Span) -> List[str]:
+    """periodBoundaries for the buckets in span (n buckets need n + 1 boundaries)."""
+    return boundaries[span[0]:span[1] + 1]
+
+
+def build_span_query(span_count: int, fields: str = HISTOGRAM_FIELDS) -> str:
+    """One histogram document with an aliased chart field (h0, h1, ...) per span, selecting fields."""
+    span_definitions = ", ".join(f"$pb{i}: [Instant!]!" for i in range(span_count))
+    fields = "\n".join(
+        f"""                    h{i}: demandByFulfillmentHistogram(
+                        periodBoundaries: $pb{i}
+                        sites: $sites
+                        onTimeDeliveryBuffer: $buffer
+                    ) {{
+                        {fields}
+                    }}"""
+        for i in range(span_count)
+    )
+    return f"""
+        query HistogramSpans($simulationId: UUID!, $sites: [UUID!]!, $buffer: Float!, {span_definitions}) {{
+            simulation(identifier: $simulationId) {{
+                charts {{
+{fields}
+                }}
+            }}
+        }}
+    """
+
+
+def periods_match(buckets: List[Bucket], periods: Any) -> bool:
+    """
+    True when the server returned exactly one period per bucket, in order.
+    Anything else (extra trailing period, different start dates) cannot be
+    mapped to buckets and is not cached.
+    """
+    if not isinstance(periods, list) or len(periods) != len(buckets):
+        return False
+    try:
+        return all(
+            parse_instant(period.get("startDate")) == parse_instant(start)
+            for (start, _), period in zip(buckets, periods)
+        )
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
+class HistogramBucketStore:
+    """TTL + LRU cache of histogram periods keyed by (scope, bucket)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.buckets_reused = 0
+        self.buckets_fetched = 0
+        self.span_requests = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled
+
+    def lookup(self, scope: Any, buckets: List[Bucket]) -> List[Optional[Dict[str, Any]]]:
+        return [self.cache.get((scope, bucket_key(bucket))) for bucket in buckets]
+
+    def store(self, scope: Any, buckets: List[Bucket], periods: List[Dict[str, Any]]) -> None:
+        for bucket, period in zip(buckets, periods):
+            self.cache.set((scope, bucket_key(bucket)), period)
+
+    def record(self, reused: int, fetched: int, requests: int) -> None:
+        with self._lock:
+            self.buckets_reused += reused
+            self.buckets_fetched += fetched
+            self.span_requests += requests
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self.cache.stats(),
+            buckets_reused=self.buckets_reused,
+            buckets_fetched=self.buckets_fetched,
+            span_requests=self.span_requests,
+        )
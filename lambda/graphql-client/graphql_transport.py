@@ -0,0 +1,155 @@
+"""
+Pooled HTTP transport for the GraphQL Client
+
+Purpose: Replaces one-off requests.post() calls with a module-scoped
+requests.Session, so TCP/TLS connections are kept alive and reused across
+queries and across warm Lambda invocations.
+
+- connection pool sized by GRAPHQL_POOL_SIZE
+- gzip/deflate accepted on every response
+- bounded retries (GRAPHQL_MAX_RETRIES) with full-jitter exponential backoff
+  on connection errors, timeouts and 5xx responses
+- per-attempt timing metrics (latest request in last_attempts, totals in stats())
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from structured_log import get_logger
+
+log = get_logger("graphql-client")
+
+RETRYABLE_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+
+class GraphQLTransport:
+    """Keep-alive HTTP transport with retries and per-attempt metrics."""
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        timeout: float = 30.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        # Retries are handled below so that every attempt is timed
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.total_attempt_ms = 0.0
+
+    @property
+    def last_attempts(self) -> List[Dict[str, Any]]:
+        """Attempt metrics of the calling thread's most recent post()."""
+        return getattr(self._local, "attempts", [])
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        POST a JSON payload, retrying connection errors, timeouts and 5xx
+        responses. Returns the last response (which may still be a 5xx) or
+        raises the last connection error.
+        """
+        attempts = []
+        self._local.attempts = attempts
+        with self._lock:
+            self.requests += 1
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+                error = None
+            except RETRYABLE_EXCEPTIONS as e:
+                response = None
+                error = e
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            attempts.append({
+                "attempt": attempt + 1,
+                "status": response.status_code if response is not None else None,
+                "elapsed_ms": round(elapsed_ms, 2),
+                "error": type(error).__name__ if error else None,
+            })
+            with self._lock:
+                self.attempts += 1
+                self.total_attempt_ms += elapsed_ms
+
+            retryable = error is not None or response.status_code >= 500
+            if not retryable or attempt == self.max_retries:
+                break
+
+            delay = self._backoff(attempt)
+            log.warning("graphql_retry", attempt=attempt + 1, error=(str(error) or None) if error else None,
+                        status=getattr(response, "status_code", None), delay_s=round(delay, 2))
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+
+        if error is not None:
+            with self._lock:
+                self.failures += 1
+            raise error
+        return response
+
+    def connections_opened(self) -> int:
+        """Number of TCP connections opened by the pool so far."""
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "avg_attempt_ms": round(self.total_attempt_ms / self.attempts, 2) if self.attempts else 0.0,
+            "connections_opened": self.connections_opened(),
+        }
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> GraphQLTransport:
+    """Module-scoped transport, created on first use and reused by warm invocations."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = GraphQLTransport(
+                    pool_size=int(os.environ.get("GRAPHQL_POOL_SIZE", "10")),
+                    max_retries=int(os.environ.get("GRAPHQL_MAX_RETRIES", "2")),
+                    backoff_base=float(os.environ.get("GRAPHQL_BACKOFF_BASE_SECONDS", "0.2")),
+                    backoff_max=float(os.environ.get("GRAPHQL_BACKOFF_MAX_SECONDS", "2.0")),
+                    timeout=float(os.environ.get("GRAPHQL_TIMEOUT_SECONDS", "30")),
+                )
+    return _transport
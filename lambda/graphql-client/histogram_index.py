@@ -0,0 +1,185 @@
+"""
+Prefix-sum range index over monthly histogram buckets
+
+Purpose: Answers month-aligned range totals and donut-equivalent breakdowns
+from histogram data that has already been fetched, without another GraphQL
+request.
+
+The index has one row per calendar month and one column per category
+(Firm Order, Overdue, Forecasted, ...) for both quantity and value. Row i of
+the prefix tables holds the sums over the first i months, so any range total
+is prefix[end] - prefix[start]: O(categories), independent of range length.
+"""
+
+import calendar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+Month = Tuple[int, int]  # (year, month)
+
+
+def parse_instant(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def month_of(value: str) -> Optional[Month]:
+    """(year, month) of a period startDate, or None if it is not a month start."""
+    try:
+        instant = parse_instant(value)
+    except (TypeError, ValueError):
+        return None
+    if (instant.day, instant.hour, instant.minute, instant.second) != (1, 0, 0, 0):
+        return None
+    return instant.year, instant.month
+
+
+def month_index(month: Month) -> int:
+    return month[0] * 12 + month[1] - 1
+
+
+def month_from_index(index: int) -> Month:
+    return index // 12, index % 12 + 1
+
+
+def month_start(month: Month) -> str:
+    return f"{month[0]:04d}-{month[1]:02d}-01T00:00:00Z"
+
+
+def month_aligned_range(date_range: Optional[Dict[str, Any]]) -> Optional[Tuple[Month, Month]]:
+    """
+    Return (first_month, last_month) when the range covers whole months:
+    "from" is a month start and "until" is either a month end at 23:59:59
+    (the classifier's convention) or the next month start (exclusive).
+    Returns None for missing or non-aligned ranges.
+    """
+    if not date_range or not date_range.get("from") or not date_range.get("until"):
+        return None
+    first = month_of(date_range["from"])
+    if first is None:
+        return None
+    try:
+        until = parse_instant(date_range["until"])
+    except ValueError:
+        return None
+
+    if (until.day, until.hour, until.minute, until.second) == (1, 0, 0, 0):
+        last = month_from_index(month_index((until.year, until.month)) - 1)
+    elif (until.hour, until.minute, until.second) == (23, 59, 59) and \
+            until.day == calendar.monthrange(until.year, until.month)[1]:
+        last = (until.year, until.month)
+    else:
+        return None
+    return (first, last) if month_index(last) >= month_index(first) else None
+
+
+def _closes_month(month: Month, end: str) -> bool:
+    """True when a bucket starting at month and ending at end covers the whole month."""
+    try:
+        instant = parse_instant(end)
+    except (TypeError, ValueError):
+        return False
+    if (instant.day, instant.hour, instant.minute, instant.second) == (1, 0, 0, 0):
+        return month_index((instant.year, instant.month)) == month_index(month) + 1
+    return (instant.year, instant.month) == month and (instant.hour, instant.minute, instant.second) == (23, 59, 59) \
+        and instant.day == calendar.monthrange(instant.year, instant.month)[1]
+
+
+def full_month_periods(periods: List[Dict[str, Any]], boundaries: Optional[List[str]] = None) -> List[Tuple[Month, Dict[str, Any]]]:
+    """
+    (month, period) pairs for the periods that cover exactly one whole month.
+    With the request's periodBoundaries, period i spans boundaries[i] to
+    boundaries[i + 1]; without them (or if the counts disagree) a period is
+    only trusted when the next period starts at the following month, so a
+    trailing partial bucket is never treated as a full month.
+    """
+    periods = periods or []
+    result = []
+    if boundaries and len(boundaries) == len(periods) + 1:
+        for period, end in zip(periods, boundaries[1:]):
+            month = month_of(period.get("startDate"))
+            if month is not None and _closes_month(month, end):
+                result.append((month, period))
+        return result
+    for period, following in zip(periods, periods[1:]):
+        month = month_of(period.get("startDate"))
+        if month is not None and _closes_month(month, following.get("startDate")):
+            result.append((month, period))
+    return result
+
+
+class MonthlyRangeIndex:
+    """Prefix sums of quantity and value per category over a run of months."""
+
+    def __init__(self, periods: List[Dict[str, Any]], boundaries: Optional[List[str]] = None):
+        rows: Dict[int, Dict[str, Tuple[float, float]]] = {}
+        categories: List[str] = []
+        for month, period in full_month_periods(periods, boundaries):
+            row = rows.setdefault(month_index(month), {})
+            for item in period.get("stackDataList") or []:
+                name = item.get("name")
+                if not name:
+                    continue
+                if name not in categories:
+                    categories.append(name)
+                quantity, value = row.get(name, (0.0, 0.0))
+                row[name] = (quantity + (item.get("quantity") or 0), value + (item.get("value") or 0.0))
+
+        self.categories = categories
+        self.first = min(rows) if rows else None
+        self.last = max(rows) if rows else None
+        size = (self.last - self.first + 1) if rows else 0
+
+        # prefix tables: (size + 1) rows x categories; present[i] counts fetched months before i
+        self.quantity_prefix = [[0.0] * len(categories)]
+        self.value_prefix = [[0.0] * len(categories)]
+        self.present = [0]
+        for offset in range(size):
+            row = rows.get(self.first + offset)
+            quantities = list(self.quantity_prefix[-1])
+            values = list(self.value_prefix[-1])
+            if row:
+                for column, name in enumerate(categories):
+                    quantity, value = row.get(name, (0.0, 0.0))
+                    quantities[column] += quantity
+                    values[column] += value
+            self.quantity_prefix.append(quantities)
+            self.value_prefix.append(values)
+            self.present.append(self.present[-1] + (1 if row is not None else 0))
+
+    def covers(self, first: Month, last: Month) -> bool:
+        """True when every month in [first, last] has been fetched."""
+        if self.first is None:
+            return False
+        start, end = month_index(first), month_index(last)
+        if start < self.first or end > self.last or end < start:
+            return False
+        return self.present[end - self.first + 1] - self.present[start - self.first] == end - start + 1
+
+    def range_totals(self, first: Month, last: Month) -> Dict[str, Dict[str, float]]:
+        """{category: {"quantity", "value"}} summed over [first, last]."""
+        if not self.covers(first, last):
+            raise KeyError(f"Months {first}..{last} are not in the index")
+        start = month_index(first) - self.first
+        end = month_index(last) - self.first + 1
+        return {
+            name: {
+                "quantity": self.quantity_prefix[end][column] - self.quantity_prefix[start][column],
+                "value": round(self.value_prefix[end][column] - self.value_prefix[start][column], 2),
+            }
+            for column, name in enumerate(self.categories)
+        }
+
+    def donut(self, first: Month, last: Month) -> Dict[str, Any]:
+        """Donut-shaped payload (startDate + stackDataList) for [first, last]."""
+        totals = self.range_totals(first, last)
+        return {
+            "startDate": month_start(first),
+            "stackDataList": [
+                {
+                    "name": name,
+                    "quantity": int(total["quantity"]) if float(total["quantity"]).is_integer() else total["quantity"],
+                    "value": total["value"],
+                }
+                for name, total in totals.items()
+            ],
+        }
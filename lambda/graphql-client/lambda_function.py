@@ -7,14 +7,74 @@ latest schema that relies on the simulation identifier field.
 
 import json
 import os
+import sys
 from datetime import datetime, timedelta
 
+# Shared helpers: lambda/shared locally, packaged alongside (or as a layer) when deployed
+_SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")
+if os.path.isdir(_SHARED_DIR) and _SHARED_DIR not in sys.path:
+    sys.path.append(_SHARED_DIR)
+
 import requests
 
+from fetch_planner import (
+    HistogramBucketStore,
+    build_span_query,
+    missing_spans,
+    period_buckets,
+    periods_match,
+    span_boundaries,
+)
+from graphql_transport import get_transport
+from histogram_index import MonthlyRangeIndex, month_aligned_range
+from query_planner import (
+    CHART_ARGUMENTS,
+    ENDPOINTS,
+    PersistedQueries,
+    batched_query,
+    chart_fields,
+    chart_query,
+    covering_projections,
+    project_chart,
+    projection_for,
+)
+from single_flight import SingleFlight
+from structured_log import bind_request, get_logger
+from tracing import SPAN_KIND_CLIENT, finish_trace, get_tracer
+from ttl_cache import TTLCache
+
+log = get_logger("graphql-client")
+tracer = get_tracer("graphql-client")
+
 # GraphQL endpoint configuration (override via environment)
 GRAPHQL_URL = os.environ.get("GRAPHQL_URL", "http://10.1.10.184:9000/graphql")
 SIMULATION_ID = os.environ.get("SIMULATION_ID", "test-simulation")
 
+# Result cache shared by all requests in a warm container. Chart data only
+# changes when a simulation is re-run, so a short TTL is enough.
+# Set GRAPHQL_CACHE_SIZE=0 or GRAPHQL_CACHE_TTL_SECONDS=0 to disable.
+graphql_cache = TTLCache(
+    maxsize=int(os.environ.get("GRAPHQL_CACHE_SIZE", "128")),
+    ttl=float(os.environ.get("GRAPHQL_CACHE_TTL_SECONDS", "300")),
+)
+
+# Concurrent identical queries share one upstream request
+graphql_single_flight = SingleFlight()
+
+# Prefix-sum indexes over the latest histogram per (server, simulation, sites, buffer);
+# month-aligned donut questions are answered from them without a request
+histogram_indexes = TTLCache(
+    maxsize=int(os.environ.get("GRAPHQL_CACHE_SIZE", "128")),
+    ttl=float(os.environ.get("GRAPHQL_CACHE_TTL_SECONDS", "300")),
+)
+
+# Histogram periods per (scope, bucket); a new histogram request only fetches
+# the buckets that are not here yet
+histogram_buckets = HistogramBucketStore(
+    maxsize=int(os.environ.get("HISTOGRAM_BUCKET_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("GRAPHQL_CACHE_TTL_SECONDS", "300")),
+)
+
 
 def generate_period_boundaries():
     """Generate 19 month boundaries from Jan 2025 to Jul 2026."""
@@ -53,73 +113,22 @@ def generate_period_boundaries_from_range(from_date_str, until_date_str):
     return boundaries
 
 
-# Hardcoded query templates using "identifier" instead of "id"
-QUERY_TEMPLATES = {
-    "listSimulations": """
-        query ListSimulations {
-            simulations {
-                identifier
-                name
-            }
-        }
-    """,
-    "demandByFulfillmentDonut": """
-        query DonutQuery($simulationId: UUID!, $from: Instant!, $until: Instant!, $sites: [UUID!]!, $buffer: Float!, $useProjectedCompletion: Boolean) {
-            simulation(identifier: $simulationId) {
-                charts {
-                    demandByFulfillmentDonut(
-                        from: $from
-                        until: $until
-                        sites: $sites
-                        onTimeDeliveryBuffer: $buffer
-                        useProjectedCompletion: $useProjectedCompletion
-                    ) {
-                        startDate
-                        stackDataList {
-                            name
-                            value
-                            quantity
-                        }
-                    }
-                }
-            }
-        }
-    """,
-    "demandByFulfillmentHistogram": """
-        query HistogramQuery($simulationId: UUID!, $periodBoundaries: [Instant!]!, $sites: [UUID!]!, $buffer: Float!) {
-            simulation(identifier: $simulationId) {
-                charts {
-                    demandByFulfillmentHistogram(
-                        periodBoundaries: $periodBoundaries
-                        sites: $sites
-                        onTimeDeliveryBuffer: $buffer
-                    ) {
-                        startDate
-                        stackDataList {
-                            name
-                            quantity
-                            value
-                        }
-                    }
-                }
-            }
-        }
-    """,
-}
+# Documents are compiled by query_planner.py, selecting only the stackDataList
+# fields the extraction type needs (GRAPHQL_FIELD_PROJECTION=0 selects all of them)
+FIELD_PROJECTION = os.environ.get("GRAPHQL_FIELD_PROJECTION", "1") != "0"
 
+# Automatic persisted queries: send the document hash instead of its text,
+# falling back to the text for servers without support (GRAPHQL_PERSISTED_QUERIES=0 disables)
+persisted_queries = PersistedQueries(enabled=os.environ.get("GRAPHQL_PERSISTED_QUERIES", "1") != "0")
+
+
+def query_projection(extraction_type=None):
+    """Projection for a request: the extraction type's fields, or all of them."""
+    return projection_for(extraction_type) if FIELD_PROJECTION else "full"
 
-def execute_graphql_query(endpoint_name, date_range=None):
-    """
-    Execute GraphQL query for the specified endpoint.
-    
-    Args:
-        endpoint_name: Name of the endpoint
-        date_range: Optional dict with 'from' and 'until' keys (ISO 8601 format strings)
-    """
-    query_template = QUERY_TEMPLATES.get(endpoint_name)
-    if not query_template:
-        raise ValueError(f"Unknown endpoint: {endpoint_name}")
 
+def build_query_variables(endpoint_name, date_range=None, simulation_id=None):
+    """Build the GraphQL variables for an endpoint and optional date range."""
     # Default date range if not provided
     default_from = "2025-01-01T00:00:00Z"
     default_until = "2025-11-27T00:00:00Z"
@@ -127,17 +136,17 @@ def execute_graphql_query(endpoint_name, date_range=None):
     if date_range and date_range.get('from') and date_range.get('until'):
         from_date = date_range.get('from')
         until_date = date_range.get('until')
-        print(f"📅 Using custom date range: {from_date} to {until_date}")
+        log.debug("date_range", source="custom", start=from_date, end=until_date)
     else:
         from_date = default_from
         until_date = default_until
-        print(f"📅 Using default date range: {from_date} to {until_date}")
+        log.debug("date_range", source="default", start=from_date, end=until_date)
 
     if endpoint_name == "listSimulations":
         variables = {}
     elif endpoint_name == "demandByFulfillmentDonut":
         variables = {
-            "simulationId": SIMULATION_ID,
+            "simulationId": simulation_id or SIMULATION_ID,
             "from": from_date,
             "until": until_date,
             "sites": [],
@@ -149,9 +158,9 @@ def execute_graphql_query(endpoint_name, date_range=None):
     elif endpoint_name == "demandByFulfillmentHistogram":
         # Generate period boundaries based on date range
         period_boundaries = generate_period_boundaries_from_range(from_date, until_date)
-        print(f"📊 Generated {len(period_boundaries)} period boundaries for histogram")
+        log.debug("period_boundaries", count=len(period_boundaries))
         variables = {
-            "simulationId": SIMULATION_ID,
+            "simulationId": simulation_id or SIMULATION_ID,
             "periodBoundaries": period_boundaries,
             "sites": [],
             "buffer": 0.0,
@@ -160,50 +169,234 @@ def execute_graphql_query(endpoint_name, date_range=None):
         variables = {}
 
     # Remove None values from variables (GraphQL handles optional parameters)
-    clean_variables = {k: v for k, v in variables.items() if v is not None}
+    return {k: v for k, v in variables.items() if v is not None}
+
+
+
+def graphql_cache_key(endpoint_name, variables, projection="full"):
+    """Cache / single-flight key: target server, simulation, endpoint, normalized variables and projection."""
+    return (GRAPHQL_URL, SIMULATION_ID, endpoint_name, json.dumps(variables, sort_keys=True), projection)
+
+
+def histogram_scope(variables, projection="full"):
+    """Key for histogram_indexes and histogram_buckets: everything except the period selection."""
+    return (
+        GRAPHQL_URL,
+        variables.get("simulationId", SIMULATION_ID),
+        json.dumps(variables.get("sites", []), sort_keys=True),
+        variables.get("buffer", 0.0),
+        projection,
+    )
+
+
+def donut_from_histogram_index(variables, date_range, projection="full"):
+    """Answer a month-aligned donut query from a cached histogram, or return None."""
+    months = month_aligned_range(date_range)
+    if months is None:
+        return None
+    for covering in covering_projections(projection):
+        index = histogram_indexes.get(histogram_scope(variables, covering))
+        if index is not None and index.covers(*months):
+            return project_chart(index.donut(*months), "demandByFulfillmentDonut", projection)
+    return None
+
+
+def execute_graphql_query(endpoint_name, date_range=None, use_cache=True, extraction_type=None):
+    """
+    Execute GraphQL query for the specified endpoint.
+    
+    Results are served from graphql_cache when possible; concurrent identical
+    queries are coalesced into one upstream request. The returned data is
+    shared with the cache and must be treated as read-only.
+    
+    Args:
+        endpoint_name: Name of the endpoint
+        date_range: Optional dict with 'from' and 'until' keys (ISO 8601 format strings)
+        use_cache: Set to False to skip the result cache (the query is still coalesced)
+        extraction_type: Optional; only the fields it needs are selected (see query_planner.py)
+    """
+    projection = query_projection(extraction_type)
+    with tracer.span("graphql.query", endpoint=endpoint_name, projection=projection) as span:
+        result = _execute_graphql_query(endpoint_name, date_range, use_cache, projection)
+        span.update(cached=result.get("cached", False), source=result.get("source"))
+        return result
+
+
+def _execute_graphql_query(endpoint_name, date_range, use_cache, projection):
+    if endpoint_name not in ENDPOINTS:
+        raise ValueError(f"Unknown endpoint: {endpoint_name}")
+
+    clean_variables = build_query_variables(endpoint_name, date_range)
 
     payload = {
-        "query": query_template,
+        "query": chart_query(endpoint_name, projection),
         "variables": clean_variables,
     }
 
-    print(f"Executing GraphQL query to: {GRAPHQL_URL}")
-    print(f"Endpoint: {endpoint_name}")
-    print(f"Simulation ID: {SIMULATION_ID}")
-    print(f"Variables: {json.dumps(variables, indent=2)}")
+    if use_cache and endpoint_name == "demandByFulfillmentDonut":
+        donut = donut_from_histogram_index(clean_variables, date_range, projection)
+        if donut is not None:
+            log.info("donut_from_histogram_index")
+            return {
+                "statusCode": 200,
+                "endpoint": endpoint_name,
+                "data": donut,
+                "cached": True,
+                "source": "histogram_index",
+            }
+
+    cache_key = graphql_cache_key(endpoint_name, clean_variables, projection)
+    if use_cache:
+        # A result with more fields than needed serves this request too
+        for covering in covering_projections(projection):
+            cached = graphql_cache.get(graphql_cache_key(endpoint_name, clean_variables, covering))
+            if cached is not None:
+                log.info("graphql_cache_hit", endpoint=endpoint_name, projection=covering)
+                return dict(cached, cached=True)
+
+    def fetch():
+        if endpoint_name == "demandByFulfillmentHistogram":
+            result = fetch_histogram_buckets(payload, reuse=use_cache, projection=projection)
+        else:
+            result = send_graphql_query(endpoint_name, payload)
+        graphql_cache.set(cache_key, result)
+        if endpoint_name == "demandByFulfillmentHistogram":
+            histogram_indexes.set(histogram_scope(clean_variables, projection), MonthlyRangeIndex(
+                result["data"], clean_variables.get("periodBoundaries")
+            ))
+        return result
+
+    result, shared = graphql_single_flight.do(cache_key, fetch)
+    if shared:
+        log.info("graphql_single_flight_joined", endpoint=endpoint_name)
+    return dict(result, cached=shared)
+
+
+def fetch_histogram_buckets(payload, reuse=True, projection="full"):
+    """
+    Fetch a histogram, reusing cached month buckets from earlier requests.
+
+    Only the missing buckets are fetched, as contiguous spans in a single
+    aliased GraphQL document, and the result is stitched back into request
+    order. A full miss sends the plain histogram query. With reuse=False
+    every bucket is fetched (and the store refreshed). Buckets cached with
+    a wider projection are reused as well.
+    """
+    endpoint_name = "demandByFulfillmentHistogram"
+    variables = payload["variables"]
+    boundaries = variables["periodBoundaries"]
+    buckets = period_buckets(boundaries)
+    scope = histogram_scope(variables, projection)
+
+    if not buckets:
+        return send_graphql_query(endpoint_name, payload)
+
+    cached = [None] * len(buckets)
+    if reuse:
+        for covering in covering_projections(projection):
+            found = histogram_buckets.lookup(histogram_scope(variables, covering), buckets)
+            cached = [mine if mine is not None else other for mine, other in zip(cached, found)]
+    spans = missing_spans(cached)
+    fetched_count = sum(end - start for start, end in spans)
+    plan = {
+        "buckets": len(buckets),
+        "reused": len(buckets) - fetched_count,
+        "fetched": fetched_count,
+        "spans": [[boundaries[start], boundaries[end]] for start, end in spans],
+        "requests": 1 if spans else 0,
+    }
+
+    if not spans:
+        log.info("histogram_plan", buckets=len(buckets), reused=len(buckets), fetched=0, spans=0)
+        periods = cached
+    elif spans == [(0, len(buckets))]:
+        result = send_graphql_query(endpoint_name, payload)
+        if periods_match(buckets, result["data"]):
+            histogram_buckets.store(scope, buckets, result["data"])
+        else:
+            log.warning("histogram_periods_misaligned", action="not_cached")
+        histogram_buckets.record(0, fetched_count, 1)
+        return dict(result, fetch_plan=plan)
+    else:
+        log.info("histogram_plan", buckets=len(buckets), reused=plan["reused"], fetched=fetched_count, spans=len(spans))
+        span_variables = {k: v for k, v in variables.items() if k != "periodBoundaries"}
+        for i, span in enumerate(spans):
+            span_variables[f"pb{i}"] = span_boundaries(boundaries, span)
+        charts = ((post_graphql({
+            "query": build_span_query(len(spans), chart_fields(endpoint_name, projection)),
+            "variables": span_variables,
+        }).get("data") or {}).get("simulation") or {}).get("charts") or {}
+
+        periods = list(cached)
+        for i, (start, end) in enumerate(spans):
+            span_periods = charts.get(f"h{i}")
+            if not periods_match(buckets[start:end], span_periods):
+                # Cannot stitch this answer; fall back to one full request
+                log.warning("histogram_periods_misaligned", action="refetch_full_range")
+                return fetch_histogram_buckets(payload, reuse=False, projection=projection)
+            periods[start:end] = span_periods
+            histogram_buckets.store(scope, buckets[start:end], span_periods)
+
+    histogram_buckets.record(plan["reused"], fetched_count, plan["requests"])
+    return {
+        "statusCode": 200,
+        "endpoint": endpoint_name,
+        "data": periods,
+        "fetch_plan": plan,
+    }
 
-    try:
-        headers = {"Content-Type": "application/json"}
-        
-        # Add authentication if available
-        auth_token = os.environ.get("AUTH_TOKEN")
-        if auth_token:
-            headers["Authorization"] = f"Bearer {auth_token}"
-
-        response = requests.post(
-            GRAPHQL_URL,
-            json=payload,
-            headers=headers,
-            timeout=30,
-        )
-        print(f"Response status code: {response.status_code}")
-        
-        # Get response text for debugging
-        response_text = response.text
-        print(f"Response text: {response_text[:500]}")
-        
-        if response.status_code != 200:
-            print(f"Error response: {response_text}")
-            raise Exception(f"GraphQL API returned {response.status_code}: {response_text[:200]}")
-        
-        response.raise_for_status()
 
+def post_graphql(payload):
+    """
+    POST a GraphQL payload through the pooled transport and return the parsed
+    response body. Raises on HTTP errors and GraphQL errors.
+    """
+    headers = {}
+    
+    # Add authentication if available
+    auth_token = os.environ.get("AUTH_TOKEN")
+    if auth_token:
+        headers["Authorization"] = f"Bearer {auth_token}"
+
+    transport = get_transport()
+
+    def send(body):
+        with tracer.span("graphql.http", kind=SPAN_KIND_CLIENT, url=GRAPHQL_URL,
+                         persisted="query" not in body) as span:
+            response = transport.post(GRAPHQL_URL, body, headers=headers)
+            span.update(status=response.status_code, attempts=len(transport.last_attempts), bytes=len(response.content))
+        return response
+
+    response = persisted_queries.post(GRAPHQL_URL, payload, send)
+    log.debug("graphql_response", status=response.status_code, attempts=transport.last_attempts,
+              bytes=lambda: len(response.content))
+    log.payload("graphql_response_body", lambda: response.text)
+    
+    if response.status_code != 200:
+        log.error("graphql_http_error", status=response.status_code, body=lambda: response.text[:500])
+        raise Exception(f"GraphQL API returned {response.status_code}: {response.text[:200]}")
+    
+    response.raise_for_status()
+
+    with tracer.span("graphql.parse"):
         result = response.json()
-        if "errors" in result:
-            print(f"GraphQL errors: {json.dumps(result['errors'], indent=2)}")
-            raise Exception(f"GraphQL errors: {result['errors']}")
+    if "errors" in result:
+        log.error("graphql_errors", errors=result["errors"])
+        raise Exception(f"GraphQL errors: {result['errors']}")
+
+    return result
 
-        data = result.get("data", {})
+
+def send_graphql_query(endpoint_name, payload):
+    """POST a GraphQL payload and unwrap the chart data for the endpoint."""
+    variables = payload["variables"]
+
+    log.debug("graphql_query", url=GRAPHQL_URL, endpoint=endpoint_name, simulation_id=SIMULATION_ID)
+    log.payload("graphql_variables", variables)
+
+    try:
+        result = post_graphql(payload)
+        data = result.get("data") or {}
         
         # Handle listSimulations query differently
         if endpoint_name == "listSimulations":
@@ -221,7 +414,8 @@ def execute_graphql_query(endpoint_name, date_range=None):
         endpoint_data = charts.get(endpoint_name)
 
         if not endpoint_data:
-            print(f"No data returned. Full response: {json.dumps(result, indent=2)}")
+            log.error("graphql_no_data", endpoint=endpoint_name, keys=lambda: sorted(charts))
+            log.payload("graphql_no_data_response", result)
             raise Exception(f"No data returned for endpoint: {endpoint_name}")
 
         # Handle optional fields - ensure stackDataList exists
@@ -229,12 +423,11 @@ def execute_graphql_query(endpoint_name, date_range=None):
             # Validate stackDataList structure
             stack_data = endpoint_data.get("stackDataList", [])
             if not isinstance(stack_data, list):
-                print(f"Warning: stackDataList is not a list: {type(stack_data)}")
-            else:
-                print(f"Successfully retrieved {len(stack_data)} items in stackDataList")
+                log.warning("stack_data_not_a_list", type=type(stack_data).__name__)
 
-        print(f"Successfully retrieved data from {endpoint_name}")
-        print(f"Data structure: {json.dumps(endpoint_data, indent=2)[:500]}...")
+        log.debug("graphql_data", endpoint=endpoint_name,
+                  items=lambda: len(endpoint_data) if isinstance(endpoint_data, list) else len(endpoint_data.get("stackDataList") or []))
+        log.payload("graphql_data_body", endpoint_data)
         return {
             "statusCode": 200,
             "endpoint": endpoint_name,
@@ -242,25 +435,135 @@ def execute_graphql_query(endpoint_name, date_range=None):
         }
 
     except requests.exceptions.RequestException as e:
-        print(f"HTTP request error: {e}")
-        print(f"Response text: {response.text if 'response' in locals() else 'No response'}")
+        log.exception("graphql_connection_error", e, endpoint=endpoint_name)
         raise Exception(f"Failed to connect to GraphQL API: {str(e)}")
     except Exception as e:
-        print(f"Error executing GraphQL query: {e}")
-        import traceback
-
-        traceback.print_exc()
+        log.exception("graphql_query_error", e, endpoint=endpoint_name)
         raise
 
 
+GRAPHQL_MAX_BATCH_SIZE = int(os.environ.get("GRAPHQL_MAX_BATCH_SIZE", "10"))
+
+
+def aggregate_donuts(donuts):
+    """Sum donut stackDataList entries by name across simulations (first-seen order)."""
+    totals = {}
+    for donut in donuts:
+        for item in (donut or {}).get("stackDataList") or []:
+            entry = totals.setdefault(item["name"], {"name": item["name"], "quantity": 0, "value": 0.0})
+            entry["quantity"] += item.get("quantity") or 0
+            entry["value"] += item.get("value") or 0.0
+    start_dates = [d.get("startDate") for d in donuts if d and d.get("startDate")]
+    return {
+        "startDate": min(start_dates) if start_dates else None,
+        "stackDataList": [dict(entry, value=round(entry["value"], 2)) for entry in totals.values()],
+    }
+
+
+def aggregate_histograms(histograms):
+    """Sum histogram periods by startDate and category name across simulations."""
+    periods = {}
+    for histogram in histograms:
+        for period in histogram or []:
+            bucket = periods.setdefault(period.get("startDate"), {})
+            for item in period.get("stackDataList") or []:
+                entry = bucket.setdefault(item["name"], {"name": item["name"], "quantity": 0, "value": 0.0})
+                entry["quantity"] += item.get("quantity") or 0
+                entry["value"] += item.get("value") or 0.0
+    return [
+        {
+            "startDate": start_date,
+            "stackDataList": [dict(entry, value=round(entry["value"], 2)) for entry in bucket.values()],
+        }
+        for start_date, bucket in sorted(periods.items(), key=lambda kv: kv[0] or "")
+    ]
+
+
+def execute_batched_simulation_query(endpoint_name, simulation_ids, date_range=None, max_batch_size=None, use_cache=True,
+                                     extraction_type=None):
+    """
+    Fetch one chart for several simulations with aliased queries (s0:
+    simulation(identifier: $id0), s1: ...): one round-trip per max_batch_size
+    simulations instead of one per simulation.
+
+    Returns per-simulation data plus the aggregated total across simulations,
+    computed locally from the batched results.
+    """
+    if endpoint_name not in CHART_ARGUMENTS:
+        raise ValueError(f"Batched queries are not supported for endpoint: {endpoint_name}")
+    simulation_ids = list(dict.fromkeys(simulation_ids))  # de-duplicate, keep order
+    if not simulation_ids:
+        raise ValueError("No simulation identifiers provided")
+    max_batch_size = max(1, max_batch_size or GRAPHQL_MAX_BATCH_SIZE)
+    projection = query_projection(extraction_type)
+
+    chart_variables = build_query_variables(endpoint_name, date_range)
+    chart_variables.pop("simulationId", None)
+
+    cache_key = graphql_cache_key(
+        "batch:" + endpoint_name, dict(chart_variables, simulationIds=simulation_ids, batchSize=max_batch_size), projection
+    )
+    if use_cache:
+        cached = graphql_cache.get(cache_key)
+        if cached is not None:
+            log.info("graphql_cache_hit", endpoint=endpoint_name, batched=True)
+            return dict(cached, cached=True)
+
+    def fetch():
+        per_simulation = {}
+        batches = 0
+        for start in range(0, len(simulation_ids), max_batch_size):
+            chunk = simulation_ids[start:start + max_batch_size]
+            variables = dict(chart_variables, **{f"id{i}": sim_id for i, sim_id in enumerate(chunk)})
+            log.debug("graphql_batch_query", endpoint=endpoint_name, simulations=len(chunk))
+            data = post_graphql({
+                "query": batched_query(endpoint_name, len(chunk), projection),
+                "variables": variables,
+            }).get("data") or {}
+            batches += 1
+            for i, sim_id in enumerate(chunk):
+                simulation = data.get(f"s{i}") or {}
+                per_simulation[sim_id] = (simulation.get("charts") or {}).get(endpoint_name)
+
+        charts = [chart for chart in per_simulation.values() if chart]
+        if endpoint_name == "demandByFulfillmentDonut":
+            aggregated = aggregate_donuts(charts)
+        else:
+            aggregated = aggregate_histograms(charts)
+        if projection != "full":
+            # The aggregates fill in the fields that were not selected
+            aggregated = project_chart(aggregated, endpoint_name, projection)
+
+        result = {
+            "statusCode": 200,
+            "endpoint": endpoint_name,
+            "data": aggregated,
+            "simulations": per_simulation,
+            "batches": batches,
+        }
+        graphql_cache.set(cache_key, result)
+        return result
+
+    result, shared = graphql_single_flight.do(cache_key, fetch)
+    return dict(result, cached=shared)
+
+
 def lambda_handler(event, context):
     """AWS Lambda handler function."""
-    print(f"Received event: {json.dumps(event)}")
+    with log.stage("graphql_client") as stage:
+        response = _handle(event, stage)
+        stage["status_code"] = response["statusCode"]
+        return response
+
+
+def _handle(event, stage):
     try:
         if isinstance(event.get("body"), str):
             body = json.loads(event["body"])
         else:
             body = event.get("body", event)
+        bind_request(body.get("request_id"))
+        log.payload("event", event)
 
         endpoint_name = body.get("endpoint", "")
         if not endpoint_name:
@@ -271,23 +574,56 @@ def lambda_handler(event, context):
                 ),
             }
 
-        result = execute_graphql_query(endpoint_name)
+        simulation_ids = body.get("simulation_ids")
+        # Continue the caller's trace when invoked by the orchestrator
+        trace = tracer.start_trace(**(body.get("trace") or {}))
+        try:
+            with tracer.span("graphql.handler", endpoint=endpoint_name):
+                if simulation_ids:
+                    result = execute_batched_simulation_query(
+                        endpoint_name,
+                        simulation_ids,
+                        body.get("date_range"),
+                        max_batch_size=body.get("max_batch_size"),
+                        use_cache=body.get("use_cache", True),
+                        extraction_type=body.get("extraction_type"),
+                    )
+                else:
+                    result = execute_graphql_query(
+                        endpoint_name, body.get("date_range"), use_cache=body.get("use_cache", True),
+                        extraction_type=body.get("extraction_type"),
+                    )
+        finally:
+            finish_trace(trace)
+        stage.update(endpoint=endpoint_name, cached=result.get("cached", False))
+        response_body = {
+            "endpoint": result["endpoint"],
+            "data": result["data"],
+            "cached": result.get("cached", False),
+            "cache_stats": dict(graphql_cache.stats(), **graphql_single_flight.stats()),
+            "transport_stats": get_transport().stats(),
+            "persisted_query_stats": persisted_queries.stats(),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        if endpoint_name == "demandByFulfillmentHistogram":
+            response_body["histogram_bucket_stats"] = histogram_buckets.stats()
+            if result.get("fetch_plan") and not response_body["cached"]:
+                response_body["fetch_plan"] = result["fetch_plan"]
+        if simulation_ids:
+            response_body["simulations"] = result["simulations"]
+            response_body["batches"] = result["batches"]
+        if not trace.is_root:
+            response_body["trace_spans"] = trace.spans
         return {
             "statusCode": 200,
             "headers": {
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
             },
-            "body": json.dumps(
-                {
-                    "endpoint": result["endpoint"],
-                    "data": result["data"],
-                    "timestamp": datetime.utcnow().isoformat(),
-                }
-            ),
+            "body": json.dumps(response_body),
         }
     except Exception as e:
-        print(f"Error in lambda_handler: {str(e)}")
+        log.exception("handler_error", e)
         return {
             "statusCode": 500,
             "body": json.dumps(
@@ -0,0 +1,219 @@
+"""
+Query planner for the GraphQL Client: field projection and persisted queries
+
+Purpose: Sends as few bytes as possible in both directions.
+
+- Field projection: every extraction type (and the charts) reads only the
+  category name and quantity, so those requests select stackDataList
+  { name quantity } instead of the full { name value quantity } (and no donut
+  startDate). Requests without an extraction type get the full selection.
+  A result fetched with a wider projection can serve a narrower one.
+- Compiled documents: each (endpoint, projection[, alias count]) document is
+  built once and whitespace-minified.
+- Automatic persisted queries (the Apollo APQ protocol): a request first
+  goes out as {"extensions": {"persistedQuery": {"version": 1, "sha256Hash"}},
+  "variables"} without the query text. On PersistedQueryNotFound it is re-sent
+  with the text, which registers it on the server; a server without APQ
+  support is remembered per URL and gets the full text from then on.
+"""
+
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+# stackDataList fields selected per projection, narrowest first
+PROJECTIONS = {
+    "quantity": ("name", "quantity"),
+    "full": ("name", "value", "quantity"),
+}
+
+# What the Response Generator reads for each extraction type (see its extract_value_* functions)
+EXTRACTION_PROJECTIONS = {
+    "total": "quantity",
+    "firm_order": "quantity",
+    "overdue": "quantity",
+    "forecasted": "quantity",
+    "monthly_count": "quantity",
+    "average": "quantity",
+    "highest_month": "quantity",
+}
+
+# Variable definitions and chart arguments per chart endpoint
+CHART_ARGUMENTS = {
+    "demandByFulfillmentDonut": (
+        "$from: Instant!, $until: Instant!, $sites: [UUID!]!, $buffer: Float!, $useProjectedCompletion: Boolean",
+        "from: $from until: $until sites: $sites onTimeDeliveryBuffer: $buffer "
+        "useProjectedCompletion: $useProjectedCompletion",
+    ),
+    "demandByFulfillmentHistogram": (
+        "$periodBoundaries: [Instant!]!, $sites: [UUID!]!, $buffer: Float!",
+        "periodBoundaries: $periodBoundaries sites: $sites onTimeDeliveryBuffer: $buffer",
+    ),
+}
+
+LIST_SIMULATIONS_QUERY = "query ListSimulations { simulations { identifier name } }"
+
+ENDPOINTS = ("listSimulations",) + tuple(CHART_ARGUMENTS)
+
+
+def projection_for(extraction_type: Optional[str]) -> str:
+    return EXTRACTION_PROJECTIONS.get(extraction_type or "", "full")
+
+
+def covering_projections(projection: str) -> List[str]:
+    """projection followed by every projection that selects at least its fields."""
+    fields = set(PROJECTIONS[projection])
+    return [projection] + [name for name, selected in PROJECTIONS.items()
+                           if name != projection and fields <= set(selected)]
+
+
+def chart_fields(endpoint_name: str, projection: str) -> str:
+    """Selection set of one chart field."""
+    stack = "stackDataList { " + " ".join(PROJECTIONS[projection]) + " }"
+    if endpoint_name == "demandByFulfillmentHistogram" or projection == "full":
+        # Histogram periods are matched to buckets by startDate
+        return "startDate " + stack
+    return stack
+
+
+def _minify(document: str) -> str:
+    # The documents contain no string literals, so all whitespace runs are separators
+    return " ".join(document.split())
+
+
+@lru_cache(maxsize=64)
+def chart_query(endpoint_name: str, projection: str = "full") -> str:
+    if endpoint_name == "listSimulations":
+        return LIST_SIMULATIONS_QUERY
+    definitions, arguments = CHART_ARGUMENTS[endpoint_name]
+    operation = "DonutQuery" if endpoint_name == "demandByFulfillmentDonut" else "HistogramQuery"
+    return _minify(f"""
+        query {operation}($simulationId: UUID!, {definitions}) {{
+            simulation(identifier: $simulationId) {{
+                charts {{
+                    {endpoint_name}({arguments}) {{ {chart_fields(endpoint_name, projection)} }}
+                }}
+            }}
+        }}
+    """)
+
+
+@lru_cache(maxsize=64)
+def batched_query(endpoint_name: str, simulation_count: int, projection: str = "full") -> str:
+    """
+    One document with an alias per simulation: s0: simulation(identifier: $id0)
+    { charts { ... } }, s1: ..., sharing the chart variables.
+    """
+    definitions, arguments = CHART_ARGUMENTS[endpoint_name]
+    id_definitions = ", ".join(f"$id{i}: UUID!" for i in range(simulation_count))
+    aliases = " ".join(
+        f"s{i}: simulation(identifier: $id{i}) {{ charts {{ "
+        f"{endpoint_name}({arguments}) {{ {chart_fields(endpoint_name, projection)} }} }} }}"
+        for i in range(simulation_count)
+    )
+    return _minify(f"query Batched{endpoint_name[0].upper()}{endpoint_name[1:]}({id_definitions}, {definitions}) {{ {aliases} }}")
+
+
+def project_chart(data: Any, endpoint_name: str, projection: str) -> Any:
+    """Chart data restricted to the projection's fields (for locally computed results)."""
+    fields = PROJECTIONS[projection]
+
+    def stack(items):
+        return [{name: item[name] for name in fields if name in item} for item in items or []]
+
+    if endpoint_name == "demandByFulfillmentHistogram":
+        return [{"startDate": period.get("startDate"), "stackDataList": stack(period.get("stackDataList"))}
+                for period in data or []]
+    projected = {"stackDataList": stack((data or {}).get("stackDataList"))}
+    if "startDate" in chart_fields(endpoint_name, projection):
+        projected = {"startDate": (data or {}).get("startDate"), **projected}
+    return projected
+
+
+@lru_cache(maxsize=256)
+def query_sha256(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def persisted_query_error(response) -> Optional[str]:
+    """
+    How the server answered a hash-only request: "not_found", "not_supported",
+    "unknown" (a 400 without an APQ error) or None (a normal response).
+    """
+    if response.status_code not in (200, 400) or len(response.content) > 4096:
+        return None
+    if response.status_code == 200 and b"PersistedQuery" not in response.content and b"PERSISTED_QUERY" not in response.content:
+        return None
+    try:
+        errors = response.json().get("errors") or []
+    except (ValueError, AttributeError):
+        errors = []
+    for error in errors:
+        code = (error.get("extensions") or {}).get("code") or error.get("message")
+        if code in ("PERSISTED_QUERY_NOT_FOUND", "PersistedQueryNotFound"):
+            return "not_found"
+        if code in ("PERSISTED_QUERY_NOT_SUPPORTED", "PersistedQueryNotSupported"):
+            return "not_supported"
+    return "unknown" if response.status_code == 400 else None
+
+
+class PersistedQueries:
+    """Automatic persisted query client state: per-URL support and counters."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._unsupported = set()
+        self._lock = threading.Lock()
+        self.hash_only = 0
+        self.registrations = 0
+        self.full_text = 0
+        self.query_bytes_saved = 0
+
+    def supported(self, url: str) -> bool:
+        return self.enabled and url not in self._unsupported
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, increment in increments.items():
+                setattr(self, name, getattr(self, name) + increment)
+
+    def post(self, url: str, payload: Dict[str, Any], send: Callable[[Dict[str, Any]], Any]):
+        """
+        Send payload ({"query", "variables", ...}) with send(body) -> response,
+        by hash when the server supports it. Returns the final response.
+        """
+        query = payload.get("query")
+        if not query or not self.supported(url):
+            self._count(full_text=1)
+            return send(payload)
+
+        extensions = {"persistedQuery": {"version": 1, "sha256Hash": query_sha256(query)}}
+        hashed = {key: value for key, value in payload.items() if key != "query"}
+        hashed["extensions"] = extensions
+        response = send(hashed)
+        error = persisted_query_error(response)
+        if error is None:
+            self._count(hash_only=1, query_bytes_saved=len(query.encode("utf-8")))
+            return response
+        if error == "not_found":
+            self._count(registrations=1)
+            return send(dict(payload, extensions=extensions))
+
+        response = send(payload)
+        if error == "not_supported" or response.status_code == 200:
+            # The full text works where the hash did not: no APQ on this server
+            with self._lock:
+                self._unsupported.add(url)
+        self._count(full_text=1)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "hash_only": self.hash_only,
+            "registrations": self.registrations,
+            "full_text": self.full_text,
+            "query_bytes_saved": self.query_bytes_saved,
+            "unsupported_servers": len(self._unsupported),
+        }
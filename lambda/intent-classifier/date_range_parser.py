@@ -0,0 +1,197 @@
+"""
+Deterministic date-range extraction for the Intent Classifier
+
+Purpose: Resolves date phrases in a question into the classifier's
+date_range {"from", "until"} without an LLM call. Runs on the normalized
+question (see question_normalizer), so "Dec 25" has already become
+"december 2025".
+
+Supported phrases:
+- month ranges: "Dec 25 to May 26", "from January 2025 to June 2025",
+  "between March and May 2026", "Dec 2025 - May 2026"
+- single months and years: "in March 2025", "on December 25, 2025" (the
+  day is ignored), "for 2026" (a bare year needs
+  a preposition; "may" needs a year or a range keyword next to it)
+- quarters: "Q3", "Q3 2025", "2025 Q3", "third quarter of 2025", "this/last/next quarter"
+- relative periods: "next 6 months", "last 3 months", "this/last/next month",
+  "this/last/next year", "year to date", "since March 2025"
+
+Ranges are month-aligned like the classifier prompt examples: "from" is the
+first day of the first month at 00:00:00Z, "until" the last day of the last
+month at 23:59:59Z. A month without a year takes the year of the other end of
+the range, or the current year. "next N months" starts with the current month.
+"""
+
+import calendar
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+from question_normalizer import MONTH_NAMES, normalize_question
+
+MONTHS = {name: index for index, name in enumerate(MONTH_NAMES, start=1)}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+ORDINAL_QUARTERS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+_MONTH = "(" + "|".join(MONTH_NAMES) + ")"
+_YEAR = r"(20\d{2})"
+# A day of the month between a month and a year ("December 25, 2025"); ranges stay month-aligned
+_DAY = r"(?: (?:[1-9]|[12]\d|3[01])(?= 20\d{2}\b))?"
+_COUNT = r"(\d{1,2}|" + "|".join(NUMBER_WORDS) + ")"
+
+MONTH_RANGE_RE = re.compile(
+    rf"\b(?:from |between )?{_MONTH}{_DAY}(?: {_YEAR})? (?:to|through|thru|until|till|and) {_MONTH}{_DAY}(?: {_YEAR})?\b"
+)
+# "Dec 2025 - May 2026" once the dash is stripped; without a keyword both ends need a year
+DASHED_MONTH_RANGE_RE = re.compile(rf"\b(?:from )?{_MONTH}{_DAY} {_YEAR} {_MONTH}{_DAY} {_YEAR}\b")
+QUARTER_RE = re.compile(rf"\b(?:in |for |during )?(?:{_YEAR} )?q([1-4])(?: {_YEAR})?\b")
+ORDINAL_QUARTER_RE = re.compile(
+    rf"\b(?:in |for |during )?(?:the )?(first|second|third|fourth) quarter(?: of)?(?: {_YEAR})?\b"
+)
+RELATIVE_QUARTER_RE = re.compile(r"\b(?:in |for |during )?(this|current|last|previous|next) quarter\b")
+RELATIVE_MONTHS_RE = re.compile(rf"\b(?:in |for |over |during )?(?:the )?(next|last|past|previous|coming) {_COUNT} months?\b")
+RELATIVE_MONTH_RE = re.compile(r"\b(?:in |for |during )?(this|current|last|previous|next) month\b")
+RELATIVE_YEAR_RE = re.compile(r"\b(?:in |for |during )?(this|current|last|previous|next) year\b")
+YEAR_TO_DATE_RE = re.compile(r"\b(?:year to date|ytd)\b")
+SINCE_RE = re.compile(rf"\bsince {_MONTH}{_DAY}(?: {_YEAR})?\b")
+SINGLE_MONTH_RE = re.compile(rf"\b(?:in |for |during )?{_MONTH}{_DAY}(?: {_YEAR})?\b")
+# A bare number is only a year after a date preposition ("above 2050 units" is not)
+YEAR_RE = re.compile(rf"\b(?:in|for|during|of|throughout|year) {_YEAR}\b")
+
+
+def today_utc() -> date:
+    """Current date; DATE_PARSER_TODAY (YYYY-MM-DD) pins it for reproducible runs."""
+    pinned = os.environ.get("DATE_PARSER_TODAY")
+    if pinned:
+        return date.fromisoformat(pinned)
+    return datetime.utcnow().date()
+
+
+def _shift_month(year: int, month: int, offset: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def _month_span(start: Tuple[int, int], end: Tuple[int, int]) -> Dict[str, str]:
+    (from_year, from_month), (until_year, until_month) = start, end
+    last_day = calendar.monthrange(until_year, until_month)[1]
+    return {
+        "from": f"{from_year:04d}-{from_month:02d}-01T00:00:00Z",
+        "until": f"{until_year:04d}-{until_month:02d}-{last_day:02d}T23:59:59Z",
+    }
+
+
+def _quarter_span(year: int, quarter: int) -> Dict[str, str]:
+    first_month = 3 * (quarter - 1) + 1
+    return _month_span((year, first_month), (year, first_month + 2))
+
+
+def _count(token: str) -> int:
+    return NUMBER_WORDS.get(token) or int(token)
+
+
+def _resolve(text: str, today: date) -> Tuple[Optional[Dict[str, str]], Optional[re.Match]]:
+    match = MONTH_RANGE_RE.search(text) or DASHED_MONTH_RANGE_RE.search(text)
+    if match:
+        from_month, from_year, until_month, until_year = match.groups()
+        from_year = int(from_year) if from_year else None
+        until_year = int(until_year) if until_year else None
+        start_year = from_year or until_year or today.year
+        end_year = until_year or start_year
+        start = (start_year, MONTHS[from_month])
+        end = (end_year, MONTHS[until_month])
+        if end < start and until_year is None:
+            end = (end_year + 1, end[1])
+        if end >= start:
+            return _month_span(start, end), match
+
+    match = QUARTER_RE.search(text)
+    if match:
+        year_before, quarter, year_after = match.groups()
+        year = year_before or year_after
+        return _quarter_span(int(year) if year else today.year, int(quarter)), match
+
+    match = ORDINAL_QUARTER_RE.search(text)
+    if match:
+        ordinal, year = match.groups()
+        return _quarter_span(int(year) if year else today.year, ORDINAL_QUARTERS[ordinal]), match
+
+    match = RELATIVE_QUARTER_RE.search(text)
+    if match:
+        offset = {"last": -1, "previous": -1, "next": 1}.get(match.group(1), 0)
+        year, month = _shift_month(today.year, 3 * ((today.month - 1) // 3) + 1, 3 * offset)
+        return _quarter_span(year, (month - 1) // 3 + 1), match
+
+    match = RELATIVE_MONTHS_RE.search(text)
+    # "next 0 months" is no range; the patterns below may still find one
+    if match and _count(match.group(2)) >= 1:
+        direction, count = match.group(1), _count(match.group(2))
+        if direction in ("next", "coming"):
+            start = (today.year, today.month)
+            end = _shift_month(today.year, today.month, count - 1)
+        else:
+            start = _shift_month(today.year, today.month, -count)
+            end = _shift_month(today.year, today.month, -1)
+        return _month_span(start, end), match
+
+    match = RELATIVE_MONTH_RE.search(text)
+    if match:
+        offset = {"last": -1, "previous": -1, "next": 1}.get(match.group(1), 0)
+        month = _shift_month(today.year, today.month, offset)
+        return _month_span(month, month), match
+
+    match = RELATIVE_YEAR_RE.search(text)
+    if match:
+        year = today.year + {"last": -1, "previous": -1, "next": 1}.get(match.group(1), 0)
+        return _month_span((year, 1), (year, 12)), match
+
+    match = YEAR_TO_DATE_RE.search(text)
+    if match:
+        return _month_span((today.year, 1), (today.year, today.month)), match
+
+    match = SINCE_RE.search(text)
+    if match:
+        month, year = match.groups()
+        start = (int(year) if year else today.year, MONTHS[month])
+        end = (today.year, today.month)
+        if start <= end:
+            return _month_span(start, end), match
+
+    match = SINGLE_MONTH_RE.search(text)
+    if match:
+        month, year = match.groups()
+        # "may" on its own is usually the verb; require a year for it
+        if month != "may" or year:
+            start = (int(year) if year else today.year, MONTHS[month])
+            return _month_span(start, start), match
+
+    match = YEAR_RE.search(text)
+    if match:
+        year = int(match.group(1))
+        return _month_span((year, 1), (year, 12)), match
+
+    return None, None
+
+
+def parse_date_range(user_question: str, today: Optional[date] = None) -> Tuple[Optional[Dict[str, str]], str]:
+    """
+    Returns (date_range or None, normalized question with the date phrase
+    replaced by a placeholder). The second value is the date-independent part
+    of the question used in cache keys.
+    """
+    text = normalize_question(user_question)
+    date_range, match = _resolve(text, today or today_utc())
+    if match is None:
+        return None, text
+    stripped = f"{text[:match.start()]} <dates> {text[match.end():]}"
+    return date_range, " ".join(stripped.split())
+
+
+def extract_date_range(user_question: str, today: Optional[date] = None) -> Optional[Dict[str, str]]:
+    """Resolve the question's date phrase into {"from", "until"}, or None if it has none."""
+    return parse_date_range(user_question, today)[0]
@@ -4,26 +4,34 @@ Lambda Function: Intent Classifier
 Purpose: Uses Groq LLM to determine which endpoint to call based on user question
 """
 
+import copy
 import json
 import os
 import sys
 
-from groq import Groq
+# Shared helpers: lambda/shared locally, packaged alongside (or as a layer) when deployed
+_SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")
+if os.path.isdir(_SHARED_DIR) and _SHARED_DIR not in sys.path:
+    sys.path.append(_SHARED_DIR)
 
-MODEL_NAME = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
+from date_range_parser import parse_date_range
+from llm_backend import get_llm_backend
+from local_classifier import load_local_classifier, mentions_dates
+from structured_log import bind_request, get_logger
+from tracing import SPAN_KIND_CLIENT, finish_trace, get_tracer
+from ttl_cache import TTLCache
+
+log = get_logger("intent-classifier")
+tracer = get_tracer("intent-classifier")
 
-# Initialize Groq client (lazy initialization)
-groq_client = None
+MODEL_NAME = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 
-def get_groq_client():
-    """Get or create Groq client"""
-    global groq_client
-    if groq_client is None:
-        api_key = os.environ.get("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable is not set")
-        groq_client = Groq(api_key=api_key)
-    return groq_client
+# Classification cache keyed on the normalized question (survives warm invocations).
+# Set INTENT_CACHE_SIZE=0 or INTENT_CACHE_TTL_SECONDS=0 to disable.
+intent_cache = TTLCache(
+    maxsize=int(os.environ.get("INTENT_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("INTENT_CACHE_TTL_SECONDS", "3600")),
+)
 
 # Endpoint metadata
 ENDPOINTS = {
@@ -41,110 +49,200 @@ ENDPOINTS = {
     },
 }
 
+# Local fast-path classifier built from config/knowledge-graph.json.
+# Groq is only called when its confidence is below LOCAL_CLASSIFIER_THRESHOLD.
+LOCAL_CLASSIFIER_THRESHOLD = float(os.environ.get("LOCAL_CLASSIFIER_THRESHOLD", "0.8"))
+local_classifier = (
+    load_local_classifier(ENDPOINTS)
+    if os.environ.get("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+    else None
+)
+
 
 def classify_intent(user_question):
     """
-    Use Groq LLM to classify user intent and determine endpoint
+    Classify user intent, serving repeated questions from the intent cache
     """
+    # Date phrases are resolved deterministically first; the resolved range
+    # (not its spelling) is part of the cache key
+    with tracer.span("intent.date_parse"):
+        date_range, question_key = parse_date_range(user_question)
+    cache_key = (
+        MODEL_NAME,
+        question_key,
+        (date_range["from"], date_range["until"]) if date_range else None,
+    )
+    cached = intent_cache.get(cache_key)
+    if cached is not None:
+        result = copy.deepcopy(cached)
+        result["cached"] = True
+        return result
+
+    result = classify_intent_locally(user_question, date_range)
+    if result is not None:
+        result["cached"] = False
+        return result
+
+    result = classify_intent_with_llm(user_question, date_range)
+    # Only LLM answers are cached; a fallback result means the LLM call failed
+    if result.get("source") == "llm":
+        intent_cache.set(cache_key, copy.deepcopy(result))
+    result["cached"] = False
+    return result
+
+
+def classify_intent_locally(user_question, date_range=None):
+    """
+    Fast path: answer from the knowledge-graph classifier when it is confident
+    enough, otherwise return None so the caller falls through to the LLM
+    """
+    if local_classifier is None:
+        return None
+
+    with tracer.span("intent.local") as span:
+        local = local_classifier.classify(user_question)
+        span["confidence"] = local["confidence"]
+    if local["endpoint"] != "conversational":
+        if local["confidence"] < LOCAL_CLASSIFIER_THRESHOLD:
+            return None
+        # Date phrases the parser could not resolve are left to the LLM
+        if date_range is None and mentions_dates(user_question):
+            return None
+
+    log.info("local_classification", endpoint=local["endpoint"], confidence=local["confidence"])
+    return {
+        "statusCode": 200,
+        "intent": {
+            "endpoint": local["endpoint"],
+            "extraction_type": local["extraction_type"],
+            "date_range": date_range or {"from": None, "until": None},
+            "confidence": local["confidence"],
+        },
+        "endpoint_metadata": ENDPOINTS.get(local["endpoint"], {}),
+        "source": "local",
+    }
+
+
+def classify_intent_with_llm(user_question, date_range=None):
+    """
+    Use Groq LLM to classify user intent and determine endpoint.
+
+    When the date range was already resolved by date_range_parser (or the
+    question has no date phrase) the date-extraction rules and examples are
+    left out of the prompt and the deterministic range is used.
+    """
+    extract_dates = date_range is None and mentions_dates(user_question)
+
+    date_instructions = """
+IMPORTANT: Extract date ranges from the user's question. If the user mentions specific dates (e.g., "Dec 2025 to May 2026", "from December 25 to May 26"), extract them.
+""" if extract_dates else ""
+
+    date_rules = """
+For date extraction:
+- If user says "Dec 2025" or "December 2025", use "2025-12-01T00:00:00Z"
+- If user says "May 2026", use "2026-05-01T00:00:00Z"
+- If user says "Dec 25 to May 26", interpret as "December 2025 to May 2026"
+- If no dates mentioned, set both to null
+- Always use ISO 8601 format with Z timezone
+""" if extract_dates else ""
+
+    date_examples = """
+User: "What is projected demand from Dec 25 to May 26?"
+Response: {"endpoint": "demandByFulfillmentHistogram", "extraction_type": "total", "date_range": {"from": "2025-12-01T00:00:00Z", "until": "2026-05-31T23:59:59Z"}, "confidence": 0.95}
+
+User: "Show me demand from January 2025 to June 2025"
+Response: {"endpoint": "demandByFulfillmentHistogram", "extraction_type": "total", "date_range": {"from": "2025-01-01T00:00:00Z", "until": "2025-06-30T23:59:59Z"}, "confidence": 0.95}
+""" if extract_dates else ""
 
-    system_prompt = """You are an AI assistant for FactoryTwin manufacturing software.
+    system_prompt = f"""You are an AI assistant for FactoryTwin manufacturing software.
 Your job is to determine which data endpoint to call based on the user's question AND extract any date ranges mentioned.
 
 CRITICAL: If the user is just saying thank you, goodbye, or acknowledging (not asking for data), respond with:
-{"endpoint": "conversational", "extraction_type": "none", "date_range": {"from": null, "until": null}, "confidence": 1.0}
+{{"endpoint": "conversational", "extraction_type": "none", "date_range": {{"from": null, "until": null}}, "confidence": 1.0}}
 
 Available endpoints:
 1. demandByFulfillmentDonut - Use when user asks about TOTAL or AGGREGATE demand, revenue, or specific order types (firm orders, overdue, forecasted)
 2. demandByFulfillmentHistogram - Use when user asks about MONTHLY breakdown, trends over time, or specific months
 3. conversational - Use when user is just saying thank you, goodbye, or acknowledging (not asking for data)
-
-IMPORTANT: Extract date ranges from the user's question. If the user mentions specific dates (e.g., "Dec 2025 to May 2026", "from December 25 to May 26"), extract them.
-
+{date_instructions}
 Respond with ONLY a JSON object in this exact format:
-{
+{{
     "endpoint": "demandByFulfillmentDonut" or "demandByFulfillmentHistogram",
     "extraction_type": "firm_order" or "total" or "overdue" or "forecasted" or "monthly_count" or "average" or "highest_month",
-    "date_range": {
+    "date_range": {{
         "from": "YYYY-MM-DDTHH:MM:SSZ" or null,
         "until": "YYYY-MM-DDTHH:MM:SSZ" or null
-    },
+    }},
     "confidence": 0.0 to 1.0
-}
-
-For date extraction:
-- If user says "Dec 2025" or "December 2025", use "2025-12-01T00:00:00Z"
-- If user says "May 2026", use "2026-05-01T00:00:00Z"
-- If user says "Dec 25 to May 26", interpret as "December 2025 to May 2026"
-- If no dates mentioned, set both to null
-- Always use ISO 8601 format with Z timezone
-
+}}
+{date_rules}
 Examples:
 User: "What is the revenue from my total firm orders?"
-Response: {"endpoint": "demandByFulfillmentDonut", "extraction_type": "firm_order", "date_range": {"from": null, "until": null}, "confidence": 0.95}
+Response: {{"endpoint": "demandByFulfillmentDonut", "extraction_type": "firm_order", "date_range": {{"from": null, "until": null}}, "confidence": 0.95}}
 
 User: "How many months do I have firm demand?"
-Response: {"endpoint": "demandByFulfillmentHistogram", "extraction_type": "monthly_count", "date_range": {"from": null, "until": null}, "confidence": 0.90}
+Response: {{"endpoint": "demandByFulfillmentHistogram", "extraction_type": "monthly_count", "date_range": {{"from": null, "until": null}}, "confidence": 0.90}}
 
 User: "What is my total demand?"
-Response: {"endpoint": "demandByFulfillmentDonut", "extraction_type": "total", "date_range": {"from": null, "until": null}, "confidence": 0.95}
-
-User: "What is projected demand from Dec 25 to May 26?"
-Response: {"endpoint": "demandByFulfillmentHistogram", "extraction_type": "total", "date_range": {"from": "2025-12-01T00:00:00Z", "until": "2026-05-31T23:59:59Z"}, "confidence": 0.95}
-
-User: "Show me demand from January 2025 to June 2025"
-Response: {"endpoint": "demandByFulfillmentHistogram", "extraction_type": "total", "date_range": {"from": "2025-01-01T00:00:00Z", "until": "2025-06-30T23:59:59Z"}, "confidence": 0.95}
-
+Response: {{"endpoint": "demandByFulfillmentDonut", "extraction_type": "total", "date_range": {{"from": null, "until": null}}, "confidence": 0.95}}
+{date_examples}
 User: "Thank you for the information"
-Response: {"endpoint": "conversational", "extraction_type": "none", "date_range": {"from": null, "until": null}, "confidence": 1.0}
+Response: {{"endpoint": "conversational", "extraction_type": "none", "date_range": {{"from": null, "until": null}}, "confidence": 1.0}}
 
 User: "Thanks, that's all I needed"
-Response: {"endpoint": "conversational", "extraction_type": "none", "date_range": {"from": null, "until": null}, "confidence": 1.0}
+Response: {{"endpoint": "conversational", "extraction_type": "none", "date_range": {{"from": null, "until": null}}, "confidence": 1.0}}
 """
 
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_question},
-            ],
-            temperature=0.2,
-            max_tokens=200,
-        )
-
-        # Extract response
-        llm_response = response.choices[0].message.content.strip()
+        llm = get_llm_backend()
+        with tracer.span("intent.llm", kind=SPAN_KIND_CLIENT, model=MODEL_NAME, backend=llm.name):
+            llm_response = llm.complete(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_question},
+                ],
+                model=MODEL_NAME,
+                temperature=0.2,
+                max_tokens=200,
+                purpose="intent",
+            ).strip()
 
         # Parse JSON response
         intent_data = json.loads(llm_response)
         
-        # Ensure date_range exists in response (for backward compatibility)
-        if 'date_range' not in intent_data:
+        # Deterministic date range wins over the LLM's; ensure date_range exists (backward compatibility)
+        if date_range:
+            intent_data['date_range'] = date_range
+        elif 'date_range' not in intent_data:
             intent_data['date_range'] = {"from": None, "until": None}
 
         return {
             "statusCode": 200,
             "intent": intent_data,
             "endpoint_metadata": ENDPOINTS.get(intent_data["endpoint"], {}),
+            "source": "llm",
         }
 
     except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Raw LLM response: {llm_response}")
+        log.warning("llm_json_error", message=str(e), raw=lambda: llm_response[:500])
 
         # Fallback: simple keyword matching
-        return fallback_classification(user_question)
+        return fallback_classification(user_question, date_range)
 
     except Exception as e:
-        print(f"Groq API error: {e}")
-        return fallback_classification(user_question)
+        log.exception("llm_error", e)
+        return fallback_classification(user_question, date_range)
 
 
-def fallback_classification(user_question):
+def fallback_classification(user_question, date_range=None):
     """
     Simple keyword-based classification as fallback
     """
+    with tracer.span("intent.fallback"):
+        return keyword_classification(user_question, date_range)
+
+
+def keyword_classification(user_question, date_range=None):
     question_lower = user_question.lower()
 
     # Check for monthly/time-based keywords
@@ -154,10 +252,11 @@ def fallback_classification(user_question):
             "intent": {
                 "endpoint": "demandByFulfillmentHistogram",
                 "extraction_type": "monthly_count",
-                "date_range": {"from": None, "until": None},
+                "date_range": date_range or {"from": None, "until": None},
                 "confidence": 0.7,
             },
             "endpoint_metadata": ENDPOINTS["demandByFulfillmentHistogram"],
+            "source": "fallback",
         }
 
     # Check for specific order types
@@ -176,10 +275,11 @@ def fallback_classification(user_question):
         "intent": {
             "endpoint": "demandByFulfillmentDonut",
             "extraction_type": extraction,
-            "date_range": {"from": None, "until": None},
+            "date_range": date_range or {"from": None, "until": None},
             "confidence": 0.7,
         },
         "endpoint_metadata": ENDPOINTS["demandByFulfillmentDonut"],
+        "source": "fallback",
     }
 
 
@@ -187,14 +287,21 @@ def lambda_handler(event, context):
     """
     AWS Lambda handler function
     """
-    print(f"Received event: {json.dumps(event)}")
+    with log.stage("intent_classifier") as stage:
+        response = _handle(event, stage)
+        stage["status_code"] = response["statusCode"]
+        return response
 
+
+def _handle(event, stage):
     try:
         # Parse request body
         if isinstance(event.get("body"), str):
             body = json.loads(event["body"])
         else:
             body = event.get("body", event)
+        bind_request(body.get("request_id"))
+        log.payload("event", event)
 
         user_question = body.get("question", "")
 
@@ -206,10 +313,20 @@ def lambda_handler(event, context):
                 ),
             }
 
-        # Classify intent
-        result = classify_intent(user_question)
-
-        print(f"Classification result: {json.dumps(result)}")
+        # Classify intent, continuing the caller's trace when invoked by the orchestrator
+        trace = tracer.start_trace(**(body.get("trace") or {}))
+        try:
+            with tracer.span("intent.handler"):
+                result = classify_intent(user_question)
+        finally:
+            finish_trace(trace)
+
+        stage.update(
+            endpoint=result["intent"]["endpoint"],
+            extraction_type=result["intent"]["extraction_type"],
+            source=result.get("source"),
+            cached=result.get("cached", False),
+        )
 
         return {
             "statusCode": 200,
@@ -225,12 +342,16 @@ def lambda_handler(event, context):
                     "extraction_type": result["intent"]["extraction_type"],
                     "visualization": result["endpoint_metadata"].get("visualization"),
                     "confidence": result["intent"]["confidence"],
+                    "source": result.get("source"),
+                    "cached": result.get("cached", False),
+                    "cache_stats": intent_cache.stats(),
+                    **({} if trace.is_root else {"trace_spans": trace.spans}),
                 }
             ),
         }
 
     except Exception as e:
-        print(f"Error in lambda_handler: {str(e)}")
+        log.exception("handler_error", e)
         return {
             "statusCode": 500,
             "body": json.dumps(
@@ -0,0 +1,213 @@
+"""
+Local fast-path intent classifier
+
+Purpose: Routes routine questions without an LLM call, using the metadata in
+config/knowledge-graph.json:
+- intentMapping.patterns: regexes, precompiled once per container
+- intentMapping.keywords: keyword → endpoint votes
+- endpoints.*.sampleQuestions: TF-IDF weighted word 1-2 gram nearest-neighbour index
+
+The three signals are combined into a confidence in [0, 1]; classify_intent()
+only calls Groq when that confidence is below LOCAL_CLASSIFIER_THRESHOLD.
+Thank-you / goodbye messages short-circuit to the conversational intent.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from conversational import is_conversational
+from question_normalizer import normalize_question
+from structured_log import get_logger
+
+log = get_logger("intent-classifier")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# KNOWLEDGE_GRAPH_PATH, else knowledge-graph.json next to this file (scripts/package_lambdas.py
+# ships it there), else config/ in the repository
+KNOWLEDGE_GRAPH_PATH = os.environ.get("KNOWLEDGE_GRAPH_PATH") or next(
+    (path for path in (
+        os.path.join(_HERE, "knowledge-graph.json"),
+        os.path.join(_HERE, "..", "..", "config", "knowledge-graph.json"),
+    ) if os.path.exists(path)),
+    None,
+)
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "my", "me", "i", "do", "does", "of",
+    "for", "to", "in", "on", "what", "whats", "show", "tell", "much", "have",
+    "has", "we", "our", "you", "your", "please", "can", "there", "and",
+}
+
+# Date mentions still need the LLM's date_range extraction
+DATE_MENTION_RE = re.compile(
+    r"\b(january|february|march|april|may|june|july|august|september|october|"
+    r"november|december|20\d{2}|q[1-4]|quarter|year|week|next|last|since|until|between)\b"
+)
+
+# Donut extraction types; whole words only ("calculate" and "related" are not "late")
+FIRM_RE = re.compile(r"\bfirm (orders?|demand)\b")
+OVERDUE_RE = re.compile(r"\b(overdue|late)\b")
+FORECAST_RE = re.compile(r"\bforecast(s|ed|ing)?\b")
+
+
+def _features(text: str) -> List[str]:
+    words = text.split()
+    unigrams = [w for w in words if w not in STOPWORDS]
+    bigrams = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return unigrams + bigrams
+
+
+def _l2_normalize(weights: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(w * w for w in weights.values()))
+    return {k: w / norm for k, w in weights.items()} if norm else {}
+
+
+class LocalIntentClassifier:
+    """Regex + keyword + TF-IDF nearest-neighbour classifier compiled from the knowledge graph."""
+
+    def __init__(self, knowledge_graph: Dict[str, Any], supported_endpoints: Iterable[str]):
+        supported = set(supported_endpoints)
+        endpoints = knowledge_graph.get("endpoints", {})
+        mapping = knowledge_graph.get("intentMapping", {})
+
+        self.patterns = [
+            (re.compile(spec["pattern"], re.IGNORECASE), spec["endpoint"])
+            for spec in mapping.get("patterns", {}).values()
+            if spec.get("endpoint") in supported
+        ]
+        # keyword (plural forms included) → supported endpoints
+        self.keywords = [
+            (re.compile(rf"\b{re.escape(keyword)}s?\b"), [e for e in targets if e in supported])
+            for keyword, targets in mapping.get("keywords", {}).items()
+        ]
+        self.keywords = [(regex, targets) for regex, targets in self.keywords if targets]
+
+        samples = [
+            (normalize_question(question), name)
+            for name, spec in endpoints.items() if name in supported
+            for question in spec.get("sampleQuestions", [])
+        ]
+        documents = [_features(text) for text, _ in samples]
+        doc_freq = Counter(term for doc in documents for term in set(doc))
+        total = len(documents)
+        self.idf = {term: math.log((1 + total) / (1 + df)) + 1.0 for term, df in doc_freq.items()}
+        self.index = [
+            (self._vectorize(doc), endpoint) for doc, (_, endpoint) in zip(documents, samples)
+        ]
+        self.endpoints = sorted({endpoint for _, endpoint in samples} | {e for _, e in self.patterns})
+
+    def _vectorize(self, terms: List[str]) -> Dict[str, float]:
+        counts = Counter(terms)
+        return _l2_normalize({t: c * self.idf[t] for t, c in counts.items() if t in self.idf})
+
+    def _similarities(self, text: str) -> Dict[str, float]:
+        vector = self._vectorize(_features(text))
+        best = {endpoint: 0.0 for endpoint in self.endpoints}
+        for sample_vector, endpoint in self.index:
+            score = sum(w * sample_vector.get(t, 0.0) for t, w in vector.items())
+            if score > best[endpoint]:
+                best[endpoint] = score
+        return best
+
+    def classify(self, user_question: str) -> Dict[str, Any]:
+        """
+        Returns {"endpoint", "extraction_type", "confidence", "evidence"}.
+        Confidence is a logistic combination of nearest-neighbour similarity,
+        regex agreement and keyword vote share; conflicting signals pull it down.
+        """
+        text = normalize_question(user_question)
+
+        if is_conversational(text):
+            return {
+                "endpoint": "conversational",
+                "extraction_type": "none",
+                "confidence": 0.99,
+                "evidence": {"conversational": True},
+            }
+
+        similarities = self._similarities(text)
+        votes = Counter()
+        for regex, targets in self.keywords:
+            if regex.search(text):
+                for endpoint in targets:
+                    votes[endpoint] += 1.0 / len(targets)
+        pattern_hits = Counter(endpoint for regex, endpoint in self.patterns if regex.search(text))
+
+        scores = {
+            endpoint: similarities.get(endpoint, 0.0) + 0.5 * pattern_hits[endpoint] + 0.25 * votes[endpoint]
+            for endpoint in self.endpoints
+        }
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        endpoint = ranked[0]
+        runner_up = ranked[1] if len(ranked) > 1 else None
+
+        vote_total = sum(votes.values())
+        keyword_agree = votes[endpoint] / vote_total if vote_total else 0.0
+        pattern_agree = 1.0 if pattern_hits[endpoint] else 0.0
+        conflict = (1.0 if any(pattern_hits[e] for e in ranked[1:]) else 0.0) + (
+            1.0 - keyword_agree if vote_total else 0.0
+        )
+        margin = scores[endpoint] - (scores[runner_up] if runner_up else 0.0)
+
+        # With no signal at all this gives ~0.23; one unambiguous keyword plus a
+        # weak nearest neighbour clears the default 0.8 threshold
+        logit = (
+            -1.2
+            + 2.5 * similarities.get(endpoint, 0.0)
+            + 1.5 * pattern_agree
+            + 2.0 * keyword_agree
+            - 2.0 * conflict
+            + 1.0 * min(margin, 1.0)
+        )
+        confidence = 1.0 / (1.0 + math.exp(-logit))
+
+        return {
+            "endpoint": endpoint,
+            "extraction_type": extraction_type_for(endpoint, text),
+            "confidence": round(confidence, 3),
+            "evidence": {
+                "similarity": round(similarities.get(endpoint, 0.0), 3),
+                "pattern_hits": dict(pattern_hits),
+                "keyword_votes": dict(votes),
+                "margin": round(margin, 3),
+            },
+        }
+
+
+def extraction_type_for(endpoint: str, text: str) -> str:
+    """Pick the extraction_type for an endpoint from a normalized question."""
+    if endpoint == "demandByFulfillmentHistogram":
+        if re.search(r"\b(highest|peak|most|maximum|max|busiest|biggest)\b", text):
+            return "highest_month"
+        if re.search(r"\b(average|avg|mean|per month)\b", text):
+            return "average"
+        return "monthly_count"
+    if FIRM_RE.search(text):
+        return "firm_order"
+    if OVERDUE_RE.search(text):
+        return "overdue"
+    if FORECAST_RE.search(text):
+        return "forecasted"
+    return "total"
+
+
+def mentions_dates(user_question: str) -> bool:
+    """True when the question names months, years or relative periods."""
+    return bool(DATE_MENTION_RE.search(normalize_question(user_question)))
+
+
+def load_local_classifier(supported_endpoints: Iterable[str], path: Optional[str] = None) -> Optional[LocalIntentClassifier]:
+    """Build the classifier from the knowledge graph, or None if it cannot be found."""
+    path = path or KNOWLEDGE_GRAPH_PATH
+    if not path or not os.path.exists(path):
+        # Every question then goes to the LLM; surface it in the logs of each cold start
+        log.warning("local_classifier_disabled", reason="knowledge_graph_not_found",
+                    path=path or os.environ.get("KNOWLEDGE_GRAPH_PATH") or os.path.join(_HERE, "knowledge-graph.json"))
+        return None
+    with open(path, encoding="utf-8") as f:
+        return LocalIntentClassifier(json.load(f), supported_endpoints)
@@ -0,0 +1,255 @@
+"""
+Minimal GraphQL document parser for the mock FactoryTwin endpoint
+
+Parses the subset of GraphQL the clients send: operations with variable
+definitions (and defaults), aliased fields, arguments with variable or
+literal values, and nested selection sets. Fragments and directives are
+rejected with a GraphQLError instead of being silently ignored.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ignored>[\s,﻿]+|\#[^\n]*)
+  | (?P<spread>\.\.\.)
+  | (?P<punct>[!$():=@\[\]{}|&])
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    """,
+    re.VERBOSE,
+)
+
+
+class GraphQLError(Exception):
+    """Invalid document or variables; reported in the response "errors" list."""
+
+
+class Variable(NamedTuple):
+    name: str
+
+
+class Field(NamedTuple):
+    alias: str
+    name: str
+    arguments: Dict[str, Any]
+    selections: List["Field"]
+
+
+class VariableDefinition(NamedTuple):
+    name: str
+    type: str
+    default: Any
+
+
+class Operation(NamedTuple):
+    kind: str
+    name: Optional[str]
+    variables: List[VariableDefinition]
+    selections: List[Field]
+
+
+def tokenize(source: str) -> List[tuple]:
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = _TOKEN_RE.match(source, position)
+        if match is None:
+            raise GraphQLError(f"Syntax Error: Unexpected character {source[position]!r} at {position}")
+        position = match.end()
+        kind = match.lastgroup
+        if kind != "ignored":
+            tokens.append((kind, match.group()))
+    tokens.append(("eof", ""))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, source: str):
+        self.tokens = tokenize(source)
+        self.index = 0
+
+    def peek(self, value: Optional[str] = None) -> bool:
+        kind, text = self.tokens[self.index]
+        return text == value if value is not None else kind != "eof"
+
+    def next(self) -> tuple:
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str) -> None:
+        kind, text = self.next()
+        if text != value:
+            raise GraphQLError(f"Syntax Error: Expected {value!r}, found {text or '<EOF>'!r}")
+
+    def name(self) -> str:
+        kind, text = self.next()
+        if kind != "name":
+            raise GraphQLError(f"Syntax Error: Expected Name, found {text or '<EOF>'!r}")
+        return text
+
+    def document(self) -> List[Operation]:
+        operations = []
+        while self.peek():
+            operations.append(self.operation())
+        if not operations:
+            raise GraphQLError("Syntax Error: Unexpected <EOF>")
+        return operations
+
+    def operation(self) -> Operation:
+        if self.peek("{"):
+            return Operation("query", None, [], self.selection_set())
+        kind = self.name()
+        if kind == "fragment":
+            raise GraphQLError("Fragments are not supported by this endpoint")
+        if kind not in ("query", "mutation", "subscription"):
+            raise GraphQLError(f"Syntax Error: Unexpected Name {kind!r}")
+        name = self.name() if self.tokens[self.index][0] == "name" else None
+        variables = self.variable_definitions() if self.peek("(") else []
+        self.reject_directives()
+        return Operation(kind, name, variables, self.selection_set())
+
+    def variable_definitions(self) -> List[VariableDefinition]:
+        self.expect("(")
+        definitions = []
+        while not self.peek(")"):
+            self.expect("$")
+            name = self.name()
+            self.expect(":")
+            type_name = self.type_reference()
+            default = None
+            if self.peek("="):
+                self.next()
+                default = self.value(const=True)
+            definitions.append(VariableDefinition(name, type_name, default))
+        self.expect(")")
+        return definitions
+
+    def type_reference(self) -> str:
+        if self.peek("["):
+            self.next()
+            inner = self.type_reference()
+            self.expect("]")
+            type_name = f"[{inner}]"
+        else:
+            type_name = self.name()
+        if self.peek("!"):
+            self.next()
+            type_name += "!"
+        return type_name
+
+    def reject_directives(self) -> None:
+        if self.peek("@"):
+            raise GraphQLError("Directives are not supported by this endpoint")
+
+    def selection_set(self) -> List[Field]:
+        self.expect("{")
+        fields = []
+        while not self.peek("}"):
+            if self.peek("..."):
+                raise GraphQLError("Fragments are not supported by this endpoint")
+            fields.append(self.field())
+        self.expect("}")
+        return fields
+
+    def field(self) -> Field:
+        alias = name = self.name()
+        if self.peek(":"):
+            self.next()
+            name = self.name()
+        arguments = {}
+        if self.peek("("):
+            self.next()
+            while not self.peek(")"):
+                argument = self.name()
+                self.expect(":")
+                arguments[argument] = self.value()
+            self.expect(")")
+        self.reject_directives()
+        selections = self.selection_set() if self.peek("{") else []
+        return Field(alias, name, arguments, selections)
+
+    def value(self, const: bool = False) -> Any:
+        kind, text = self.next()
+        if text == "$" and kind == "punct":
+            if const:
+                raise GraphQLError("Variables are not allowed in default values")
+            return Variable(self.name())
+        if text == "[":
+            items = []
+            while not self.peek("]"):
+                items.append(self.value(const))
+            self.next()
+            return items
+        if text == "{":
+            fields = {}
+            while not self.peek("}"):
+                key = self.name()
+                self.expect(":")
+                fields[key] = self.value(const)
+            self.next()
+            return fields
+        if kind == "number":
+            return float(text) if any(c in text for c in ".eE") else int(text)
+        if kind == "string":
+            # GraphQL string escapes are a subset of JSON's
+            return json.loads(text)
+        if kind == "name":
+            return {"true": True, "false": False, "null": None}.get(text, text)
+        raise GraphQLError(f"Syntax Error: Unexpected {text or '<EOF>'!r}")
+
+
+def parse_document(source: str) -> List[Operation]:
+    return _Parser(source).document()
+
+
+def select_operation(operations: List[Operation], operation_name: Optional[str]) -> Operation:
+    if operation_name:
+        for operation in operations:
+            if operation.name == operation_name:
+                return operation
+        raise GraphQLError(f"Unknown operation named {operation_name!r}")
+    if len(operations) > 1:
+        raise GraphQLError("Must provide operation name if query contains multiple operations")
+    return operations[0]
+
+
+def coerce_variables(operation: Operation, provided: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Variable values for the operation: provided, else default; required ones must be present."""
+    provided = provided or {}
+    values = {}
+    for definition in operation.variables:
+        if definition.name in provided:
+            values[definition.name] = provided[definition.name]
+        elif definition.default is not None:
+            values[definition.name] = definition.default
+        elif definition.type.endswith("!"):
+            raise GraphQLError(
+                f'Variable "${definition.name}" of required type "{definition.type}" was not provided.'
+            )
+        else:
+            values[definition.name] = None
+        if values[definition.name] is None and definition.type.endswith("!"):
+            raise GraphQLError(f'Variable "${definition.name}" of non-null type "{definition.type}" must not be null.')
+    return values
+
+
+def argument_values(field: Field, variables: Dict[str, Any]) -> Dict[str, Any]:
+    """Field arguments with variable references substituted (recursively)."""
+
+    def resolve(value):
+        if isinstance(value, Variable):
+            if value.name not in variables:
+                raise GraphQLError(f'Variable "${value.name}" is not defined.')
+            return variables[value.name]
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        if isinstance(value, dict):
+            return {key: resolve(item) for key, item in value.items()}
+        return value
+
+    return {name: resolve(value) for name, value in field.arguments.items()}
@@ -0,0 +1,111 @@
+"""
+Local HTTP server for the mock FactoryTwin GraphQL endpoint
+
+    python lambda/mock-graphql/http_server.py --port 9000 --latency-ms 40 --jitter-ms 20 --error-rate 0.01
+
+POST /graphql answers GraphQL requests (gzip when the client accepts it);
+GET /health returns the request, cache and byte counters. Connections are kept
+alive, so client-side pooling is observable. Options default to the MOCK_*
+environment variables (see mock_service.py).
+"""
+
+import argparse
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from mock_service import GZIP_MIN_BYTES, MockService
+
+
+class MockGraphQLRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without TCP_NODELAY
+        # keep-alive responses stall on Nagle + delayed ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.counter_lock:
+            self.server.connection_count += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        response = self.server.service.handle(self.rfile.read(length))
+        payload = response.body
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "") and len(payload) > GZIP_MIN_BYTES
+        if gzipped:
+            payload = response.gzipped()
+        # Counted before the response goes out, so a client sees its own request in the totals
+        with self.server.counter_lock:
+            self.server.bytes_received += length
+            self.server.bytes_sent += len(payload)
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            self.send_error(404)
+            return
+        payload = json.dumps(dict(
+            self.server.service.stats(),
+            connections=self.server.connection_count,
+            bytes_received=self.server.bytes_received,
+            bytes_sent=self.server.bytes_sent,
+        )).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # silence per-request access logs
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, service: Optional[MockService] = None) -> ThreadingHTTPServer:
+    """An unstarted server for service (default: configured from the environment); see server.url."""
+    server = ThreadingHTTPServer((host, port), MockGraphQLRequestHandler)
+    server.daemon_threads = True
+    server.service = service or MockService.from_env()
+    server.connection_count = 0
+    server.bytes_received = 0
+    server.bytes_sent = 0
+    server.counter_lock = threading.Lock()
+    server.url = f"http://{host}:{server.server_address[1]}/graphql"
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--slow-rate", type=float)
+    parser.add_argument("--slow-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--error-status", type=int)
+    parser.add_argument("--no-persisted-queries", dest="persisted_queries", action="store_false", default=None,
+                        help="answer persisted query requests with PersistedQueryNotSupported")
+    args = parser.parse_args(argv)
+
+    overrides = {name: value for name, value in vars(args).items() if name not in ("host", "port") and value is not None}
+    server = make_server(args.host, args.port, MockService.from_env(**overrides))
+    print(f"Mock FactoryTwin GraphQL listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
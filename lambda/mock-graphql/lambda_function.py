@@ -1,100 +1,75 @@
 """
-AWS Lambda mock GraphQL endpoint used for integration testing.
-Returns deterministic data for the FactoryTwin donut + histogram charts.
+AWS Lambda mock GraphQL endpoint used for integration and load testing.
+
+Stand-in for the FactoryTwin API: parses the GraphQL document and its
+variables, and answers the donut and histogram charts from seeded synthetic
+data (any simulation identifier, site subset, date range or period
+boundaries), with optional latency, jitter and error injection. See
+mock_service.py for the configuration variables and http_server.py to run
+it as a local HTTP server.
 """
 
 from __future__ import annotations
 
 import json
-from datetime import datetime
-from typing import Any, Dict, List
-
-from decimal import Decimal
-
-DONUT_DATA = {
-    "startDate": "2025-01-01T00:00:00Z",
-    "stackDataList": [
-        {"name": "Overdue", "quantity": 149, "value": 1079098.66},
-        {"name": "Forecasted", "quantity": 2316, "value": 14611009.21},
-        {"name": "Firm Order", "quantity": 4848, "value": 32595400.38},
-    ],
-}
-
-
-def _month_start(start: datetime, offset: int) -> datetime:
-    year = start.year + (start.month - 1 + offset) // 12
-    month = (start.month - 1 + offset) % 12 + 1
-    return datetime(year, month, 1, tzinfo=start.tzinfo)
-
-
-def generate_histogram_data() -> List[Dict[str, Any]]:
-    start_date = datetime(2025, 1, 1)
-    data: List[Dict[str, Any]] = []
-    for i in range(19):
-        month_date = _month_start(start_date, i)
-        base_value = 2_000_000 + (i * 75_000)
-        data.append(
-            {
-                "startDate": month_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "stackDataList": [
-                    {
-                        "name": "Overdue",
-                        "quantity": 120 + (i % 40),
-                        "value": round(base_value * 0.12 + i * 10_000, 2),
-                    },
-                    {
-                        "name": "Forecasted",
-                        "quantity": 2000 + (i * 25),
-                        "value": round(base_value * 0.3 + i * 25_000, 2),
-                    },
-                    {
-                        "name": "Firm Order",
-                        "quantity": 3800 + (i * 35),
-                        "value": round(base_value * 0.58 + i * 55_000, 2),
-                    },
-                ],
-            }
-        )
-    return data
-
-
-HISTOGRAM_DATA = generate_histogram_data()
-
-
-def resolve_query(query: str) -> Dict[str, Any]:
-    if "demandByFulfillmentDonut" in query:
-        return {
-            "simulation": {"charts": {"demandByFulfillmentDonut": DONUT_DATA}},
-        }
-    if "demandByFulfillmentHistogram" in query:
-        return {
-            "simulation": {"charts": {"demandByFulfillmentHistogram": HISTOGRAM_DATA}},
-        }
-    return {"simulation": {"charts": {}}}
+from typing import Any, Dict, List, Optional
 
+from mock_service import MockService
+
+DEFAULT_SIMULATION = "test-simulation"
+DEFAULT_FROM = "2025-01-01T00:00:00Z"
+DEFAULT_UNTIL = "2025-11-27T00:00:00Z"
+
+# Created on first use and reused by warm invocations
+_service: Optional[MockService] = None
+
+
+def get_service() -> MockService:
+    global _service
+    if _service is None:
+        _service = MockService.from_env()
+    return _service
 
-def lambda_handler(event, context):
-    try:
-        raw_body = event.get("body") or "{}"
-        if isinstance(raw_body, str):
-            body = json.loads(raw_body)
-        else:
-            body = raw_body
 
-        query = body.get("query", "")
-        response_data = resolve_query(query)
+def donut_for_range(from_date: str, until_date: str, simulation_id: str = DEFAULT_SIMULATION,
+                    sites: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Donut totals over the days in [from, until)."""
+    return get_service().dataset.donut(simulation_id, from_date, until_date, sites)
 
+
+def histogram_for_boundaries(boundaries: List[str], simulation_id: str = DEFAULT_SIMULATION,
+                             sites: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """One period per consecutive boundary pair; sums of the periods equal the donut over the same range."""
+    return get_service().dataset.histogram(simulation_id, boundaries, sites)
+
+
+def __getattr__(name: str) -> Any:
+    # Representative payloads for benchmarks; generated on first access
+    if name == "DONUT_DATA":
+        return donut_for_range(DEFAULT_FROM, DEFAULT_UNTIL)
+    if name == "HISTOGRAM_DATA":
+        return histogram_for_boundaries(get_service().dataset.month_boundaries(DEFAULT_FROM, 19))
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def resolve_query(query: str, variables: Dict[str, Any] = None) -> Dict[str, Any]:
+    """The response document ({"data": ...} and any "errors") for query, uncached."""
+    return json.loads(get_service().execute(query, variables or {}).body)
+
+
+def lambda_handler(event, context):
+    try:
+        response = get_service().handle(event.get("body") or "{}")
         return {
-            "statusCode": 200,
+            "statusCode": response.status,
             "headers": {
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*",
             },
-            "body": json.dumps({"data": response_data}),
+            "body": response.body.decode("utf-8"),
         }
     except Exception as exc:  # pragma: no cover - defensive logging
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(exc)}),
         }
-
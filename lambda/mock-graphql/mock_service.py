@@ -0,0 +1,306 @@
+"""
+Mock FactoryTwin GraphQL service: resolver, encoded-response cache and faults
+
+Executes the parsed document against a SyntheticDataset. Arguments and
+variables are honoured, output is projected to the selected fields
+(aliases included), and unknown fields or invalid variables produce
+GraphQL errors like the real server. Identical requests are answered from
+an LRU of pre-encoded JSON bodies (gzip variant built on first use), so
+load tests measure the client rather than the mock.
+
+Latency, jitter, slow requests and injected errors are applied to every
+request (cached or not), for both the Lambda handler and the HTTP server.
+
+Automatic persisted queries (the Apollo APQ protocol) are supported: a
+request with extensions.persistedQuery.sha256Hash and no query is answered
+from the registered document or with PersistedQueryNotFound; sending the
+query with its hash registers it.
+
+Configuration (environment, see MockService.from_env):
+    MOCK_SEED, MOCK_SIMULATIONS, MOCK_SITES, MOCK_CATEGORIES,
+    MOCK_DATA_START, MOCK_DATA_DAYS      synthetic data shape
+    MOCK_RESPONSE_CACHE_SIZE             encoded responses kept (0 disables)
+    MOCK_LATENCY_MS, MOCK_JITTER_MS      added to every request (uniform jitter)
+    MOCK_SLOW_RATE, MOCK_SLOW_MS         fraction of requests delayed further
+    MOCK_ERROR_RATE, MOCK_ERROR_STATUS   fraction answered with an HTTP error
+    MOCK_PERSISTED_QUERIES               0: answer APQ requests with PersistedQueryNotSupported
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Shared helpers: lambda/shared locally, packaged alongside (or as a layer) when deployed
+_SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")
+if os.path.isdir(_SHARED_DIR) and _SHARED_DIR not in sys.path:
+    sys.path.append(_SHARED_DIR)
+
+from graphql_document import (
+    Field,
+    GraphQLError,
+    argument_values,
+    coerce_variables,
+    parse_document,
+    select_operation,
+)
+from synthetic_factory import SyntheticDataset
+from ttl_cache import TTLCache
+
+GZIP_MIN_BYTES = 1024
+
+
+class EncodedResponse:
+    """A response body encoded once; the gzip variant is built on first use."""
+
+    __slots__ = ("status", "body", "_gzipped")
+
+    def __init__(self, status: int, payload: Dict[str, Any]):
+        self.status = status
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        self._gzipped: Optional[bytes] = None
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+
+def _error_payload(message: str, path: Optional[List[Any]] = None, code: Optional[str] = None) -> Dict[str, Any]:
+    error: Dict[str, Any] = {"message": message}
+    if path:
+        error["path"] = path
+    if code:
+        error["extensions"] = {"code": code}
+    return {"errors": [error]}
+
+
+def _project(value: Any, field: Field, parent: str) -> Any:
+    """Value restricted to the field's selection set (lists element-wise)."""
+    if isinstance(value, list):
+        return [_project(item, field, parent) for item in value]
+    if not field.selections:
+        if isinstance(value, dict):
+            raise GraphQLError(f'Field "{field.name}" of type "{parent}" must have a selection of subfields.')
+        return value
+    if not isinstance(value, dict):
+        raise GraphQLError(f'Field "{field.name}" must not have a selection since it has no subfields.')
+    result = {}
+    for selection in field.selections:
+        if selection.name not in value:
+            raise GraphQLError(f'Cannot query field "{selection.name}" on "{field.name}".')
+        result[selection.alias] = _project(value[selection.name], selection, field.name)
+    return result
+
+
+class MockService:
+    """Answers GraphQL request bodies from a SyntheticDataset."""
+
+    def __init__(self, dataset: Optional[SyntheticDataset] = None, cache_size: int = 256,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, slow_rate: float = 0.0, slow_ms: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, persisted_queries: bool = True,
+                 seed: Optional[int] = None, sleep=time.sleep):
+        self.dataset = dataset or SyntheticDataset()
+        self.responses = TTLCache(maxsize=cache_size, ttl=float("inf"))
+        self.documents = TTLCache(maxsize=max(cache_size, 64), ttl=float("inf"))
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.persisted_queries = persisted_queries
+        self.persisted = TTLCache(maxsize=1024, ttl=float("inf"))
+        self._sleep = sleep
+        self._rng = random.Random(self.dataset.seed if seed is None else seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.executed = 0
+        self.injected_errors = 0
+        self.persisted_hits = 0
+        self.persisted_misses = 0
+
+    @classmethod
+    def from_env(cls, **overrides) -> "MockService":
+        env = os.environ.get
+        seed = int(env("MOCK_SEED", "42"))
+        dataset = SyntheticDataset(
+            seed=seed,
+            simulations=int(env("MOCK_SIMULATIONS", "8")),
+            sites=int(env("MOCK_SITES", "4")),
+            categories=int(env("MOCK_CATEGORIES", "3")),
+            start=env("MOCK_DATA_START", "2024-01-01"),
+            days=int(env("MOCK_DATA_DAYS", "1461")),
+        )
+        options = {
+            "dataset": dataset,
+            "cache_size": int(env("MOCK_RESPONSE_CACHE_SIZE", "256")),
+            "latency_ms": float(env("MOCK_LATENCY_MS", "0")),
+            "jitter_ms": float(env("MOCK_JITTER_MS", "0")),
+            "slow_rate": float(env("MOCK_SLOW_RATE", "0")),
+            "slow_ms": float(env("MOCK_SLOW_MS", "0")),
+            "error_rate": float(env("MOCK_ERROR_RATE", "0")),
+            "error_status": int(env("MOCK_ERROR_STATUS", "503")),
+            "persisted_queries": env("MOCK_PERSISTED_QUERIES", "1") != "0",
+        }
+        options.update(overrides)
+        return cls(**options)
+
+    # -- request handling -------------------------------------------------
+
+    def handle(self, raw_body: Any) -> EncodedResponse:
+        """Encoded response for a request body (JSON text, bytes or dict), faults applied."""
+        with self._lock:
+            self.requests += 1
+            delay_ms = self.latency_ms + (self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+            if self.slow_rate and self._rng.random() < self.slow_rate:
+                delay_ms += self.slow_ms
+            failed = bool(self.error_rate) and self._rng.random() < self.error_rate
+            if failed:
+                self.injected_errors += 1
+        if delay_ms > 0:
+            self._sleep(delay_ms / 1000.0)
+        if failed:
+            return EncodedResponse(self.error_status, _error_payload("Injected upstream failure"))
+
+        try:
+            body = json.loads(raw_body or "{}") if isinstance(raw_body, (str, bytes)) else (raw_body or {})
+        except ValueError as exc:
+            return EncodedResponse(400, _error_payload(f"Invalid JSON body: {exc}"))
+        if not isinstance(body, dict):
+            return EncodedResponse(400, _error_payload("Request body must be a JSON object"))
+        persisted = (body.get("extensions") or {}).get("persistedQuery")
+        query = self._persisted_query(body.get("query"), persisted) if persisted else body.get("query")
+        if isinstance(query, EncodedResponse):
+            return query
+        if not isinstance(query, str):
+            return EncodedResponse(400, _error_payload("Request body must contain a query string"))
+
+        variables, operation_name = body.get("variables") or {}, body.get("operationName")
+        key = (query, json.dumps(variables, sort_keys=True), operation_name)
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+        response = self.execute(query, variables, operation_name)
+        if response.status == 200:
+            self.responses.set(key, response)
+        return response
+
+    def _persisted_query(self, query: Optional[str], persisted: Dict[str, Any]) -> Any:
+        """The query text for an APQ request, or the error response."""
+        if not self.persisted_queries:
+            return EncodedResponse(200, _error_payload("PersistedQueryNotSupported", code="PERSISTED_QUERY_NOT_SUPPORTED"))
+        sha256 = persisted.get("sha256Hash")
+        if query is None:
+            query = self.persisted.get(sha256)
+            with self._lock:
+                if query is None:
+                    self.persisted_misses += 1
+                    return EncodedResponse(200, _error_payload("PersistedQueryNotFound", code="PERSISTED_QUERY_NOT_FOUND"))
+                self.persisted_hits += 1
+            return query
+        if not isinstance(query, str) or hashlib.sha256(query.encode("utf-8")).hexdigest() != sha256:
+            return EncodedResponse(400, _error_payload("provided sha does not match query"))
+        self.persisted.set(sha256, query)
+        return query
+
+    def execute(self, query: str, variables: Dict[str, Any], operation_name: Optional[str] = None) -> EncodedResponse:
+        """Parse, validate and resolve one request; no cache, no faults."""
+        with self._lock:
+            self.executed += 1
+        try:
+            operations = self.documents.get(query)
+            if operations is None:
+                operations = parse_document(query)
+                self.documents.set(query, operations)
+            operation = select_operation(operations, operation_name)
+            if operation.kind != "query":
+                raise GraphQLError(f"{operation.kind.capitalize()} operations are not supported by this endpoint")
+            values = coerce_variables(operation, variables if isinstance(variables, dict) else {})
+        except GraphQLError as exc:
+            # Document and variable errors: the request is rejected as a whole
+            return EncodedResponse(400, _error_payload(str(exc)))
+
+        data: Dict[str, Any] = {}
+        errors = []
+        for field in operation.selections:
+            try:
+                data[field.alias] = self._resolve_root(field, values)
+            except (GraphQLError, ValueError, TypeError) as exc:
+                data[field.alias] = None
+                errors.append(_error_payload(str(exc), [field.alias])["errors"][0])
+        payload: Dict[str, Any] = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        return EncodedResponse(200, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "executed": self.executed,
+            "injected_errors": self.injected_errors,
+            "persisted_queries": len(self.persisted),
+            "persisted_hits": self.persisted_hits,
+            "persisted_misses": self.persisted_misses,
+            "cached_responses": len(self.responses),
+            "response_cache": self.responses.stats(),
+        }
+
+    # -- resolvers ----------------------------------------------------------
+
+    def _resolve_root(self, field: Field, variables: Dict[str, Any]) -> Any:
+        if field.name == "__typename":
+            return "Query"
+        if field.name == "simulations":
+            return _project(self.dataset.simulations(), field, "Query")
+        if field.name == "simulation":
+            identifier = argument_values(field, variables).get("identifier")
+            if not isinstance(identifier, str) or not identifier:
+                raise GraphQLError('Field "simulation" argument "identifier" of type "UUID!" is required.')
+            return self._resolve_simulation(identifier, field, variables)
+        raise GraphQLError(f'Cannot query field "{field.name}" on type "Query".')
+
+    def _resolve_simulation(self, identifier: str, field: Field, variables: Dict[str, Any]) -> Dict[str, Any]:
+        names = {entry["identifier"]: entry["name"] for entry in self.dataset.simulations()}
+        result = {}
+        for selection in field.selections:
+            if selection.name == "charts":
+                result[selection.alias] = self._resolve_charts(identifier, selection, variables)
+            elif selection.name == "sites":
+                result[selection.alias] = _project(self.dataset.sites(), selection, "Simulation")
+            elif selection.name in ("identifier", "name", "__typename"):
+                result[selection.alias] = {
+                    "identifier": identifier,
+                    "name": names.get(identifier, f"Simulation {identifier}"),
+                    "__typename": "Simulation",
+                }[selection.name]
+            else:
+                raise GraphQLError(f'Cannot query field "{selection.name}" on type "Simulation".')
+        return result
+
+    def _resolve_charts(self, identifier: str, field: Field, variables: Dict[str, Any]) -> Dict[str, Any]:
+        result = {}
+        for selection in field.selections:
+            arguments = argument_values(selection, variables)
+            sites = arguments.get("sites") or []
+            if selection.name == "demandByFulfillmentDonut":
+                if not arguments.get("from") or not arguments.get("until"):
+                    raise GraphQLError('Field "demandByFulfillmentDonut" requires the "from" and "until" arguments.')
+                value = self.dataset.donut(identifier, arguments["from"], arguments["until"], sites)
+            elif selection.name == "demandByFulfillmentHistogram":
+                boundaries = arguments.get("periodBoundaries")
+                if not isinstance(boundaries, list):
+                    raise GraphQLError('Field "demandByFulfillmentHistogram" requires the "periodBoundaries" argument.')
+                value = self.dataset.histogram(identifier, boundaries, sites)
+            elif selection.name == "__typename":
+                result[selection.alias] = "Charts"
+                continue
+            else:
+                raise GraphQLError(f'Cannot query field "{selection.name}" on type "Charts".')
+            result[selection.alias] = _project(value, selection, "Charts")
+        return result
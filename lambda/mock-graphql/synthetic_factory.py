@@ -0,0 +1,188 @@
+"""
+Deterministic synthetic demand data for the mock FactoryTwin endpoint
+
+Every (seed, simulation identifier, site) gets its own daily demand series
+per category over a fixed horizon (weekday/weekend pattern, seasonality,
+growth and noise). Any identifier resolves, so batch and load tests can
+use as many simulations as they like. The same seed always yields the same
+numbers.
+
+Series are stored as cumulative sums (array('q'), values in cents), so the
+totals for any [from, until) range are two lookups per category: donuts and
+histograms with arbitrary period boundaries agree with each other exactly.
+Day d's demand is counted at d 00:00 UTC, so an instant selects the days
+starting at or after it.
+"""
+
+import hashlib
+import math
+import random
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BASE_CATEGORIES = [
+    # name, monthly quantity across all sites, unit price in cents
+    ("Firm Order", 4000, 672_000),
+    ("Overdue", 140, 724_000),
+    ("Forecasted", 2200, 631_000),
+]
+
+
+def _stable_int(*parts: Any) -> int:
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _stable_uuid(*parts: Any) -> str:
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=16).digest()
+    return str(uuid.UUID(bytes=digest))
+
+
+def parse_day_start(value: Any) -> datetime:
+    """ISO 8601 instant (Z or offset, date-only allowed) as naive UTC."""
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"Invalid Instant: {value!r}")
+    text = value.strip().replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(text if "T" in text or len(text) > 10 else text + "T00:00:00")
+    except ValueError:
+        raise ValueError(f"Invalid Instant: {value!r}") from None
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+class SyntheticDataset:
+    """Seeded demand series for any number of simulations, sites and categories."""
+
+    def __init__(self, seed: int = 42, simulations: int = 8, sites: int = 4, categories: int = 3,
+                 start: str = "2024-01-01", days: int = 1461, cache_size: int = 64):
+        self.seed = seed
+        self.start = date.fromisoformat(start)
+        self.days = days
+        self.categories = [name for name, _, _ in BASE_CATEGORIES[:categories]] + [
+            f"Category {i + 1}" for i in range(max(0, categories - len(BASE_CATEGORIES)))
+        ]
+        self.simulation_ids = [_stable_uuid(seed, "simulation", i) for i in range(simulations)]
+        self.site_ids = [_stable_uuid(seed, "site", i) for i in range(sites)]
+        self.cache_size = cache_size
+        self._series: "OrderedDict[tuple, Tuple[List[array], List[array]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def simulations(self) -> List[Dict[str, str]]:
+        return [{"identifier": identifier, "name": f"Simulation {i + 1}"}
+                for i, identifier in enumerate(self.simulation_ids)]
+
+    def sites(self) -> List[Dict[str, str]]:
+        return [{"identifier": identifier, "name": f"Site {i + 1}"} for i, identifier in enumerate(self.site_ids)]
+
+    def day_index(self, instant: Any) -> int:
+        """Index of the first day starting at or after instant, clamped to the horizon."""
+        moment = parse_day_start(instant)
+        offset = (moment.date() - self.start).days
+        if moment.time() != datetime.min.time():
+            offset += 1
+        return min(max(offset, 0), self.days)
+
+    def _category_profile(self, simulation: str, index: int) -> Tuple[float, int]:
+        if index < len(BASE_CATEGORIES):
+            _, monthly, price = BASE_CATEGORIES[index]
+            return float(monthly), price
+        rng = random.Random(_stable_int(self.seed, "category", index))
+        return float(rng.randint(200, 1500)), rng.randint(100_000, 900_000)
+
+    def _site_series(self, simulation: str, site: str) -> Tuple[List[array], List[array]]:
+        """Cumulative daily (quantity, value cents) per category for one site."""
+        rng = random.Random(_stable_int(self.seed, simulation, site))
+        site_share = rng.uniform(0.5, 1.5) / max(len(self.site_ids), 1)
+        scale = random.Random(_stable_int(self.seed, simulation)).uniform(0.6, 1.4)
+        weekday0 = self.start.weekday()
+        quantities, values = [], []
+        for index in range(len(self.categories)):
+            monthly, price = self._category_profile(simulation, index)
+            growth = rng.uniform(-0.05, 0.25)
+            phase = rng.uniform(0, 2 * math.pi)
+            base = monthly * site_share * scale * 7 / (30.44 * 5.8)
+            q_sum, v_sum = array("q", [0]), array("q", [0])
+            total_q = total_v = 0
+            for day in range(self.days):
+                mean = base * (1 + 0.15 * math.sin(2 * math.pi * day / 365.25 + phase)) * (1 + growth * day / 365.25)
+                if (weekday0 + day) % 7 >= 5:
+                    mean *= 0.4
+                quantity = max(0, round(rng.gauss(mean, math.sqrt(mean) + 0.5)))
+                total_q += quantity
+                if quantity:
+                    total_v += round(quantity * price * (1 + rng.gauss(0, 0.03)))
+                q_sum.append(total_q)
+                v_sum.append(total_v)
+            quantities.append(q_sum)
+            values.append(v_sum)
+        return quantities, values
+
+    def series(self, simulation: str, sites: Optional[Sequence[str]] = None) -> Tuple[List[array], List[array]]:
+        """Cumulative series for a simulation summed over sites (default: all)."""
+        site_key = tuple(sorted(set(sites))) if sites else ()
+        key = (simulation, site_key)
+        with self._lock:
+            cached = self._series.get(key)
+            if cached is not None:
+                self._series.move_to_end(key)
+                return cached
+        unknown = [site for site in site_key if site not in self.site_ids]
+        if unknown:
+            raise ValueError(f"Unknown site: {unknown[0]}")
+
+        parts = [self._site_series(simulation, site) for site in (site_key or self.site_ids)]
+        quantities = [array("q", map(sum, zip(*(part[0][c] for part in parts)))) for c in range(len(self.categories))]
+        values = [array("q", map(sum, zip(*(part[1][c] for part in parts)))) for c in range(len(self.categories))]
+        with self._lock:
+            self._series[key] = (quantities, values)
+            while len(self._series) > self.cache_size:
+                self._series.popitem(last=False)
+        return quantities, values
+
+    def totals(self, simulation: str, sites: Optional[Sequence[str]], first_day: int, end_day: int) -> List[Dict[str, Any]]:
+        """stackDataList for the days [first_day, end_day)."""
+        quantities, values = self.series(simulation, sites)
+        end_day = max(end_day, first_day)
+        return [
+            {
+                "name": name,
+                "quantity": quantities[c][end_day] - quantities[c][first_day],
+                "value": (values[c][end_day] - values[c][first_day]) / 100,
+            }
+            for c, name in enumerate(self.categories)
+        ]
+
+    def donut(self, simulation: str, from_date: str, until_date: str,
+              sites: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        return {
+            "startDate": from_date,
+            "stackDataList": self.totals(simulation, sites, self.day_index(from_date), self.day_index(until_date)),
+        }
+
+    def histogram(self, simulation: str, boundaries: Sequence[str],
+                  sites: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """One period per consecutive boundary pair, startDate as sent."""
+        days = [self.day_index(boundary) for boundary in boundaries]
+        return [
+            {"startDate": boundaries[i], "stackDataList": self.totals(simulation, sites, days[i], days[i + 1])}
+            for i in range(len(boundaries) - 1)
+        ]
+
+    def month_boundaries(self, first: str, months: int) -> List[str]:
+        """months + 1 month-start boundaries from the month of first."""
+        start = parse_day_start(first)
+        boundaries = []
+        for offset in range(months + 1):
+            year, month = divmod(start.month - 1 + offset, 12)
+            boundaries.append(f"{start.year + year:04d}-{month + 1:02d}-01T00:00:00Z")
+        return boundaries
+
+    def horizon(self) -> Tuple[str, str]:
+        end = self.start + timedelta(days=self.days)
+        return f"{self.start.isoformat()}T00:00:00Z", f"{end.isoformat()}T00:00:00Z"
@@ -0,0 +1,82 @@
+"""
+Follow-up detection for the Orchestrator
+
+Purpose: Decides, without an LLM call, whether a question is a pure
+follow-up on the data already shown ("why is that?", "break that down
+more", "what does this mean for production?"). Pure follow-ups are answered
+from the session's working set, skipping intent classification and the
+GraphQL fetch; anything that may select different data goes through the
+whole pipeline.
+
+A question is a follow-up when it
+- is not a thank-you or goodbye (shared conversational pattern),
+- names no dates or periods (months, years, quarters, "last", "next", ...),
+- names no category or measure (firm orders, overdue, forecast, revenue,
+  average, highest, how many, ...), since those set a new extraction type, and
+- opens with a follow-up phrase, or is short and refers back ("that",
+  "this", "it", "those", ...).
+
+When unsure it answers False: a missed follow-up only costs the usual
+classification and fetch.
+"""
+
+import re
+from typing import Optional
+
+from conversational import is_conversational
+from question_normalizer import normalize_question
+
+# Same date vocabulary as the intent classifier's DATE_MENTION_RE (month and
+# year words select a date range; "monthly" / "by month" are breakdowns)
+DATE_RE = re.compile(
+    r"\b(january|february|march|april|may|june|july|august|september|october|"
+    r"november|december|20\d{2}|q[1-4]|quarters?|years?|weeks?|next|last|since|until|between|"
+    r"today|yesterday|tomorrow|ytd)\b"
+)
+
+# Words that choose an extraction type or a different measure
+NEW_DATA_RE = re.compile(
+    r"\b(firm|overdue|forecast\w*|revenue|average|highest|lowest|peak month|"
+    r"how many|count|simulation|site|sites)\b"
+)
+
+FOLLOWUP_OPENING_RE = re.compile(
+    r"^(why|how come|and why|explain|elaborate|tell me more|more detail|go deeper|expand|"
+    r"break (that|this|it) down|can you (explain|elaborate|expand|break)|could you (explain|elaborate|expand|break)|"
+    r"what does (that|this|it) mean|what do (those|these) (numbers )?mean|what should (i|we) do|"
+    r"what do you (recommend|suggest)|is (that|this|it) (good|bad|normal|a problem|expected)|"
+    r"what (are|is) the (implication|implications|risk|risks|reason|reasons)|"
+    r"how (does|do|should) (that|this|it|those|these)|what about (that|this|it))\b"
+)
+
+REFERENCE_RE = re.compile(r"\b(that|this|it|its|those|these|them|they|above|previous|same)\b")
+
+# Longer questions that merely contain "it" are usually new questions
+SHORT_QUESTION_WORDS = 8
+
+TIME_BREAKDOWN_RE = re.compile(
+    r"\b(monthly|per month|by month|each month|month by month|over time|trends?|timeline|"
+    r"weekly|pattern|seasonal\w*|peaks?|busiest)\b"
+)
+SHARE_RE = re.compile(r"\b(percent(age)?s?|share|proportion|split|by category|categories|donut|pie)\b")
+
+
+def is_followup_question(question: str) -> bool:
+    """True when question is a pure follow-up on the previous answer's data."""
+    text = normalize_question(question)
+    # "Thanks for that" refers back too, but gets the acknowledgment, not an answer
+    if not text or is_conversational(text) or DATE_RE.search(text) or NEW_DATA_RE.search(text):
+        return False
+    if FOLLOWUP_OPENING_RE.match(text):
+        return True
+    return len(text.split(" ")) <= SHORT_QUESTION_WORDS and bool(REFERENCE_RE.search(text))
+
+
+def wanted_endpoint(question: str) -> Optional[str]:
+    """The chart a follow-up asks to see, when it names one: time breakdowns or category shares."""
+    text = normalize_question(question)
+    if TIME_BREAKDOWN_RE.search(text):
+        return "demandByFulfillmentHistogram"
+    if SHARE_RE.search(text):
+        return "demandByFulfillmentDonut"
+    return None
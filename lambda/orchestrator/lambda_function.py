@@ -8,49 +8,385 @@ This is the main entry point that frontend will call
 
 import json
 
-import boto3
-
 import os
+import sys
 
+# Shared helpers: lambda/shared locally, packaged alongside (or as a layer) when deployed
+_SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")
+if os.path.isdir(_SHARED_DIR) and _SHARED_DIR not in sys.path:
+    sys.path.append(_SHARED_DIR)
 
-# Initialize Lambda client
-lambda_client = boto3.client('lambda')
+from followup_detector import is_followup_question, wanted_endpoint
+from session_store import (get_session_store, history_digest, make_turn, make_working_set, new_session_id,
+                           same_date_range)
+from request_coalescing import coalescing_key, pipeline_flights, run_coalesced, stream_coalesced
+from speculative_prefetch import resolve_prefetch, start_prefetch
+from stage_executors import get_stage_executor
+from structured_log import bind_request, current_request_id, get_logger
+from tracing import SPAN_KIND_SERVER, finish_trace, get_tracer
 
+log = get_logger("orchestrator")
+tracer = get_tracer("orchestrator")
 
-# Lambda function names
-INTENT_CLASSIFIER_FUNCTION = "FactoryTwin-IntentClassifier"
 
-GRAPHQL_CLIENT_FUNCTION = "FactoryTwin-GraphQLClient"
+ACKNOWLEDGMENT_MESSAGE = "You're welcome! Let me know if you have any other questions about your demand data."
 
-RESPONSE_GENERATOR_FUNCTION = "FactoryTwin-ResponseGenerator"
+# Keys of the Response Generator's all_available_data per chart endpoint
+AVAILABLE_DATA_KEYS = {
+    "demandByFulfillmentDonut": "donut",
+    "demandByFulfillmentHistogram": "histogram",
+}
 
+# Extraction type for a follow-up that switches charts ("break that down by
+# category" after a monthly figure shows the category split)
+CHART_EXTRACTION_TYPES = {
+    "demandByFulfillmentDonut": "total",
+    "demandByFulfillmentHistogram": "monthly_count",
+}
 
 
 
-def invoke_lambda(function_name, payload):
+def classify_and_fetch(user_question, executor):
     """
-    Invoke another Lambda function synchronously
+    Steps 1-2 of the pipeline. Returns (acknowledgment, state): for
+    conversational messages the acknowledgment is the complete response and
+    state is None; otherwise state holds the intent and the GraphQL data.
     """
-    print(f"Invoking Lambda: {function_name}")
-    print(f"Payload: {json.dumps(payload)[:200]}...")
+    # Optionally start the GraphQL fetch while the classifier is running
+    prefetched = start_prefetch(executor, user_question)
+    
+    # ============================================================
+    # STEP 1: Classify Intent
+    # ============================================================
+    with log.stage("intent_classification", mode=executor.mode) as stage, tracer.span("intent_classification"):
+        intent = executor.classify(user_question)
+        endpoint = intent['endpoint']
+        extraction_type = intent['extraction_type']
+        date_range = intent.get('date_range')
+        confidence = intent.get('confidence', 0)
+        stage.update(endpoint=endpoint, extraction_type=extraction_type, confidence=confidence)
     
+    if endpoint == "conversational":
+        # Thank-you / goodbye: no data to fetch, drop any speculative fetches
+        resolve_prefetch(prefetched, endpoint, date_range)
+        return {
+            "type": "acknowledgment",
+            "question": user_question,
+            "answer": ACKNOWLEDGMENT_MESSAGE,
+            "endpoint": endpoint,
+            "confidence": confidence,
+            "pipeline_mode": executor.mode,
+            "processing_steps": {
+                "intent_classification": "success",
+                "graphql_query": "skipped",
+                "response_generation": "skipped"
+            }
+        }, None
+    
+    # ============================================================
+    # STEP 2: Query GraphQL
+    # ============================================================
+    with log.stage("graphql_query", mode=executor.mode, endpoint=endpoint) as stage, \
+            tracer.span("graphql_query", endpoint=endpoint) as span:
+        graphql_data, prefetch_status = resolve_prefetch(prefetched, endpoint, date_range)
+        if graphql_data is None:
+            graphql_data = executor.fetch(endpoint, date_range, extraction_type)
+        stage["prefetch"] = span["prefetch"] = prefetch_status
+    
+    return None, {
+        "endpoint": endpoint,
+        "extraction_type": extraction_type,
+        "date_range": date_range,
+        "confidence": confidence,
+        "graphql_data": graphql_data,
+        "prefetch_status": prefetch_status,
+    }
+
+
+def load_working_set(session_id):
+    """The session's working set, or None (no session, nothing answered yet, or the store failed)."""
+    if not session_id:
+        return None
     try:
-        response = lambda_client.invoke(
-            FunctionName=function_name,
-            InvocationType='RequestResponse',
-            Payload=json.dumps(payload)
-        )
-        
-        # Parse response
-        response_payload = json.loads(response['Payload'].read())
-        
-        print(f"Response from {function_name}: {response_payload.get('statusCode')}")
-        
-        return response_payload
-        
+        return get_session_store().working_set(session_id)
     except Exception as e:
-        print(f"Error invoking {function_name}: {str(e)}")
-        raise
+        log.warning("session_store_failed", operation="working_set", error=type(e).__name__, message=str(e))
+        return None
+
+
+def followup_from_working_set(user_question, working_set, executor):
+    """
+    State for a pure follow-up, answered from the previous turn's intent and
+    data. A follow-up that asks for the other chart (say "break that down by
+    month" after a donut) switches to that chart and its extraction type;
+    only when the working set does not hold it yet is it fetched, for the
+    same date range.
+    """
+    data = dict(working_set["graphql_data"])
+    fetched = "reused"
+    endpoint, extraction_type = working_set["endpoint"], working_set["extraction_type"]
+    wanted = wanted_endpoint(user_question)
+    if wanted and wanted != endpoint:
+        endpoint, extraction_type = wanted, CHART_EXTRACTION_TYPES[wanted]
+        if wanted not in data:
+            with log.stage("graphql_query", mode=executor.mode, endpoint=wanted, followup=True), \
+                    tracer.span("graphql_query", endpoint=wanted, followup=True):
+                data[wanted] = executor.fetch(wanted, working_set["date_range"], extraction_type)
+            fetched = "success"
+    return {
+        "endpoint": endpoint,
+        "extraction_type": extraction_type,
+        "date_range": working_set["date_range"],
+        "confidence": working_set["confidence"],
+        "graphql_data": data[endpoint],
+        "prefetch_status": "off",
+        "is_followup": True,
+        "working_data": data,
+        "steps": {"intent_classification": "reused", "graphql_query": fetched},
+    }
+
+
+def answers_from_working_set(user_question, working_set, is_followup):
+    """
+    True when the question is answered from the session's working set:
+    is_followup True, or None and the follow-up detector agrees.
+    """
+    if not working_set or is_followup is False:
+        return False
+    return bool(is_followup) or is_followup_question(user_question)
+
+
+def with_working_data(state, working_set):
+    """
+    Copy of state whose working data keeps the other chart from the
+    session's working set while the date range is unchanged (states may be
+    shared by coalesced requests, so they are not modified).
+    """
+    if not working_set or not same_date_range(working_set["date_range"], state["date_range"]):
+        return state
+    return dict(state, working_data=dict(working_set["graphql_data"], **state["working_data"]))
+
+
+def response_request(user_question, state, use_cache=True, conversation_history="", is_followup=False):
+    """Request body for the Response Generator."""
+    return {
+        "question": user_question,
+        "graphql_data": state["graphql_data"],
+        "endpoint": state["endpoint"],
+        "extraction_type": state["extraction_type"],
+        "date_range": state["date_range"],
+        # The other chart, when the session's working set holds it (the current one is graphql_data)
+        "all_available_data": {
+            AVAILABLE_DATA_KEYS[name]: data for name, data in state.get("working_data", {}).items()
+            if name in AVAILABLE_DATA_KEYS and name != state["endpoint"]
+        },
+        "conversation_history": conversation_history,
+        "is_followup": is_followup,
+        "use_cache": use_cache
+    }
+
+
+def session_history(session_id, is_followup):
+    """History digest of the session's earlier turns for a follow-up question ("" otherwise)."""
+    if not (session_id and is_followup):
+        return ""
+    try:
+        return history_digest(get_session_store().turns(session_id))
+    except Exception as e:
+        # The answer does not depend on the history being available
+        log.warning("session_store_failed", operation="read", error=type(e).__name__, message=str(e))
+        return ""
+
+
+def record_turn(session_id, user_question, state, response_body):
+    """Append the answered question to the session and keep its data as the working set (no-op without a session id)."""
+    if not session_id:
+        return
+    try:
+        store = get_session_store()
+        store.append(session_id, make_turn(user_question, state, response_body.get('extracted_data')))
+        store.save_working_set(session_id, make_working_set(state, response_body.get('extracted_data')))
+    except Exception as e:
+        log.warning("session_store_failed", operation="append", error=type(e).__name__, message=str(e))
+
+
+def final_response(user_question, state, response_body, executor, session_id=None, coalesced=False):
+    """Complete response dict for the frontend."""
+    return {
+        "question": user_question,
+        "session_id": session_id,
+        "answer": response_body['response'],
+        "chart_data": response_body['chart_data'],
+        "visualization_type": response_body['visualization_type'],
+        "endpoint": state["endpoint"],
+        "extracted_data": response_body['extracted_data'],
+        "confidence": state["confidence"],
+        "pipeline_mode": executor.mode,
+        "request_id": current_request_id(),
+        "response_cached": response_body.get('response_cached', False),
+        "prompt_tokens": response_body.get('prompt_tokens'),
+        "is_followup": state.get("is_followup", False),
+        "coalesced": coalesced,
+        "processing_steps": dict(
+            {"intent_classification": "success", "graphql_query": "success"},
+            **state.get("steps", {}),
+            response_generation="success",
+            speculative_prefetch=state["prefetch_status"],
+        )
+    }
+
+
+def chart_event(state, response_body):
+    """Payload of the "chart" event for a response body."""
+    return {
+        "chart_data": response_body['chart_data'],
+        "visualization_type": response_body['visualization_type'],
+        "endpoint": state["endpoint"],
+        "extracted_data": response_body['extracted_data'],
+        "agentic_decision": response_body.get('agentic_decision', ''),
+    }
+
+
+def generate_answer(user_question, state, executor, use_cache=True, session_id=None):
+    """Step 3: the Response Generator's body for state (with the history digest for follow-ups)."""
+    with log.stage("response_generation", mode=executor.mode, endpoint=state["endpoint"]) as stage, \
+            tracer.span("response_generation"):
+        history = session_history(session_id, state["is_followup"])
+        response_body = executor.respond(response_request(user_question, state, use_cache, history, state["is_followup"]))
+        stage.update(
+            visualization_type=response_body.get('visualization_type'),
+            prompt_tokens=response_body.get('prompt_tokens'),
+            cached=response_body.get('response_cached', False),
+        )
+    return response_body
+
+
+def stream_answer(user_question, state, executor, use_cache=True, session_id=None):
+    """Streaming step 3: yields "chart" and "token" events and returns the Response Generator's final body."""
+    response_body = None
+    with log.stage("response_generation", mode=executor.mode, endpoint=state["endpoint"], streaming=True) as stage, \
+            tracer.span("response_generation", streaming=True):
+        stage["tokens"] = 0
+        history = session_history(session_id, state["is_followup"])
+        request = response_request(user_question, state, use_cache, history, state["is_followup"])
+        for event, payload in executor.respond_stream(request):
+            if event == "chart":
+                yield "chart", chart_event(state, payload)
+            elif event == "token":
+                stage["tokens"] += 1
+                yield "token", payload
+            elif event == "done":
+                stage.update(
+                    visualization_type=payload.get('visualization_type'),
+                    prompt_tokens=payload.get('prompt_tokens'),
+                    cached=payload.get('response_cached', False),
+                )
+                response_body = payload
+    return response_body
+
+
+def answer_question(user_question, executor, use_cache=True, session_id=None, is_followup=False):
+    """
+    Steps 1-3 for a question that is not answered from a working set.
+    Returns (acknowledgment, None, None) for conversational messages and
+    (None, state, response body) otherwise.
+    """
+    acknowledgment, state = classify_and_fetch(user_question, executor)
+    if acknowledgment:
+        return acknowledgment, None, None
+    state.update(is_followup=is_followup, working_data={state["endpoint"]: state["graphql_data"]})
+    return None, state, generate_answer(user_question, state, executor, use_cache, session_id)
+
+
+def stream_answer_question(user_question, executor, use_cache=True, session_id=None, is_followup=False):
+    """answer_question() relaying the answer's "chart" and "token" events as they are produced."""
+    acknowledgment, state = classify_and_fetch(user_question, executor)
+    if acknowledgment:
+        return acknowledgment, None, None
+    state.update(is_followup=is_followup, working_data={state["endpoint"]: state["graphql_data"]})
+    response_body = yield from stream_answer(user_question, state, executor, use_cache, session_id)
+    return None, state, response_body
+
+
+def run_pipeline(user_question, executor=None, use_cache=True, session_id=None, is_followup=None, simulation_id=None):
+    """
+    Run Intent Classifier → GraphQL Client → Response Generator for one question
+    and return the complete response dict for the frontend.
+    use_cache=False bypasses the Response Generator's answer cache.
+
+    With a session_id the answered turn and its data are kept in the session
+    store. A follow-up (is_followup, or detected when it is None) reuses the
+    previous turn's intent and data, skipping classification and fetch, and
+    is answered with a digest of the earlier turns.
+
+    Other questions are coalesced (see request_coalescing): concurrent
+    requests for the same question and simulation_id share one run, and
+    their responses report "coalesced": true.
+
+    The executor decides whether stages run as remote Lambda invocations or
+    in-process (see stage_executors.PIPELINE_MODE).
+    """
+    executor = executor or get_stage_executor()
+    working_set = load_working_set(session_id)
+    coalesced = False
+    
+    if answers_from_working_set(user_question, working_set, is_followup):
+        state = followup_from_working_set(user_question, working_set, executor)
+        response_body = generate_answer(user_question, state, executor, use_cache, session_id)
+    else:
+        # A flagged follow-up is answered with this session's history, so it is never shared
+        key = None if is_followup else coalescing_key(user_question, simulation_id, use_cache)
+        (acknowledgment, state, response_body), coalesced = run_coalesced(
+            key, lambda: answer_question(user_question, executor, use_cache, session_id, bool(is_followup))
+        )
+        if coalesced:
+            log.info("request_coalesced", executions=pipeline_flights.executions, coalesced=pipeline_flights.coalesced)
+        if acknowledgment:
+            return dict(acknowledgment, session_id=session_id, coalesced=coalesced)
+        state = with_working_data(state, working_set)
+    
+    record_turn(session_id, user_question, state, response_body)
+    return final_response(user_question, state, response_body, executor, session_id, coalesced)
+
+
+def stream_pipeline(user_question, executor=None, use_cache=True, session_id=None, is_followup=None, simulation_id=None):
+    """
+    Streaming variant of run_pipeline(). Yields (event, payload) pairs:
+    - ("chart", {chart_data, visualization_type, endpoint, extracted_data, agentic_decision})
+      as soon as the data is fetched and the chart chosen, before any LLM text
+    - ("token", {"text": chunk}) while the answer is generated
+    - ("done", complete response dict, same as run_pipeline())
+    Conversational messages yield only "done" with the acknowledgment.
+    session_id, is_followup and simulation_id work as in run_pipeline(); a
+    request that joins a run already under way gets its chart and the whole
+    answer as one token when the run finishes.
+    """
+    executor = executor or get_stage_executor()
+    working_set = load_working_set(session_id)
+    coalesced = False
+    
+    if answers_from_working_set(user_question, working_set, is_followup):
+        state = followup_from_working_set(user_question, working_set, executor)
+        response_body = yield from stream_answer(user_question, state, executor, use_cache, session_id)
+    else:
+        key = None if is_followup else coalescing_key(user_question, simulation_id, use_cache)
+        (acknowledgment, state, response_body), coalesced = yield from stream_coalesced(
+            key, lambda: stream_answer_question(user_question, executor, use_cache, session_id, bool(is_followup))
+        )
+        if coalesced:
+            log.info("request_coalesced", executions=pipeline_flights.executions, coalesced=pipeline_flights.coalesced)
+        if acknowledgment:
+            yield "done", dict(acknowledgment, session_id=session_id, coalesced=coalesced)
+            return
+        if coalesced and response_body is not None:
+            yield "chart", chart_event(state, response_body)
+            yield "token", {"text": response_body["response"]}
+        state = with_working_data(state, working_set)
+    
+    # Sent after the stage span closes, so the caller can attach complete timings
+    if response_body is not None:
+        record_turn(session_id, user_question, state, response_body)
+        yield "done", final_response(user_question, state, response_body, executor, session_id, coalesced)
 
 
 
@@ -58,6 +394,7 @@ def invoke_lambda(function_name, payload):
 def lambda_handler(event, context):
     """
     Main orchestrator that chains all 3 Lambda functions
+    (remote invokes or in-process, depending on PIPELINE_MODE)
     
     Flow:
     1. Receive user question
@@ -67,14 +404,21 @@ def lambda_handler(event, context):
     5. Return complete response to frontend
     """
     
-    print(f"Orchestrator received event: {json.dumps(event)}")
-    
+    with log.stage("orchestrator") as stage:
+        response = _handle(event, stage)
+        stage["status_code"] = response["statusCode"]
+        return response
+
+
+def _handle(event, stage):
     try:
         # Parse incoming request
         if isinstance(event.get('body'), str):
             body = json.loads(event['body'])
         else:
             body = event.get('body', event)
+        request_id = bind_request(body.get('request_id'))
+        log.payload("event", event)
         
         user_question = body.get('question', '')
         
@@ -93,103 +437,26 @@ def lambda_handler(event, context):
                 })
             }
         
-        print(f"Processing question: {user_question}")
-        
-        # ============================================================
-        # STEP 1: Classify Intent
-        # ============================================================
-        print("\n" + "="*60)
-        print("STEP 1: Intent Classification")
-        print("="*60)
-        
-        intent_response = invoke_lambda(
-            INTENT_CLASSIFIER_FUNCTION,
-            {"body": json.dumps({"question": user_question})}
-        )
-        
-        if intent_response.get('statusCode') != 200:
-            raise Exception(f"Intent classification failed: {intent_response}")
-        
-        intent_body = json.loads(intent_response['body'])
-        endpoint = intent_body['endpoint']
-        extraction_type = intent_body['extraction_type']
-        confidence = intent_body.get('confidence', 0)
-        
-        print(f"✅ Intent: {endpoint}")
-        print(f"✅ Extraction: {extraction_type}")
-        print(f"✅ Confidence: {confidence}")
-        
-        # ============================================================
-        # STEP 2: Query GraphQL
-        # ============================================================
-        print("\n" + "="*60)
-        print("STEP 2: GraphQL Query")
-        print("="*60)
-        
-        graphql_response = invoke_lambda(
-            GRAPHQL_CLIENT_FUNCTION,
-            {"body": json.dumps({"endpoint": endpoint})}
-        )
-        
-        if graphql_response.get('statusCode') != 200:
-            raise Exception(f"GraphQL query failed: {graphql_response}")
-        
-        graphql_body = json.loads(graphql_response['body'])
-        graphql_data = graphql_body['data']
-        
-        print(f"✅ Data retrieved from {endpoint}")
-        
-        # ============================================================
-        # STEP 3: Generate Response
-        # ============================================================
-        print("\n" + "="*60)
-        print("STEP 3: Response Generation")
-        print("="*60)
-        
-        response_response = invoke_lambda(
-            RESPONSE_GENERATOR_FUNCTION,
-            {
-                "body": json.dumps({
-                    "question": user_question,
-                    "graphql_data": graphql_data,
-                    "endpoint": endpoint,
-                    "extraction_type": extraction_type
-                })
-            }
-        )
-        
-        if response_response.get('statusCode') != 200:
-            raise Exception(f"Response generation failed: {response_response}")
-        
-        response_body = json.loads(response_response['body'])
-        
-        print(f"✅ Response generated")
-        print(f"Answer: {response_body['response'][:100]}...")
+        # The request id doubles as the trace id (both are 32 hex characters)
+        trace = tracer.start_trace(request_id)
+        try:
+            with tracer.span("orchestrator.request", kind=SPAN_KIND_SERVER):
+                final_response = run_pipeline(
+                    user_question,
+                    use_cache=body.get('use_cache', True) is not False,
+                    session_id=body.get('session_id') or new_session_id(),
+                    is_followup=body.get('is_followup'),
+                    simulation_id=body.get('simulation_id'),
+                )
+        finally:
+            finish_trace(trace)
+        if body.get('include_timings'):
+            final_response["timings"] = trace.timings()
+        stage.update(endpoint=final_response.get('endpoint'), pipeline_mode=final_response.get('pipeline_mode'))
         
         # ============================================================
         # STEP 4: Return Complete Response
         # ============================================================
-        print("\n" + "="*60)
-        print("STEP 4: Returning Complete Response")
-        print("="*60)
-        
-        final_response = {
-            "question": user_question,
-            "answer": response_body['response'],
-            "chart_data": response_body['chart_data'],
-            "visualization_type": response_body['visualization_type'],
-            "endpoint": endpoint,
-            "extracted_data": response_body['extracted_data'],
-            "confidence": confidence,
-            "processing_steps": {
-                "intent_classification": "success",
-                "graphql_query": "success",
-                "response_generation": "success"
-            }
-        }
-        
-        print("✅ Complete response ready")
-        
         return {
             "statusCode": 200,
             "headers": {
@@ -202,9 +469,7 @@ def lambda_handler(event, context):
         }
         
     except Exception as e:
-        print(f"\n❌ ERROR in orchestrator: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception("handler_error", e)
         
         return {
             "statusCode": 500,
@@ -226,15 +491,20 @@ def lambda_handler(event, context):
 
 # For local testing
 if __name__ == "__main__":
-    # This won't work locally because it needs to invoke other Lambdas
-    # But shows the structure
+    # Remote mode needs to invoke other Lambdas; in-process mode
+    # (PIPELINE_MODE=inprocess) runs the whole chain locally
     test_event = {
         "body": json.dumps({
             "question": "What is the revenue from my total firm orders?"
         })
     }
     
-    print("Orchestrator Lambda - requires AWS Lambda environment to run")
-    print("Deploy to AWS and test with:")
-    print("aws lambda invoke --function-name FactoryTwin-Orchestrator --payload file://test.json out.json")
+    if os.environ.get("PIPELINE_MODE") == "inprocess":
+        result = lambda_handler(test_event, {})
+        print(json.dumps(json.loads(result['body']), indent=2)[:1000])
+    else:
+        print("Orchestrator Lambda - remote mode requires AWS Lambda environment to run")
+        print("Deploy to AWS and test with:")
+        print("aws lambda invoke --function-name FactoryTwin-Orchestrator --payload file://test.json out.json")
+        print("Or run the whole chain locally with PIPELINE_MODE=inprocess")
 
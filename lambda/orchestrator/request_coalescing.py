@@ -0,0 +1,87 @@
+"""
+Request coalescing for the Orchestrator
+
+Purpose: When several users ask the same question at the same moment (the
+example buttons on a shared dashboard), one classifier → GraphQL → generator
+run answers all of them. Concurrent requests with the same key attach to the
+in-flight run and receive its result; each still gets its own request id,
+session turn and response.
+
+The key is the normalized question (see question_normalizer), the
+simulation id from the request and the UTC day: the classifier derives the
+date range from the question text, and relative ranges ("last month") only
+change with the date. The use_cache flag is part of the key too, so a
+request that asked for a fresh answer never receives a cached one.
+
+Only answers that do not depend on the session are shared: follow-ups
+answered from a session's working set, or flagged is_followup with its
+history, run on their own.
+
+Coalescing is per process: it applies to the threaded stream server and
+in-process callers. A Lambda container serves one request at a time, so
+separate invocations are not coalesced.
+
+REQUEST_COALESCING=0 turns it off. coalescing_stats() reports executions,
+coalesced requests and runs in flight.
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Generator, Hashable, Optional, Tuple
+
+from question_normalizer import normalize_question
+from single_flight import AbandonedCall, SingleFlight
+
+REQUEST_COALESCING = os.environ.get("REQUEST_COALESCING", "1") != "0"
+
+pipeline_flights = SingleFlight()
+
+
+def coalescing_key(question: str, simulation_id: Optional[str] = None, use_cache: bool = True) -> Optional[Hashable]:
+    """Key shared by requests that get the same answer, or None when coalescing is off."""
+    if not REQUEST_COALESCING:
+        return None
+    return normalize_question(question), simulation_id, time.strftime("%Y-%m-%d", time.gmtime()), bool(use_cache)
+
+
+def run_coalesced(key: Optional[Hashable], fn: Callable[[], Any]) -> Tuple[Any, bool]:
+    """(fn() or the in-flight result for key, shared). key None runs fn() on its own."""
+    if key is None:
+        return fn(), False
+    return pipeline_flights.do(key, fn)
+
+
+def stream_coalesced(key: Optional[Hashable], produce: Callable[[], Generator]) -> Generator:
+    """
+    run_coalesced() for a generator: the leader relays produce()'s events as
+    they come and shares its return value; requests that join an in-flight
+    run yield nothing and get its result. Use as
+    result, shared = yield from stream_coalesced(key, produce).
+
+    If the leader's client disconnects, the waiting requests start over (one
+    of them becomes the new leader).
+    """
+    if key is None:
+        return (yield from produce()), False
+    while True:
+        call, leader = pipeline_flights.join(key)
+        if leader:
+            break
+        try:
+            return pipeline_flights.wait(call), True
+        except AbandonedCall:
+            continue
+    try:
+        result = yield from produce()
+    except GeneratorExit:
+        pipeline_flights.finish(key, call, error=AbandonedCall())
+        raise
+    except BaseException as e:
+        pipeline_flights.finish(key, call, error=e)
+        raise
+    pipeline_flights.finish(key, call, result=result)
+    return result, False
+
+
+def coalescing_stats() -> Dict[str, Any]:
+    return dict(pipeline_flights.stats(), enabled=REQUEST_COALESCING)
@@ -0,0 +1,288 @@
+"""
+Conversation sessions for the Orchestrator
+
+Purpose: Keeps each chat's turns server-side, keyed by a session id, so the
+frontend only sends the id and follow-up prompts get a short digest of the
+conversation instead of a transcript that grows with every turn.
+
+- Turns are structured: question, intent (endpoint, extraction type, date
+  range) and the extracted value, newest last. At most SESSION_MAX_TURNS
+  (default 20) are kept per session.
+- history_digest() renders one line per turn, newest first, until
+  SESSION_HISTORY_TOKEN_BUDGET (default 300 estimated tokens) is spent; older
+  turns are left out, so a follow-up costs the same after 200 turns as after 3.
+- Each session also has a working set: the last data turn's intent, the raw
+  GraphQL data per chart endpoint (for that date range) and the extracted
+  value, so pure follow-ups are answered without classification or fetch.
+
+SESSION_STORE selects the backend:
+- "memory" (default): a bounded LRU of SESSION_CACHE_SIZE sessions (default
+  1024) in the warm container; sessions idle for SESSION_TTL_SECONDS
+  (default 3600) expire
+- "sqlite": a SQLite file at SESSION_DB_PATH (default sessions.sqlite3),
+  shared by every process on the host and kept across restarts; same turn
+  limit and idle expiry
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from token_estimate import estimate_tokens
+from ttl_cache import TTLCache
+
+SESSION_STORE = os.environ.get("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "sessions.sqlite3")
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "1024"))
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", "20"))
+SESSION_HISTORY_TOKEN_BUDGET = int(os.environ.get("SESSION_HISTORY_TOKEN_BUDGET", "300"))
+
+# Long questions are cut in the digest; the intent and value carry the meaning
+DIGEST_QUESTION_CHARS = 120
+
+ENDPOINT_LABELS = {
+    "demandByFulfillmentDonut": "donut",
+    "demandByFulfillmentHistogram": "histogram",
+}
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def make_turn(question: str, state: Dict[str, Any], extracted_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """One structured turn from the pipeline state and the answer's extracted data."""
+    extracted_data = extracted_data or {}
+    return {
+        "question": question,
+        "endpoint": state["endpoint"],
+        "extraction_type": state["extraction_type"],
+        "date_range": state.get("date_range"),
+        "value": extracted_data.get("quantity"),
+        "formatted_value": extracted_data.get("formatted_value"),
+        "at": time.time(),
+    }
+
+
+def same_date_range(a: Optional[Dict[str, Any]], b: Optional[Dict[str, Any]]) -> bool:
+    return ((a or {}).get("from"), (a or {}).get("until")) == ((b or {}).get("from"), (b or {}).get("until"))
+
+
+def make_working_set(state: Dict[str, Any], extracted_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The session's working set after answering from state (state["working_data"]: endpoint -> raw data)."""
+    return {
+        "endpoint": state["endpoint"],
+        "extraction_type": state["extraction_type"],
+        "date_range": state.get("date_range"),
+        "confidence": state.get("confidence"),
+        "graphql_data": state["working_data"],
+        "extracted_data": extracted_data,
+    }
+
+
+def describe_turn(turn: Dict[str, Any]) -> str:
+    question = " ".join(turn["question"].split())
+    if len(question) > DIGEST_QUESTION_CHARS:
+        question = question[:DIGEST_QUESTION_CHARS - 3].rstrip() + "..."
+    intent = ENDPOINT_LABELS.get(turn["endpoint"], turn["endpoint"])
+    date_range = turn.get("date_range") or {}
+    if date_range.get("from") or date_range.get("until"):
+        intent += f" {(date_range.get('from') or '')[:10]}..{(date_range.get('until') or '')[:10]}"
+    return f'- "{question}" -> {turn["extraction_type"]} ({intent}): {turn.get("formatted_value") or "n/a"}'
+
+
+def history_digest(turns: Sequence[Dict[str, Any]], budget: Optional[int] = None) -> str:
+    """
+    Compact conversation history for the prompt: the most recent turns that
+    fit in budget estimated tokens, oldest first. "" when there are no turns.
+    """
+    budget = SESSION_HISTORY_TOKEN_BUDGET if budget is None else budget
+    # Sized for the longest header, so adding the omitted count never overruns the budget
+    used = estimate_tokens(f"Previous questions in this conversation (oldest first, {len(turns)} earlier omitted):") + 1
+    lines = []
+    for turn in reversed(turns):
+        line = describe_turn(turn)
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    if not lines:
+        return ""
+    omitted = len(turns) - len(lines)
+    header = "Previous questions in this conversation (oldest first" + (f", {omitted} earlier omitted" if omitted else "") + "):"
+    return "\n".join([header] + lines[::-1])
+
+
+class MemorySessionStore:
+    """Sessions in a bounded in-process LRU; a session expires ttl seconds after its last turn."""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = SESSION_CACHE_SIZE, ttl: float = SESSION_TTL_SECONDS,
+                 max_turns: int = SESSION_MAX_TURNS):
+        self.max_turns = max_turns
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._working_sets = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def turns(self, session_id: str) -> List[Dict[str, Any]]:
+        return list(self._sessions.get(session_id, ()))
+
+    def append(self, session_id: str, turn: Dict[str, Any]) -> None:
+        # Stored as tuples, so readers never see a list being extended
+        with self._lock:
+            turns = self._sessions.get(session_id, ())
+            self._sessions.set(session_id, (turns + (turn,))[-self.max_turns:])
+
+    def working_set(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._working_sets.get(session_id)
+
+    def save_working_set(self, session_id: str, working_set: Dict[str, Any]) -> None:
+        self._working_sets.set(session_id, working_set)
+
+    def clear(self, session_id: str) -> None:
+        self._sessions.delete(session_id)
+        self._working_sets.delete(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._sessions.stats(), backend=self.backend, max_turns=self.max_turns,
+                    working_sets=len(self._working_sets))
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite file, one row per session holding its turns as JSON
+    (and one per working set).
+    Appends are read-modify-write inside an IMMEDIATE transaction, so
+    processes sharing the file do not lose each other's turns.
+    """
+
+    backend = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            updated_at REAL NOT NULL,
+            turns TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+        CREATE TABLE IF NOT EXISTS working_sets (
+            session_id TEXT PRIMARY KEY,
+            updated_at REAL NOT NULL,
+            working_set TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS working_sets_updated_at ON working_sets (updated_at);
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl: float = SESSION_TTL_SECONDS,
+                 max_turns: int = SESSION_MAX_TURNS):
+        import sqlite3
+
+        self.path = path
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        # Autocommit mode; append() manages its own transaction
+        self._connection = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(self.SCHEMA)
+        self.reads = 0
+        self.writes = 0
+        self.expired = 0
+
+    def turns(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.reads += 1
+            row = self._connection.execute(
+                "SELECT turns FROM sessions WHERE session_id = ? AND updated_at > ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def append(self, session_id: str, turn: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT turns FROM sessions WHERE session_id = ? AND updated_at > ?",
+                    (session_id, now - self.ttl),
+                ).fetchone()
+                turns = (json.loads(row[0]) if row else []) + [turn]
+                connection.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, updated_at, turns) VALUES (?, ?, ?)",
+                    (session_id, now, json.dumps(turns[-self.max_turns:], separators=(",", ":"))),
+                )
+                self.expired += connection.execute(
+                    "DELETE FROM sessions WHERE updated_at <= ?", (now - self.ttl,)
+                ).rowcount
+                connection.execute("DELETE FROM working_sets WHERE updated_at <= ?", (now - self.ttl,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self.writes += 1
+
+    def working_set(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.reads += 1
+            row = self._connection.execute(
+                "SELECT working_set FROM working_sets WHERE session_id = ? AND updated_at > ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_working_set(self, session_id: str, working_set: Dict[str, Any]) -> None:
+        encoded = json.dumps(working_set, separators=(",", ":"))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO working_sets (session_id, updated_at, working_set) VALUES (?, ?, ?)",
+                (session_id, time.time(), encoded),
+            )
+            self.writes += 1
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._connection.execute("DELETE FROM working_sets WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "path": self.path,
+            "size": len(self),
+            "ttl_seconds": self.ttl,
+            "max_turns": self.max_turns,
+            "reads": self.reads,
+            "writes": self.writes,
+            "expired": self.expired,
+        }
+
+
+_session_store = None
+
+
+def get_session_store():
+    """Return the (cached) store for SESSION_STORE."""
+    global _session_store
+    if _session_store is None:
+        if SESSION_STORE == "memory":
+            _session_store = MemorySessionStore()
+        elif SESSION_STORE == "sqlite":
+            _session_store = SQLiteSessionStore()
+        else:
+            raise ValueError(f"Unknown SESSION_STORE: {SESSION_STORE}")
+    return _session_store
@@ -0,0 +1,113 @@
+"""
+Speculative GraphQL prefetch for the Orchestrator
+
+Purpose: Starts the data fetch while the intent classifier is still running.
+Only two chart endpoints exist, so the likely one (guessed with the intent
+classifier's fallback keywords) or both can be fetched in the background and
+the result matching the classified intent is kept.
+
+SPECULATIVE_PREFETCH controls the mode:
+- "off" (default): classify, then fetch (original sequential behaviour)
+- "likely": prefetch the endpoint guessed from fallback_classification() keywords
+- "all": prefetch every chart endpoint
+
+Speculative fetches always use the default date range, so a speculative
+result is only used when the classified intent has no explicit date range.
+Speculation is skipped (status "skipped") when the question names a date or
+period, since its fetch would always be discarded, and in "likely" mode when
+there is no keyword guess (remote mode does not deploy the classifier's
+keywords with the orchestrator), rather than fetching every endpoint.
+"""
+
+import contextvars
+import os
+
+from followup_detector import DATE_RE
+from question_normalizer import normalize_question
+from structured_log import get_logger
+
+log = get_logger("orchestrator")
+
+SPECULATIVE_PREFETCH = os.environ.get("SPECULATIVE_PREFETCH", "off")
+
+CHART_ENDPOINTS = ["demandByFulfillmentDonut", "demandByFulfillmentHistogram"]
+
+# Shared across warm invocations; created (and concurrent.futures imported)
+# on the first speculative fetch, so the default "off" mode never pays for it
+_prefetch_pool = None
+
+
+def get_prefetch_pool():
+    global _prefetch_pool
+    if _prefetch_pool is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _prefetch_pool = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("SPECULATIVE_PREFETCH_WORKERS", "4")),
+            thread_name_prefix="graphql-prefetch",
+        )
+    return _prefetch_pool
+
+
+def _has_explicit_range(date_range):
+    return bool(date_range and (date_range.get('from') or date_range.get('until')))
+
+
+def start_prefetch(executor, question, mode=None):
+    """
+    Submit speculative fetches for the question. Returns {endpoint: Future},
+    None when speculation is off and empty when it is skipped for this question.
+    """
+    mode = mode or SPECULATIVE_PREFETCH
+    if mode == "off":
+        return None
+    if mode not in ("likely", "all"):
+        raise ValueError(f"Unknown SPECULATIVE_PREFETCH mode: {mode}")
+
+    # A dated question gets an explicit range, which a default-range fetch never serves
+    if DATE_RE.search(normalize_question(question)):
+        log.info("speculative_prefetch_skipped", reason="date_in_question")
+        return {}
+
+    endpoints = CHART_ENDPOINTS
+    if mode == "likely":
+        guessed = executor.guess_endpoint(question)
+        if guessed not in CHART_ENDPOINTS:
+            log.info("speculative_prefetch_skipped", reason="no_endpoint_guess")
+            return {}
+        endpoints = [guessed]
+
+    log.info("speculative_prefetch", endpoints=endpoints)
+    # Each fetch runs in a copy of the caller's context so it logs under the same request id
+    pool = get_prefetch_pool()
+    return {
+        endpoint: pool.submit(contextvars.copy_context().run, executor.fetch, endpoint, None)
+        for endpoint in endpoints
+    }
+
+
+def resolve_prefetch(prefetched, endpoint, date_range):
+    """
+    Return (data, status) for the classified endpoint. status is "hit" when a
+    speculative result was used, "miss" when the caller has to fetch, "off"
+    when speculation is off and "skipped" when start_prefetch skipped it.
+    Non-matching fetches are cancelled if they have not started yet and
+    discarded otherwise.
+    """
+    if prefetched is None:
+        return None, "off"
+    if not prefetched:
+        return None, "skipped"
+
+    wanted = None if _has_explicit_range(date_range) else prefetched.get(endpoint)
+    for name, future in prefetched.items():
+        if future is not wanted:
+            future.cancel()
+
+    if wanted is None:
+        return None, "miss"
+
+    try:
+        return wanted.result(), "hit"
+    except Exception as e:
+        log.warning("speculative_prefetch_failed", endpoint=endpoint, error=type(e).__name__, message=str(e))
+        return None, "miss"
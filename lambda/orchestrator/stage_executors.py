@@ -0,0 +1,220 @@
+"""
+Stage executors for the Orchestrator
+
+Purpose: Runs the three pipeline stages (Intent Classifier → GraphQL Client →
+Response Generator) either as remote Lambda invocations or in-process.
+
+PIPELINE_MODE selects the executor:
+- "remote" (default): every stage is a synchronous boto3 Lambda invoke, each
+  payload is serialized with json.dumps and parsed back on return
+- "inprocess": the three packages are imported from LAMBDA_ROOT and their
+  core functions are called directly, passing Python objects between stages
+
+Helper modules inside the stage packages are imported by plain module name,
+so they must not share names across packages. boto3 is only imported when a
+remote executor is built without a client, so in-process runs never load it.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+
+from structured_log import current_request_id, get_logger
+from tracing import current_trace, trace_context
+
+log = get_logger("orchestrator")
+
+# Lambda function names
+INTENT_CLASSIFIER_FUNCTION = "FactoryTwin-IntentClassifier"
+
+GRAPHQL_CLIENT_FUNCTION = "FactoryTwin-GraphQLClient"
+
+RESPONSE_GENERATOR_FUNCTION = "FactoryTwin-ResponseGenerator"
+
+PIPELINE_MODE = os.environ.get("PIPELINE_MODE", "remote")
+
+# Directory holding the intent-classifier / graphql-client / response-generator packages
+LAMBDA_ROOT = os.environ.get(
+    "LAMBDA_ROOT",
+    os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")),
+)
+
+# Stage key -> (package directory, module alias used in sys.modules)
+STAGE_PACKAGES = {
+    "intent": ("intent-classifier", "factorytwin_intent_classifier"),
+    "graphql": ("graphql-client", "factorytwin_graphql_client"),
+    "response": ("response-generator", "factorytwin_response_generator"),
+}
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage returns a non-200 result."""
+
+
+def invoke_lambda(lambda_client, function_name, payload):
+    """
+    Invoke another Lambda function synchronously
+    """
+    log.debug("invoke_lambda", function=function_name)
+    log.payload("invoke_payload", payload)
+
+    try:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='RequestResponse',
+            Payload=json.dumps(payload)
+        )
+
+        # Parse response
+        response_payload = json.loads(response['Payload'].read())
+
+        log.debug("invoke_lambda_response", function=function_name, status=response_payload.get('statusCode'))
+
+        return response_payload
+
+    except Exception as e:
+        log.exception("invoke_lambda_error", e, function=function_name)
+        raise
+
+
+class RemoteStageExecutor:
+    """Runs each stage as a separate synchronous Lambda invocation."""
+
+    mode = "remote"
+
+    def __init__(self, lambda_client=None):
+        if lambda_client is None:
+            import boto3
+            lambda_client = boto3.client('lambda')
+        self.lambda_client = lambda_client
+
+    def _invoke(self, function_name, body, stage_name):
+        # Downstream handlers bind the caller's request id for their log lines
+        # and continue its trace, returning their spans as "trace_spans"
+        body = dict(body, request_id=current_request_id(), trace=trace_context())
+        response = invoke_lambda(self.lambda_client, function_name, {"body": json.dumps(body)})
+        if response.get('statusCode') != 200:
+            raise StageError(f"{stage_name} failed: {response}")
+        result = json.loads(response['body'])
+        spans = result.pop("trace_spans", None)
+        trace = current_trace()
+        if spans and trace is not None:
+            trace.add_spans(spans)
+        return result
+
+    def guess_endpoint(self, question):
+        """The classifier's keyword fallback is not deployed with the orchestrator."""
+        return None
+
+    def classify(self, question):
+        """Return the intent dict (endpoint, extraction_type, date_range, confidence)."""
+        intent_body = self._invoke(
+            INTENT_CLASSIFIER_FUNCTION, {"question": question}, "Intent classification"
+        )
+        return intent_body['intent']
+
+    def fetch(self, endpoint, date_range=None, extraction_type=None):
+        """Return the GraphQL data for an endpoint (only the fields extraction_type needs, when given)."""
+        graphql_body = self._invoke(
+            GRAPHQL_CLIENT_FUNCTION,
+            {"endpoint": endpoint, "date_range": date_range, "extraction_type": extraction_type},
+            "GraphQL query",
+        )
+        return graphql_body['data']
+
+    def respond(self, request):
+        """Return the response generator body for a request dict."""
+        return self._invoke(RESPONSE_GENERATOR_FUNCTION, request, "Response generation")
+
+    def respond_stream(self, request):
+        """
+        A RequestResponse invoke cannot stream, so the complete answer is
+        replayed as chart → one token → done events.
+        """
+        body = self.respond(request)
+        yield "chart", {k: v for k, v in body.items() if k != "response"}
+        yield "token", {"text": body["response"]}
+        yield "done", body
+
+
+def load_stage_module(stage):
+    """
+    Import a stage package's lambda_function.py under a unique module alias.
+
+    The package directory is added to sys.path so that the handler's own
+    helper modules resolve the same way they do inside Lambda.
+    """
+    package_dir, alias = STAGE_PACKAGES[stage]
+    if alias in sys.modules:
+        return sys.modules[alias]
+
+    package_path = os.path.join(LAMBDA_ROOT, package_dir)
+    if package_path not in sys.path:
+        sys.path.insert(0, package_path)
+
+    spec = importlib.util.spec_from_file_location(
+        alias, os.path.join(package_path, "lambda_function.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[alias] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[alias]
+        raise
+    return module
+
+
+class InProcessStageExecutor:
+    """Calls the stage packages' core functions directly, with no serialization between stages."""
+
+    mode = "inprocess"
+
+    def __init__(self):
+        self.intent_module = load_stage_module("intent")
+        self.graphql_module = load_stage_module("graphql")
+        self.response_module = load_stage_module("response")
+
+    def guess_endpoint(self, question):
+        """Cheap keyword guess used to pick speculative prefetches."""
+        return self.intent_module.fallback_classification(question)['intent']['endpoint']
+
+    def classify(self, question):
+        result = self.intent_module.classify_intent(question)
+        if result.get('statusCode') != 200:
+            raise StageError(f"Intent classification failed: {result}")
+        return result['intent']
+
+    def fetch(self, endpoint, date_range=None, extraction_type=None):
+        result = self.graphql_module.execute_graphql_query(endpoint, date_range, extraction_type=extraction_type)
+        return result['data']
+
+    def respond(self, request):
+        try:
+            return self.response_module.build_response(request)
+        except self.response_module.RequestError as e:
+            raise StageError(f"Response generation failed: {e.error}: {e.message}")
+
+    def respond_stream(self, request):
+        """Yield the response generator's chart / token / done events as they are produced."""
+        try:
+            yield from self.response_module.stream_build_response(request)
+        except self.response_module.RequestError as e:
+            raise StageError(f"Response generation failed: {e.error}: {e.message}")
+
+
+_executors = {}
+
+
+def get_stage_executor(mode=None):
+    """Return the (cached) executor for a pipeline mode."""
+    mode = mode or PIPELINE_MODE
+    if mode not in _executors:
+        if mode == "remote":
+            _executors[mode] = RemoteStageExecutor()
+        elif mode == "inprocess":
+            _executors[mode] = InProcessStageExecutor()
+        else:
+            raise ValueError(f"Unknown PIPELINE_MODE: {mode}")
+    return _executors[mode]
@@ -0,0 +1,168 @@
+"""
+Local HTTP entry point for the Orchestrator (the frontend's backend on port 5001)
+
+Routes:
+- GET  /health        → {"status": "ok", "pipeline_mode": ..., "coalescing": request coalescing counters}
+- POST /query         → same JSON response as lambda_handler
+- POST /query/stream  → Server-Sent Events while the answer is generated:
+      event: chart   chart data and visualization type, before any LLM text
+      event: token   {"text": chunk} per streamed chunk of the answer
+      event: done    the complete response (same shape as /query)
+      event: error   {"error", "message"} if the pipeline fails
+
+Both query routes take an optional "session_id" (a new one is assigned when
+it is missing and returned in every response) and "is_followup" (true / false;
+detected from the question when omitted).
+
+Buffered Lambda invokes cannot stream, so streaming is served from this
+process; it defaults to PIPELINE_MODE=inprocess so the Groq chunks are
+relayed as they arrive.
+
+Usage:
+    GROQ_API_KEY=... python lambda/orchestrator/stream_server.py
+"""
+
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("PIPELINE_MODE", "inprocess")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lambda_function import lambda_handler, stream_pipeline
+from request_coalescing import coalescing_stats
+from session_store import new_session_id
+from stage_executors import get_stage_executor
+from structured_log import bind_request, get_logger
+from tracing import SPAN_KIND_SERVER, finish_trace, get_tracer
+
+log = get_logger("orchestrator")
+tracer = get_tracer("orchestrator")
+
+STREAM_SERVER_HOST = os.environ.get("STREAM_SERVER_HOST", "127.0.0.1")
+STREAM_SERVER_PORT = int(os.environ.get("STREAM_SERVER_PORT", "5001"))
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+}
+
+
+def format_sse(event, payload):
+    """One Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+class OrchestratorRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0 semantics: the event stream ends when the connection closes
+    protocol_version = "HTTP/1.0"
+
+    def _send_json(self, status, body, headers=None):
+        payload = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in dict(CORS_HEADERS, **(headers or {})).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length).decode("utf-8") if length else "{}"
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        for name, value in CORS_HEADERS.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, {"status": "ok", "pipeline_mode": get_stage_executor().mode,
+                                  "coalescing": coalescing_stats()})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        if path == "/query":
+            result = lambda_handler({"body": self._read_body()}, None)
+            self._send_json(result["statusCode"], result["body"])
+        elif path == "/query/stream":
+            self._stream_query()
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def _stream_query(self):
+        try:
+            body = json.loads(self._read_body()) or {}
+        except json.JSONDecodeError:
+            body = {}
+        question = body.get("question", "")
+        request_id = bind_request(body.get("request_id"))
+        if not question:
+            self._send_json(400, {"error": "Missing question", "message": "Please provide a 'question' field"})
+            return
+
+        self.send_response(200)
+        for name, value in CORS_HEADERS.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")  # disable proxy buffering (nginx)
+        self.end_headers()
+
+        trace = tracer.start_trace(request_id)
+        try:
+            done = self._relay_events(question, body, trace)
+            if done is not None:
+                if body.get("include_timings"):
+                    done = dict(done, timings=trace.timings())
+                self.wfile.write(format_sse("done", done))
+        except (BrokenPipeError, ConnectionResetError):
+            log.warning("stream_client_disconnected")
+        except Exception as e:
+            log.exception("stream_error", e)
+            self.wfile.write(format_sse("error", {"error": str(e), "message": "Error processing request"}))
+
+    def _relay_events(self, question, body, trace):
+        """Write chart/token events as they arrive; return the "done" payload once the trace is finished."""
+        done = None
+        try:
+            with tracer.span("orchestrator.request", kind=SPAN_KIND_SERVER, streaming=True):
+                events = stream_pipeline(
+                    question,
+                    use_cache=body.get("use_cache", True) is not False,
+                    session_id=body.get("session_id") or new_session_id(),
+                    is_followup=body.get("is_followup"),
+                    simulation_id=body.get("simulation_id"),
+                )
+                for event, payload in events:
+                    if event == "done":
+                        done = payload
+                        continue
+                    self.wfile.write(format_sse(event, payload))
+                    self.wfile.flush()
+        finally:
+            finish_trace(trace)
+        return done
+
+
+def serve(host=STREAM_SERVER_HOST, port=STREAM_SERVER_PORT):
+    server = ThreadingHTTPServer((host, port), OrchestratorRequestHandler)
+    server.daemon_threads = True
+    print(f"🚀 Orchestrator listening on http://{host}:{port} (pipeline mode: {get_stage_executor().mode})")
+    print("   POST /query, POST /query/stream (SSE), GET /health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,200 @@
+"""
+Columnar histogram container for the Response Generator
+
+Purpose: Converts the GraphQL histogram payload (a list of periods, each with
+a stackDataList of {name, quantity, value}) into NumPy arrays once, so every
+extraction and context statistic is a vectorized operation instead of
+another walk over the period dicts.
+
+- quantity / value: periods x categories float64 arrays (missing entries are 0;
+  value is built on first access)
+- categories: column order (first appearance), with a name → column index
+- start_dates: datetime64[s] per period (NaT when missing or unparseable)
+- has_stack: periods that carried a non-empty stackDataList
+
+The rollup / extreme / trend helpers feed the token-budgeted prompt context
+used when the full period-by-period breakdown does not fit.
+
+NumPy is imported lazily (on the first array operation), so importing this
+module costs nothing for requests that never build a frame.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from lazy_import import lazy_module
+
+np = lazy_module("numpy")
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    if not isinstance(value, str) or not value:
+        return np.datetime64("NaT", "s")
+    try:
+        # datetime64 has no timezone; GraphQL instants are UTC ("Z")
+        return np.datetime64(value.replace("Z", "").split("+")[0], "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+
+class HistogramFrame:
+    """Periods x categories quantity/value arrays built from a histogram payload."""
+
+    def __init__(self, periods: List[Dict[str, Any]]):
+        periods = [period or {} for period in periods]
+        self.start_labels = [period.get("startDate") for period in periods]
+        self.start_dates = np.array([_to_datetime64(label) for label in self.start_labels], dtype="datetime64[s]")
+        self.has_stack = np.array([bool(period.get("stackDataList")) for period in periods], dtype=bool)
+
+        # Flatten every stackDataList entry once, then scatter into the arrays
+        stacks = [period.get("stackDataList") or () for period in periods]
+        self._rows = np.repeat(np.arange(len(periods)), [len(stack) for stack in stacks])
+        self._items = [item or {} for stack in stacks for item in stack]
+        names = [item.get("name") for item in self._items]
+        if not all(names):
+            keep = [bool(name) for name in names]
+            self._rows = self._rows[np.array(keep, dtype=bool)]
+            self._items = [item for item, kept in zip(self._items, keep) if kept]
+            names = [name for name, kept in zip(names, keep) if kept]
+
+        # Column per category in order of first appearance
+        self.categories = list(dict.fromkeys(names))
+        self.index: Dict[str, int] = {name: column for column, name in enumerate(self.categories)}
+        columns = np.fromiter(map(self.index.__getitem__, names), dtype=np.int64, count=len(names))
+
+        self.shape = (len(periods), len(self.categories))
+        self._flat = self._rows * self.shape[1] + columns
+        self.quantity = self._scatter("quantity")
+        self._value = None
+
+    def _scatter(self, field: str) -> np.ndarray:
+        weights = np.array([item.get(field) or 0 for item in self._items], dtype=float)
+        size = self.shape[0] * self.shape[1]
+        return np.bincount(self._flat, weights=weights, minlength=size).reshape(self.shape)
+
+    @property
+    def value(self) -> np.ndarray:
+        """Value array, scattered on first use (none of the extractions need it)."""
+        if self._value is None:
+            self._value = self._scatter("value")
+        return self._value
+
+    @classmethod
+    def from_payload(cls, data: Any) -> "HistogramFrame":
+        """Accepts the histogram list, a single period dict, or an existing frame."""
+        if isinstance(data, cls):
+            return data
+        return cls(data if isinstance(data, list) else [data])
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        """Quantity column for a category (zeros if the category never appears)."""
+        column = self.index.get(name)
+        if column is None:
+            return np.zeros(len(self))
+        return self.quantity[:, column]
+
+    def period_totals(self) -> np.ndarray:
+        return self.quantity.sum(axis=1)
+
+    def positive_period_totals(self) -> np.ndarray:
+        return np.where(self.quantity > 0, self.quantity, 0.0).sum(axis=1)
+
+    def months_with(self, name: str) -> int:
+        """Number of periods with a positive quantity for the category."""
+        return int(np.count_nonzero(self.column(name) > 0))
+
+    def average_period_total(self) -> float:
+        return float(self.period_totals().mean()) if len(self) else 0.0
+
+    def highest_period(self) -> Dict[str, Any]:
+        """Period with the largest total quantity (None if no total is positive)."""
+        totals = self.period_totals()
+        if not len(totals) or totals.max() <= 0:
+            return {"startDate": None, "quantity": 0.0}
+        row = int(totals.argmax())
+        return {"startDate": self.start_labels[row], "quantity": float(totals[row])}
+
+    def category_totals(self) -> Dict[str, float]:
+        """
+        Sum of positive quantities per category, for categories with any
+        positive quantity, ordered by the first period in which they are positive.
+        """
+        positive = self.quantity > 0
+        sums = np.where(positive, self.quantity, 0.0).sum(axis=0)
+        present = np.flatnonzero(positive.any(axis=0))
+        first_row = positive[:, present].argmax(axis=0)
+        order = present[np.lexsort((present, first_row))]
+        return {self.categories[column]: float(sums[column]) for column in order.tolist()}
+
+    def positive_quantity_stats(self) -> Optional[Dict[str, float]]:
+        """Mean / max / min over all positive (period, category) quantities."""
+        positive = self.quantity[self.quantity > 0]
+        if not positive.size:
+            return None
+        return {"average": float(positive.mean()), "max": float(positive.max()), "min": float(positive.min())}
+
+    def period_labels(self) -> List[str]:
+        """"Month YYYY" per period, falling back to the raw startDate."""
+        valid = ~np.isnat(self.start_dates)
+        months = self.start_dates.astype("datetime64[M]").astype(np.int64)
+        return [
+            f"{MONTH_NAMES[month % 12]} {1970 + month // 12}" if ok else (label if label is not None else "Unknown")
+            for month, ok, label in zip(months.tolist(), valid.tolist(), self.start_labels)
+        ]
+
+    def quarterly_totals(self) -> Tuple[List[str], np.ndarray]:
+        """
+        ("Qn YYYY" labels, quarters x categories sums of positive quantities),
+        in calendar order. Periods without a parseable startDate are skipped.
+        """
+        valid = ~np.isnat(self.start_dates)
+        months = self.start_dates[valid].astype("datetime64[M]").astype(np.int64)
+        quarters, inverse = np.unique(months // 3, return_inverse=True)
+        totals = np.zeros((len(quarters), self.shape[1]))
+        np.add.at(totals, inverse.ravel(), np.where(self.quantity > 0, self.quantity, 0.0)[valid])
+        labels = [f"Q{quarter % 4 + 1} {1970 + quarter // 4}" for quarter in quarters.tolist()]
+        return labels, totals
+
+    def extreme_periods(self, count: int) -> Tuple[List[int], List[int]]:
+        """
+        Row indexes of the count highest and count lowest period totals among
+        periods with a positive total (peaks descending, troughs ascending;
+        a period is never both).
+        """
+        totals = self.positive_period_totals()
+        rows = np.flatnonzero(self.has_stack & (totals > 0))
+        order = rows[np.argsort(-totals[rows], kind="stable")]
+        peaks = order[:count].tolist()
+        troughs = [row for row in order[::-1].tolist() if row not in peaks][:count]
+        return peaks, troughs
+
+    def trend(self) -> Optional[Dict[str, Any]]:
+        """
+        Direction of the positive period totals over time: least-squares slope
+        per period, first-half vs second-half averages and the coefficient of
+        variation. None with fewer than two periods.
+        """
+        totals = self.positive_period_totals()
+        if len(totals) < 2:
+            return None
+        slope = float(np.polyfit(np.arange(len(totals)), totals, 1)[0])
+        half = len(totals) // 2
+        first, second = float(totals[:half].mean()), float(totals[len(totals) - half:].mean())
+        mean = float(totals.mean())
+        return {
+            "slope": slope,
+            "first_half_average": first,
+            "second_half_average": second,
+            "change_pct": (second - first) / first * 100 if first else None,
+            "variation": float(totals.std()) / mean if mean else 0.0,
+            "zero_periods": int(np.count_nonzero(totals == 0)),
+        }
@@ -4,26 +4,62 @@ Lambda Function: Data Processor & Response Generator
 Purpose: Processes GraphQL data and generates natural language responses using Groq LLM
 """
 
+import hashlib
 import json
 import os
-from typing import Dict, Any, List, Union
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
-from groq import Groq
+# Shared helpers: lambda/shared locally, packaged alongside (or as a layer) when deployed
+_SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared")
+if os.path.isdir(_SHARED_DIR) and _SHARED_DIR not in sys.path:
+    sys.path.append(_SHARED_DIR)
+
+from histogram_frame import HistogramFrame
+from lazy_import import lazy_module
+from llm_backend import get_llm_backend
+from question_normalizer import normalize_question
+from structured_log import bind_request, get_logger
+from token_estimate import estimate_prompt_tokens, estimate_tokens, tail_within_budget
+from tracing import SPAN_KIND_CLIENT, finish_trace, get_tracer
+from ttl_cache import TTLCache
+
+# Only histogram answers need NumPy; donut answers never load it
+np = lazy_module("numpy")
+
+log = get_logger("response-generator")
+tracer = get_tracer("response-generator")
 
 MODEL_NAME = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
 
-# Initialize Groq client (lazy initialization)
-groq_client = None
+# How the chart is chosen: "deterministic" (rules on intent, extraction_type and
+# available data, no LLM call) or "agentic" (separate Groq completion, the
+# original behaviour). Requests may override it with "visualization_mode".
+VISUALIZATION_MODE = os.environ.get("VISUALIZATION_MODE", "deterministic")
+
+# Token budget for the histogram part of the prompt. Ranges whose full
+# period-by-period breakdown exceeds it are summarized instead (quarterly
+# rollups, then peaks/troughs, then trend only), so prompt size stays flat
+# as the queried range grows.
+HISTOGRAM_CONTEXT_TOKEN_BUDGET = int(os.environ.get("HISTOGRAM_CONTEXT_TOKEN_BUDGET", "800"))
+HISTOGRAM_EXTREME_PERIODS = int(os.environ.get("HISTOGRAM_EXTREME_PERIODS", "3"))
 
-def get_groq_client():
-    """Get or create Groq client"""
-    global groq_client
-    if groq_client is None:
-        api_key = os.environ.get("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable is not set")
-        groq_client = Groq(api_key=api_key)
-    return groq_client
+# Token cap for the follow-up history in the prompt. The orchestrator sends a
+# compact digest of the session's turns; longer free-form histories from
+# other callers keep only their most recent lines.
+CONVERSATION_HISTORY_TOKEN_BUDGET = int(os.environ.get("CONVERSATION_HISTORY_TOKEN_BUDGET", "300"))
+
+# Generated answers keyed on the question, intent and a fingerprint of the exact
+# data shown; unchanged data answers repeated questions without a completion.
+# Set RESPONSE_CACHE_SIZE=0 or RESPONSE_CACHE_TTL_SECONDS=0 to disable, or pass
+# "use_cache": false on a request to skip it.
+response_cache = TTLCache(
+    maxsize=int(os.environ.get("RESPONSE_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "900")),
+)
 
 
 def extract_value_from_donut(data: Dict[str, Any], extraction_type: str) -> float:
@@ -56,51 +92,38 @@ def extract_value_from_donut(data: Dict[str, Any], extraction_type: str) -> floa
     return 0.0
 
 
-def extract_value_from_histogram(data: List[Dict[str, Any]], extraction_type: str) -> Any:
+HISTOGRAM_CATEGORY_EXTRACTIONS = {
+    "firm_order": "Firm Order",
+    "overdue": "Overdue",
+    "forecasted": "Forecasted",
+}
+
+
+def extract_value_from_histogram(data: Union[List[Dict[str, Any]], HistogramFrame], extraction_type: str) -> Any:
     """
-    Extract specific quantity from histogram data (using quantity instead of value)
+    Extract specific quantity from histogram data (using quantity instead of value).
+    Accepts the raw period list or a prebuilt HistogramFrame.
     """
+    frame = HistogramFrame.from_payload(data)
+
     if extraction_type == "monthly_count":
         # Count months with firm orders
-        count = 0
-        for period in data:
-            stack_data_list = period.get("stackDataList", [])
-            for item in stack_data_list:
-                if item.get("name") == "Firm Order" and item.get("quantity", 0) > 0:
-                    count += 1
-                    break
-        return count
-    
+        return frame.months_with("Firm Order")
+
     elif extraction_type == "average":
-        # Calculate average monthly quantity
-        total_quantity = 0.0
-        period_count = 0
-        
-        for period in data:
-            stack_data_list = period.get("stackDataList", [])
-            period_total = sum(float(item.get("quantity", 0)) for item in stack_data_list)
-            total_quantity += period_total
-            period_count += 1
-        
-        return total_quantity / period_count if period_count > 0 else 0.0
-    
+        # Average total quantity per period
+        return frame.average_period_total()
+
     elif extraction_type == "highest_month":
-        # Find month with highest total quantity
-        max_quantity = 0.0
-        max_period = None
-        
-        for period in data:
-            stack_data_list = period.get("stackDataList", [])
-            period_total = sum(float(item.get("quantity", 0)) for item in stack_data_list)
-            if period_total > max_quantity:
-                max_quantity = period_total
-                max_period = period
-        
-        return {
-            "startDate": max_period.get("startDate") if max_period else None,
-            "quantity": max_quantity
-        }
-    
+        # Month with highest total quantity
+        return frame.highest_period()
+
+    elif extraction_type == "total":
+        return float(frame.quantity.sum())
+
+    elif extraction_type in HISTOGRAM_CATEGORY_EXTRACTIONS:
+        return float(frame.column(HISTOGRAM_CATEGORY_EXTRACTIONS[extraction_type]).sum())
+
     return None
 
 
@@ -111,6 +134,214 @@ def format_quantity(value: float) -> str:
     return f"{int(value):,} units"
 
 
+def format_extracted_value(extracted_value: Any, endpoint: str) -> str:
+    """Display string for an extracted value (quantity units for donut totals and peak months)."""
+    if isinstance(extracted_value, (int, float)):
+        return format_quantity(extracted_value) if endpoint == "demandByFulfillmentDonut" else str(int(extracted_value))
+    elif isinstance(extracted_value, dict):
+        return format_quantity(extracted_value.get("quantity", 0.0))
+    return str(extracted_value)
+
+
+def build_histogram_context(frame: HistogramFrame) -> str:
+    """Period-by-period breakdown and overall statistics for the LLM prompt."""
+    context_parts = [f"Data contains {len(frame)} time periods with the following breakdown:\n"]
+
+    positive = frame.quantity > 0
+    period_totals = frame.positive_period_totals()
+    labels = frame.period_labels()
+
+    # Positive entries in row-major order; each distinct quantity is formatted once
+    rows, columns = np.nonzero(positive)
+    distinct, inverse = np.unique(np.trunc(frame.quantity[rows, columns]), return_inverse=True)
+    formatted = [format_quantity(quantity) for quantity in distinct.tolist()]
+    prefixes = [f"  - {name}: " for name in frame.categories]
+    entries = [prefixes[c] + formatted[i] for c, i in zip(columns.tolist(), inverse.ravel().tolist())]
+    bounds = np.concatenate(([0], np.cumsum(positive.sum(axis=1)))).tolist()
+
+    for row in np.flatnonzero(frame.has_stack & positive.any(axis=1)).tolist():
+        context_parts.append(f"\n{labels[row]}:")
+        context_parts.extend(entries[bounds[row]:bounds[row + 1]])
+        context_parts.append(f"  Total: {format_quantity(period_totals[row])}")
+
+    # Calculate overall statistics
+    category_totals = frame.category_totals()
+    if category_totals:
+        context_parts.append(f"\n\nOverall Summary:")
+        for name, total_qty in category_totals.items():
+            context_parts.append(f"  - {name}: {format_quantity(total_qty)}")
+        stats = frame.positive_quantity_stats()
+        if stats:
+            context_parts.append(f"\n  Average per period: {format_quantity(stats['average'])}")
+            context_parts.append(f"  Peak period: {format_quantity(stats['max'])}")
+            context_parts.append(f"  Lowest period: {format_quantity(stats['min'])}")
+
+    return "\n".join(context_parts)
+
+
+def histogram_summary_section(frame: HistogramFrame) -> List[str]:
+    """Range, category totals and per-period statistics; always part of the context."""
+    labels = frame.period_labels()
+    parts = [f"Data contains {len(frame)} time periods" + (f" ({labels[0]} to {labels[-1]})" if labels else "") + "."]
+    category_totals = frame.category_totals()
+    if category_totals:
+        parts.append("\nOverall Summary:")
+        for name, total_qty in category_totals.items():
+            parts.append(f"  - {name}: {format_quantity(total_qty)}")
+        parts.append(f"  Total: {format_quantity(sum(category_totals.values()))}")
+        stats = frame.positive_quantity_stats()
+        if stats:
+            parts.append(f"\n  Average per period: {format_quantity(stats['average'])}")
+            parts.append(f"  Peak period: {format_quantity(stats['max'])}")
+            parts.append(f"  Lowest period: {format_quantity(stats['min'])}")
+    return parts
+
+
+def histogram_quarterly_section(frame: HistogramFrame) -> List[str]:
+    labels, totals = frame.quarterly_totals()
+    parts = ["\nQuarterly Totals:"]
+    for label, row in zip(labels, totals):
+        present = [f"{frame.categories[column]} {format_quantity(row[column])}" for column in np.flatnonzero(row > 0).tolist()]
+        if present:
+            parts.append(f"  {label}: " + ", ".join(present) + f" (Total: {format_quantity(row.sum())})")
+    return parts
+
+
+def histogram_extremes_section(frame: HistogramFrame, count: int) -> List[str]:
+    peaks, troughs = frame.extreme_periods(count)
+    if not peaks:
+        return []
+    labels = frame.period_labels()
+    if len(set(labels)) < len(labels):
+        # Sub-monthly periods: "Month YYYY" is ambiguous, use the start date
+        labels = [label[:10] if label else "Unknown" for label in frame.start_labels]
+    totals = frame.positive_period_totals()
+
+    def describe(rows):
+        return ", ".join(f"{labels[row]} ({format_quantity(totals[row])})" for row in rows)
+
+    parts = [f"\nHighest periods: {describe(peaks)}"]
+    if troughs:
+        parts.append(f"Lowest periods: {describe(troughs)}")
+    return parts
+
+
+def histogram_trend_section(frame: HistogramFrame) -> List[str]:
+    trend = frame.trend()
+    if trend is None:
+        return []
+    change = trend["change_pct"]
+    if change is None:
+        direction = "increasing from zero" if trend["second_half_average"] > 0 else "flat at zero"
+    elif abs(change) < 5:
+        direction = "stable"
+    else:
+        direction = "increasing" if change > 0 else "decreasing"
+    parts = [
+        "\nTrend:",
+        f"  Direction: {direction}" + (f" ({change:+.1f}% second half vs first half)" if change is not None else ""),
+        f"  First half average: {format_quantity(trend['first_half_average'])} per period; "
+        f"second half: {format_quantity(trend['second_half_average'])}",
+        f"  Change per period (linear fit): {trend['slope']:+,.0f} units",
+        f"  Variability: {'high' if trend['variation'] > 0.5 else 'moderate' if trend['variation'] > 0.2 else 'low'} "
+        f"(coefficient of variation {trend['variation']:.2f})",
+    ]
+    if trend["zero_periods"]:
+        parts.append(f"  Periods with no demand: {trend['zero_periods']}")
+    return parts
+
+
+def build_budgeted_histogram_context(frame: HistogramFrame, budget: int = None) -> Tuple[str, str]:
+    """
+    Histogram context that fits the token budget. Returns (context, detail):
+    - "periods": the full period-by-period breakdown (build_histogram_context)
+    - "quarterly": summary, trend, peaks/troughs and quarterly rollups
+    - "extremes": summary, trend and peaks/troughs
+    - "trend": summary and trend
+    - "summary": summary only (returned even if it exceeds the budget)
+    """
+    budget = HISTOGRAM_CONTEXT_TOKEN_BUDGET if budget is None else budget
+    full = build_histogram_context(frame)
+    if estimate_tokens(full) <= budget:
+        return full, "periods"
+
+    summary = histogram_summary_section(frame)
+    trend = histogram_trend_section(frame)
+    extremes = histogram_extremes_section(frame, HISTOGRAM_EXTREME_PERIODS)
+    candidates = [
+        ("quarterly", summary + trend + extremes + histogram_quarterly_section(frame)),
+        ("extremes", summary + trend + extremes),
+        ("trend", summary + trend),
+    ]
+    for detail, parts in candidates:
+        context = "\n".join(parts)
+        if estimate_tokens(context) <= budget:
+            return context, detail
+    return "\n".join(summary), "summary"
+
+
+HISTOGRAM_EXTRACTION_TYPES = {"monthly_count", "average", "highest_month"}
+
+TIME_BREAKDOWN_RE = re.compile(
+    r"\b(monthly|per month|by month|each month|month by month|over time|trends?|timeline|"
+    r"histogram|bar chart|weekly|quarterly|pattern|seasonal\w*|peaks?|busiest)\b",
+    re.IGNORECASE,
+)
+AGGREGATE_RE = re.compile(
+    r"\b(total|overall|aggregate|percent(age)?s?|share|proportion|split|breakdown|donut|pie)\b",
+    re.IGNORECASE,
+)
+
+VISUALIZATION_TYPES = {
+    "demandByFulfillmentDonut": "donut",
+    "demandByFulfillmentHistogram": "stacked-bar",
+}
+
+
+def choose_visualization(
+    question: str,
+    current_endpoint: str,
+    extraction_type: str,
+    current_data: Union[Dict[str, Any], List[Dict[str, Any]]],
+    all_available_data: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Deterministic replacement for decide_visualization(): applies the same
+    rules the agentic prompt describes (time breakdowns → histogram, totals
+    and shares → donut) to the classified intent, without an LLM call.
+    Same return shape as decide_visualization().
+    """
+    available = {
+        "demandByFulfillmentDonut": all_available_data.get("donut"),
+        "demandByFulfillmentHistogram": all_available_data.get("histogram"),
+    }
+
+    if extraction_type in HISTOGRAM_EXTRACTION_TYPES:
+        chosen, reasoning = "demandByFulfillmentHistogram", "the question asks for a per-month figure, which needs the monthly breakdown"
+    elif TIME_BREAKDOWN_RE.search(question):
+        chosen, reasoning = "demandByFulfillmentHistogram", "the question is about how demand changes over time"
+    elif AGGREGATE_RE.search(question):
+        chosen, reasoning = "demandByFulfillmentDonut", "the question is about totals and how they split across categories"
+    else:
+        chosen, reasoning = current_endpoint, "it matches the data requested for this question"
+
+    if chosen == current_endpoint:
+        data = current_data
+    elif available.get(chosen):
+        data = available[chosen]
+    else:
+        # The preferred chart's data was not fetched; show what we have
+        chosen, data = current_endpoint, current_data
+        reasoning = "it is the chart available for this question"
+
+    return {
+        "endpoint": chosen,
+        "data": data,
+        "visualization_type": VISUALIZATION_TYPES.get(chosen, "donut"),
+        "reasoning": reasoning,
+    }
+
+
 def decide_visualization(
     question: str,
     current_endpoint: str,
@@ -163,20 +394,17 @@ Question: "Show me monthly trends" → {{"visualization_type": "stacked-bar", "e
 """
     
     try:
-        client = get_groq_client()
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
+        llm_response = get_llm_backend().complete(
+            [
                 {"role": "system", "content": "You are a data visualization expert. Always respond with valid JSON only."},
                 {"role": "user", "content": decision_prompt}
             ],
+            model=MODEL_NAME,
             temperature=0.2,
-            max_tokens=200
-        )
-        
-        llm_response = response.choices[0].message.content.strip()
+            max_tokens=200,
+            purpose="visualization",
+        ).strip()
         # Extract JSON
-        import re
         json_match = re.search(r'\{[^}]+\}', llm_response, re.DOTALL)
         if json_match:
             decision = json.loads(json_match.group())
@@ -208,7 +436,7 @@ Question: "Show me monthly trends" → {{"visualization_type": "stacked-bar", "e
                 "reasoning": "Using current visualization (LLM decision parsing failed)"
             }
     except Exception as e:
-        print(f"⚠️  Visualization decision failed: {e}, using current")
+        log.warning("visualization_decision_failed", error=type(e).__name__, message=str(e))
         # Fallback to current
         return {
             "endpoint": current_endpoint,
@@ -218,28 +446,23 @@ Question: "Show me monthly trends" → {{"visualization_type": "stacked-bar", "e
         }
 
 
-def generate_response(
+def build_generation_messages(
     question: str,
     endpoint: str,
     extraction_type: str,
-    graphql_data: Union[Dict[str, Any], List[Dict[str, Any]]],
+    graphql_data: Union[Dict[str, Any], List[Dict[str, Any]], HistogramFrame],
     extracted_value: Any,
     conversation_history: str = "",
     is_followup: bool = False,
     visualization_decision: Dict[str, Any] = None,
     date_range: Dict[str, Any] = None
-) -> str:
+) -> List[Dict[str, str]]:
     """
-    Use Groq LLM to generate natural language response
+    Build the system and user messages for the answer completion
     """
     
     # Format the extracted quantity
-    if isinstance(extracted_value, (int, float)):
-        formatted_value = format_quantity(extracted_value) if endpoint == "demandByFulfillmentDonut" else str(int(extracted_value))
-    elif isinstance(extracted_value, dict):
-        formatted_value = format_quantity(extracted_value.get("quantity", 0.0))
-    else:
-        formatted_value = str(extracted_value)
+    formatted_value = format_extracted_value(extracted_value, endpoint)
     
     # Prepare detailed context about the data
     if endpoint == "demandByFulfillmentDonut":
@@ -311,60 +534,9 @@ def generate_response(
         context += analysis_hints
         
     elif endpoint == "demandByFulfillmentHistogram":
-        # For histogram, provide detailed period-by-period breakdown
-        periods = graphql_data if isinstance(graphql_data, list) else [graphql_data]
-        context_parts = [f"Data contains {len(periods)} time periods with the following breakdown:\n"]
-        
-        for i, period in enumerate(periods):
-            if period and period.get("stackDataList"):
-                start_date = period.get("startDate", "Unknown")
-                # Format date
-                try:
-                    from datetime import datetime
-                    date_obj = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                    date_str = date_obj.strftime("%B %Y")
-                except:
-                    date_str = start_date
-                
-                period_data = []
-                total_period_qty = 0
-                for item in period["stackDataList"]:
-                    if item and item.get("name"):
-                        qty = item.get("quantity", 0)
-                        if qty > 0:
-                            period_data.append(f"  - {item['name']}: {format_quantity(qty)}")
-                            total_period_qty += qty
-                
-                if period_data:
-                    context_parts.append(f"\n{date_str}:")
-                    context_parts.extend(period_data)
-                    context_parts.append(f"  Total: {format_quantity(total_period_qty)}")
-        
-        # Calculate overall statistics
-        all_quantities = []
-        category_totals = {}
-        for period in periods:
-            if period and period.get("stackDataList"):
-                for item in period["stackDataList"]:
-                    if item and item.get("name") and item.get("quantity", 0) > 0:
-                        name = item["name"]
-                        qty = item.get("quantity", 0)
-                        category_totals[name] = category_totals.get(name, 0) + qty
-                        all_quantities.append(qty)
-        
-        if category_totals:
-            context_parts.append(f"\n\nOverall Summary:")
-            for name, total_qty in category_totals.items():
-                context_parts.append(f"  - {name}: {format_quantity(total_qty)}")
-            if all_quantities:
-                avg_qty = sum(all_quantities) / len(all_quantities)
-                max_qty = max(all_quantities)
-                min_qty = min(all_quantities)
-                context_parts.append(f"\n  Average per period: {format_quantity(avg_qty)}")
-                context_parts.append(f"  Peak period: {format_quantity(max_qty)}")
-                context_parts.append(f"  Lowest period: {format_quantity(min_qty)}")
-        
-        context = "\n".join(context_parts)
+        context, detail = build_budgeted_histogram_context(HistogramFrame.from_payload(graphql_data))
+        log.debug("histogram_context", detail=detail, tokens=lambda: estimate_tokens(context),
+                  budget=HISTOGRAM_CONTEXT_TOKEN_BUDGET)
     else:
         context = f"Data contains {len(graphql_data)} time periods"
     
@@ -379,7 +551,6 @@ def generate_response(
         if from_date and until_date:
             # Format dates for readability
             try:
-                from datetime import datetime
                 from_dt = datetime.fromisoformat(from_date.replace('Z', '+00:00'))
                 until_dt = datetime.fromisoformat(until_date.replace('Z', '+00:00'))
                 from_str = from_dt.strftime("%B %Y")
@@ -464,179 +635,415 @@ REMEMBER:
 Be thorough but concise. Stay within the 500 word limit.
 """
 
-    try:
-        client = get_groq_client()
-        
-        # Build user message
-        user_message = question
-        if is_followup:
-            user_message = f"{question}\n\nIMPORTANT: This is a follow-up question. Provide a detailed, comprehensive answer using the data context provided above. Be thorough and explain everything in detail."
-        
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.5,  # Increased for more natural, detailed responses
-            max_tokens=700  # Set for ~500 words (approximately 1.4 tokens per word)
+    # Build user message
+    user_message = question
+    if is_followup:
+        user_message = f"{question}\n\nIMPORTANT: This is a follow-up question. Provide a detailed, comprehensive answer using the data context provided above. Be thorough and explain everything in detail."
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+
+def template_response(
+    endpoint: str,
+    extraction_type: str,
+    graphql_data: Union[Dict[str, Any], List[Dict[str, Any]], HistogramFrame],
+    extracted_value: Any,
+) -> str:
+    """
+    Simple template-based answer used when the Groq call fails
+    """
+    formatted_value = format_extracted_value(extracted_value, endpoint)
+    if endpoint == "demandByFulfillmentDonut":
+        if extraction_type == "firm_order":
+            return f"Your total firm order revenue is {formatted_value}."
+        elif extraction_type == "total":
+            stack_data = graphql_data.get("stackDataList", [])
+            breakdown_items = []
+            for item in stack_data:
+                name = item.get("name", "")
+                qty = format_quantity(item.get("quantity", 0.0))
+                breakdown_items.append(f"{name}: {qty}")
+            breakdown = ", ".join(breakdown_items)
+            return f"Your total demand across all order types is {formatted_value}, which includes {breakdown}."
+        elif extraction_type == "overdue":
+            return f"You have {formatted_value} in overdue orders."
+        else:
+            return f"The {extraction_type} value is {formatted_value}."
+    else:
+        if extraction_type == "monthly_count":
+            return f"You have firm orders in {extracted_value} months."
+        elif extraction_type == "average":
+            return f"Your average monthly revenue is {formatted_value}."
+        else:
+            return f"The extracted value is {formatted_value}."
+
+
+def generate_response(
+    question: str,
+    endpoint: str,
+    extraction_type: str,
+    graphql_data: Union[Dict[str, Any], List[Dict[str, Any]], HistogramFrame],
+    extracted_value: Any,
+    conversation_history: str = "",
+    is_followup: bool = False,
+    visualization_decision: Dict[str, Any] = None,
+    date_range: Dict[str, Any] = None,
+    cache_key: Optional[tuple] = None,
+    messages: Optional[List[Dict[str, str]]] = None
+) -> str:
+    """
+    Use Groq LLM to generate natural language response. With a cache_key the
+    completion is stored in response_cache (template fallbacks are not).
+    messages, when given, are the prebuilt build_generation_messages() output.
+    """
+    if messages is None:
+        messages = build_generation_messages(
+            question, endpoint, extraction_type, graphql_data, extracted_value,
+            conversation_history, is_followup, visualization_decision, date_range
         )
+
+    try:
+        llm = get_llm_backend()
+        with tracer.span("response.llm", kind=SPAN_KIND_CLIENT, model=MODEL_NAME, backend=llm.name):
+            llm_response = llm.complete(
+                messages,
+                model=MODEL_NAME,
+                temperature=0.5,  # Increased for more natural, detailed responses
+                max_tokens=700,  # Set for ~500 words (approximately 1.4 tokens per word)
+                purpose="answer",
+            ).strip()
         
-        llm_response = response.choices[0].message.content.strip()
+        if cache_key is not None:
+            response_cache.set(cache_key, llm_response)
         return llm_response
         
     except Exception as e:
-        print(f"❌ Groq API error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("llm_error", e, fallback="template")
         # Fallback to simple template-based response
-        print("⚠️  Falling back to template response due to error")
+        return template_response(endpoint, extraction_type, graphql_data, extracted_value)
+
+
+def stream_response(
+    question: str,
+    endpoint: str,
+    extraction_type: str,
+    graphql_data: Union[Dict[str, Any], List[Dict[str, Any]], HistogramFrame],
+    extracted_value: Any,
+    conversation_history: str = "",
+    is_followup: bool = False,
+    visualization_decision: Dict[str, Any] = None,
+    date_range: Dict[str, Any] = None,
+    cache_key: Optional[tuple] = None,
+    messages: Optional[List[Dict[str, str]]] = None
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_response(): yields text chunks as Groq
+    produces them. Falls back to the template answer if the call fails
+    before any text was sent; a failure mid-stream ends the answer early.
+    Only a completed stream is stored under cache_key.
+    """
+    if messages is None:
+        messages = build_generation_messages(
+            question, endpoint, extraction_type, graphql_data, extracted_value,
+            conversation_history, is_followup, visualization_decision, date_range
+        )
+
+    parts = []
+    try:
+        # The span includes the time the consumer spends between chunks
+        llm = get_llm_backend()
+        with tracer.span("response.llm", kind=SPAN_KIND_CLIENT, model=MODEL_NAME, backend=llm.name, streaming=True) as span:
+            start = time.perf_counter()
+            for delta in llm.stream(messages, model=MODEL_NAME, temperature=0.5, max_tokens=700, purpose="answer"):
+                if not parts:
+                    span["first_chunk_ms"] = round((time.perf_counter() - start) * 1000, 2)
+                parts.append(delta)
+                yield delta
+            span["chunks"] = len(parts)
+        if cache_key is not None and parts:
+            response_cache.set(cache_key, "".join(parts).strip())
+    except Exception as e:
+        log.exception("llm_stream_error", e, chunks_sent=len(parts), fallback="template" if not parts else None)
+        if parts:
+            return
+        yield template_response(endpoint, extraction_type, graphql_data, extracted_value)
+
+
+def data_fingerprint(data: Any) -> str:
+    """Content hash of a JSON-serializable payload (key order independent)."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def response_cache_key(
+    question: str,
+    endpoint: str,
+    extraction_type: str,
+    date_range: Optional[Dict[str, Any]],
+    is_followup: bool,
+    conversation_history: str,
+    visualization_type: str,
+    data: Any,
+) -> tuple:
+    """
+    Answer cache key: model, normalized question, intent, date range,
+    follow-up flag (plus the history it is answered against), chosen chart
+    and the fingerprint of the exact data in the prompt.
+    """
+    date_key = (date_range.get("from"), date_range.get("until")) if date_range else None
+    history_key = data_fingerprint(conversation_history) if is_followup and conversation_history else None
+    return (
+        MODEL_NAME,
+        normalize_question(question),
+        endpoint,
+        extraction_type,
+        date_key,
+        bool(is_followup),
+        history_key,
+        visualization_type,
+        data_fingerprint(data),
+    )
+
+
+class RequestError(ValueError):
+    """Raised when a response-generation request is missing data or targets an unknown endpoint."""
+
+    def __init__(self, error: str, message: str):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+
+
+def prepare_response(body: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Everything before the answer completion: validates the request, extracts
+    the value, chooses the visualization and builds the prompt messages.
+
+    Returns (response body without "response", keyword arguments for
+    generate_response() / stream_response()).
+    """
+    question = body.get("question", "")
+    endpoint = body.get("endpoint", "")
+    extraction_type = body.get("extraction_type", "")
+    graphql_data = body.get("graphql_data", {})
+    conversation_history = tail_within_budget(body.get("conversation_history") or "", CONVERSATION_HISTORY_TOKEN_BUDGET)
+    is_followup = body.get("is_followup", False)
+    date_range = body.get("date_range")  # Extract date range from request
+    # Agentic: Alternative data for LLM to choose visualization
+    alternative_data = body.get("alternative_data")
+    alternative_endpoint = body.get("alternative_endpoint")
+    all_available_data = body.get("all_available_data", {})
+
+    if not question or not endpoint or not extraction_type or not graphql_data:
+        raise RequestError(
+            "Missing required fields",
+            "Please provide 'question', 'endpoint', 'extraction_type', and 'graphql_data'"
+        )
+
+    # Columnar histogram views, built once per payload and shared by
+    # extraction and the LLM context
+    histogram_frames = {}
+
+    def histogram_frame(data):
+        if id(data) not in histogram_frames:
+            histogram_frames[id(data)] = HistogramFrame.from_payload(data)
+        return histogram_frames[id(data)]
+
+    # Extract value based on endpoint and extraction type
+    with tracer.span("response.extract", endpoint=endpoint, extraction_type=extraction_type):
         if endpoint == "demandByFulfillmentDonut":
-            if extraction_type == "firm_order":
-                return f"Your total firm order revenue is {formatted_value}."
-            elif extraction_type == "total":
-                stack_data = graphql_data.get("stackDataList", [])
-                breakdown_items = []
-                for item in stack_data:
-                    name = item.get("name", "")
-                    qty = format_quantity(item.get("quantity", 0.0))
-                    breakdown_items.append(f"{name}: {qty}")
-                breakdown = ", ".join(breakdown_items)
-                return f"Your total demand across all order types is {formatted_value}, which includes {breakdown}."
-            elif extraction_type == "overdue":
-                return f"You have {formatted_value} in overdue orders."
-            else:
-                return f"The {extraction_type} value is {formatted_value}."
+            extracted_value = extract_value_from_donut(graphql_data, extraction_type)
+        elif endpoint == "demandByFulfillmentHistogram":
+            extracted_value = extract_value_from_histogram(histogram_frame(graphql_data), extraction_type)
         else:
-            if extraction_type == "monthly_count":
-                return f"You have firm orders in {extracted_value} months."
-            elif extraction_type == "average":
-                return f"Your average monthly revenue is {formatted_value}."
-            else:
-                return f"The extracted value is {formatted_value}."
+            raise RequestError("Unknown endpoint", f"Endpoint '{endpoint}' is not supported")
+
+    visualization_mode = body.get("visualization_mode") or VISUALIZATION_MODE
+    with tracer.span("response.visualization", mode=visualization_mode) as span:
+        if visualization_mode == "agentic":
+            # AGENTIC: Let LLM decide visualization type and data to use
+            visualization_decision = decide_visualization(
+                question,
+                endpoint,
+                graphql_data,
+                alternative_data,
+                alternative_endpoint,
+                all_available_data,
+                conversation_history
+            )
+        elif visualization_mode == "deterministic":
+            visualization_decision = choose_visualization(
+                question, endpoint, extraction_type, graphql_data, all_available_data or {}
+            )
+        else:
+            raise RequestError("Unknown visualization mode", f"visualization_mode must be 'deterministic' or 'agentic', got '{visualization_mode}'")
+        span["visualization_type"] = visualization_decision["visualization_type"]
+
+    # Use the chosen visualization
+    selected_data = visualization_decision["data"]
+    selected_endpoint = visualization_decision["endpoint"]
+    visualization_type = visualization_decision["visualization_type"]
+
+    # Re-extract value if data changed
+    if selected_endpoint != endpoint:
+        with tracer.span("response.extract", endpoint=selected_endpoint, extraction_type=extraction_type):
+            if selected_endpoint == "demandByFulfillmentDonut":
+                extracted_value = extract_value_from_donut(selected_data, extraction_type)
+            elif selected_endpoint == "demandByFulfillmentHistogram":
+                extracted_value = extract_value_from_histogram(histogram_frame(selected_data), extraction_type)
+
+    generation_args = {
+        "question": question,
+        "endpoint": selected_endpoint,
+        "extraction_type": extraction_type,
+        "graphql_data": histogram_frame(selected_data) if selected_endpoint == "demandByFulfillmentHistogram" else selected_data,
+        "extracted_value": extracted_value,
+        "conversation_history": conversation_history,
+        "is_followup": is_followup,
+        "visualization_decision": visualization_decision,
+        "date_range": date_range,
+        "cache_key": None,
+    }
+    with tracer.span("response.prompt"):
+        generation_args["messages"] = build_generation_messages(
+            **{name: value for name, value in generation_args.items() if name != "cache_key"}
+        )
+    if body.get("use_cache", True) and response_cache.enabled:
+        generation_args["cache_key"] = response_cache_key(
+            question, selected_endpoint, extraction_type, date_range, is_followup,
+            conversation_history, visualization_type, selected_data,
+        )
+
+    log.info("visualization", mode=visualization_mode, visualization_type=visualization_type, endpoint=selected_endpoint)
+
+    # Use the visualization decision
+    response_body = {
+        "question": question,
+        "endpoint": endpoint,
+        "extraction_type": extraction_type,
+        "visualization_type": visualization_type,
+        "chart_data": selected_data,  # Data for the chosen visualization
+        "agentic_decision": visualization_decision.get("reasoning", ""),  # Why this chart was chosen
+        "visualization_mode": visualization_mode,
+        "prompt_tokens": estimate_prompt_tokens(generation_args["messages"]),
+        "extracted_data": {
+            "quantity": extracted_value,
+            "formatted_value": format_extracted_value(extracted_value, selected_endpoint)
+        }
+    }
+    return response_body, generation_args
+
+
+def cached_answer(cache_key: Optional[tuple]) -> Optional[str]:
+    if cache_key is None:
+        return None
+    cached_text = response_cache.get(cache_key)
+    if cached_text is not None:
+        log.info("response_cache_hit")
+    return cached_text
+
+
+def build_response(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Core of the response generator: takes the parsed request body and returns
+    the response body as a Python dict (no JSON serialization).
+
+    Used directly by the orchestrator's in-process pipeline mode and wrapped
+    by lambda_handler for the remote Lambda invoke mode.
+    """
+    response_body, generation_args = prepare_response(body)
+    cached_text = cached_answer(generation_args["cache_key"])
+    if cached_text is not None:
+        response_text = cached_text
+    else:
+        response_text = generate_response(**generation_args)
+    log.debug("response", chars=len(response_text), cached=cached_text is not None)
+    return dict(response_body, response=response_text, response_cached=cached_text is not None,
+                response_cache_stats=response_cache.stats())
+
+
+def stream_build_response(body: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of build_response(). Yields (event, payload) pairs:
+    - ("chart", response body without "response"), before any LLM call
+    - ("token", {"text": chunk}) for every streamed chunk of the answer
+    - ("done", complete response body, same shape as build_response())
+    """
+    response_body, generation_args = prepare_response(body)
+    yield "chart", response_body
+
+    cached_text = cached_answer(generation_args["cache_key"])
+    chunks = [cached_text] if cached_text is not None else stream_response(**generation_args)
+    parts = []
+    for text in chunks:
+        parts.append(text)
+        yield "token", {"text": text}
+
+    response_text = "".join(parts).strip()
+    log.debug("response_streamed", chars=len(response_text), cached=cached_text is not None)
+    yield "done", dict(response_body, response=response_text, response_cached=cached_text is not None,
+                       response_cache_stats=response_cache.stats())
 
 
 def lambda_handler(event, context):
     """
     AWS Lambda handler function
     """
-    print(f"Received event: {json.dumps(event)}")
-    
+    with log.stage("response_generator") as stage:
+        response = _handle(event, stage)
+        stage["status_code"] = response["statusCode"]
+        return response
+
+
+def _handle(event, stage):
     try:
         # Parse request body
         if isinstance(event.get("body"), str):
             body = json.loads(event["body"])
         else:
             body = event.get("body", event)
+        bind_request(body.get("request_id"))
+        log.payload("event", event)
         
-        question = body.get("question", "")
-        endpoint = body.get("endpoint", "")
-        extraction_type = body.get("extraction_type", "")
-        graphql_data = body.get("graphql_data", {})
-        conversation_history = body.get("conversation_history", "")
-        is_followup = body.get("is_followup", False)
-        date_range = body.get("date_range")  # Extract date range from request
-        # Agentic: Alternative data for LLM to choose visualization
-        alternative_data = body.get("alternative_data")
-        alternative_endpoint = body.get("alternative_endpoint")
-        all_available_data = body.get("all_available_data", {})
-        
-        if not question or not endpoint or not extraction_type or not graphql_data:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({
-                    "error": "Missing required fields",
-                    "message": "Please provide 'question', 'endpoint', 'extraction_type', and 'graphql_data'"
-                })
-            }
-        
-        # Extract value based on endpoint and extraction type
-        if endpoint == "demandByFulfillmentDonut":
-            extracted_value = extract_value_from_donut(graphql_data, extraction_type)
-        elif endpoint == "demandByFulfillmentHistogram":
-            extracted_value = extract_value_from_histogram(graphql_data, extraction_type)
-        else:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({
-                    "error": "Unknown endpoint",
-                    "message": f"Endpoint '{endpoint}' is not supported"
-                })
-            }
-        
-        # AGENTIC: Let LLM decide visualization type and data to use
-        print("🤖 Agentic Decision: LLM choosing visualization...")
-        visualization_decision = decide_visualization(
-            question,
-            endpoint,
-            graphql_data,
-            alternative_data,
-            alternative_endpoint,
-            all_available_data,
-            conversation_history
+        # Continue the caller's trace when invoked by the orchestrator
+        trace = tracer.start_trace(**(body.get("trace") or {}))
+        try:
+            with tracer.span("response.handler"):
+                response_body = build_response(body)
+        finally:
+            finish_trace(trace)
+        if not trace.is_root:
+            response_body["trace_spans"] = trace.spans
+        stage.update(
+            endpoint=response_body["endpoint"],
+            visualization_type=response_body["visualization_type"],
+            prompt_tokens=response_body["prompt_tokens"],
+            cached=response_body["response_cached"],
         )
         
-        # Use LLM's decision
-        selected_data = visualization_decision["data"]
-        selected_endpoint = visualization_decision["endpoint"]
-        visualization_type = visualization_decision["visualization_type"]
-        
-        # Re-extract value if data changed
-        if selected_endpoint != endpoint:
-            if selected_endpoint == "demandByFulfillmentDonut":
-                extracted_value = extract_value_from_donut(selected_data, extraction_type)
-            elif selected_endpoint == "demandByFulfillmentHistogram":
-                extracted_value = extract_value_from_histogram(selected_data, extraction_type)
-        
-        # Generate natural language response with agentic context
-        response_text = generate_response(
-            question,
-            selected_endpoint,
-            extraction_type,
-            selected_data,
-            extracted_value,
-            conversation_history=conversation_history,
-            is_followup=is_followup,
-            visualization_decision=visualization_decision,
-            date_range=date_range
-        )
-        
-        # Format extracted quantity for response
-        if isinstance(extracted_value, (int, float)):
-            formatted_value = format_quantity(extracted_value) if selected_endpoint == "demandByFulfillmentDonut" else str(int(extracted_value))
-        elif isinstance(extracted_value, dict):
-            formatted_value = format_quantity(extracted_value.get("quantity", 0.0))
-        else:
-            formatted_value = str(extracted_value)
-        
-        print(f"Generated response: {response_text[:100]}...")
-        print(f"🤖 LLM chose visualization: {visualization_type} ({selected_endpoint})")
-        
-        # Use LLM's visualization decision
-        
         return {
             "statusCode": 200,
             "headers": {
                 "Content-Type": "application/json",
                 "Access-Control-Allow-Origin": "*"
             },
+            "body": json.dumps(response_body)
+        }
+        
+    except RequestError as e:
+        log.warning("bad_request", error=e.error, message=e.message)
+        return {
+            "statusCode": 400,
             "body": json.dumps({
-                "question": question,
-                "response": response_text,
-                "endpoint": endpoint,
-                "extraction_type": extraction_type,
-                "visualization_type": visualization_type,
-                "chart_data": selected_data,  # Use LLM-selected data
-                "agentic_decision": visualization_decision.get("reasoning", ""),  # Why LLM chose this
-                "extracted_data": {
-                "quantity": extracted_value,
-                    "formatted_value": formatted_value
-                }
+                "error": e.error,
+                "message": e.message
             })
         }
-        
     except Exception as e:
-        print(f"Error in lambda_handler: {str(e)}")
+        log.exception("handler_error", e)
         return {
             "statusCode": 500,
             "body": json.dumps({
@@ -644,4 +1051,3 @@ def lambda_handler(event, context):
                 "message": "Internal server error during response generation"
             })
         }
-
@@ -0,0 +1,25 @@
+"""
+Shared: thank-you / goodbye detection
+
+One pattern for messages that only acknowledge the answer ("thanks",
+"thanks for that", "got it, bye"), used by the intent classifier's local
+fast path and the orchestrator's follow-up detector, so an acknowledgment
+is never answered as a question. Matches normalized questions (see
+question_normalizer) as a whole: "thanks, and what about overdue?" is a
+question.
+"""
+
+import re
+
+CONVERSATIONAL_RE = re.compile(
+    r"^(ok(ay)? |great |perfect |awesome |cool |nice )?"
+    r"(thanks?( you)?|thank you( so much| very much)?|thx|ty|cheers|bye|goodbye|see you|"
+    r"got it|understood|perfect|great|awesome|cool|ok(ay)?|sounds good)"
+    r"( (for|that)( the| all| this| that| your)?( (information|info|help|data|answer|explanation))?)?"
+    r"( (thats|that is) all( i needed)?| that helps)?( bye| goodbye)?$"
+)
+
+
+def is_conversational(normalized_question: str) -> bool:
+    """True when the normalized question is only a thank-you, acknowledgment or goodbye."""
+    return bool(CONVERSATIONAL_RE.match(normalized_question))
@@ -0,0 +1,36 @@
+"""
+Shared: deferred imports for heavy optional-path modules
+
+lazy_module("numpy") returns a module object right away but only imports
+the module on the first attribute access, so a Lambda whose request never
+touches the module does not pay for it during a cold start. Modules that
+are already imported are returned as-is.
+
+The import itself goes through importlib.import_module, whose per-module
+lock makes concurrent first uses (threaded stream server) wait for one
+complete import. importlib.util.LazyLoader is not used: before Python 3.12
+a second thread can see its module half-executed.
+"""
+
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+
+
+class _DeferredModule(ModuleType):
+    """Stand-in that imports the real module on first attribute access and then mirrors it."""
+
+    def __getattr__(self, attr):
+        # Only reached for names not copied yet, i.e. before the import
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_module(name: str) -> ModuleType:
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    return _DeferredModule(name)
@@ -0,0 +1,302 @@
+"""
+Shared: pluggable LLM chat-completion backend
+
+Every LLM call in the pipeline (intent classification, agentic visualization
+choice, answer generation, streamed answers) goes through get_llm_backend(),
+selected with LLM_BACKEND:
+
+- groq (default): the Groq SDK, GROQ_API_KEY required
+- replay: completions stored on disk under LLM_RECORDINGS_DIR, one JSON file
+  per request keyed by a hash of model, messages, temperature and max_tokens.
+  LLM_REPLAY_MODE is "replay" (default; a missing recording is an error),
+  "record" (always call LLM_RECORD_BACKEND, default groq, and store the result)
+  or "auto" (replay, record on a miss)
+- fake: deterministic offline completions with simulated latency
+  (LLM_FAKE_FIRST_TOKEN_MS, LLM_FAKE_TOKEN_MS per token, LLM_FAKE_TOKENS per
+  answer) and a failure rate (LLM_FAKE_FAILURE_RATE, seeded by LLM_FAKE_SEED)
+
+Backends raise on failure like the Groq SDK does; callers keep their own
+fallbacks (keyword classification, template answers).
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+Messages = List[Dict[str, str]]
+
+
+class LLMBackendError(RuntimeError):
+    """A backend could not produce a completion (fake failure, missing recording)."""
+
+
+class LLMBackend:
+    """Chat completions for the pipeline; subclasses implement complete() and stream()."""
+
+    name = "base"
+
+    def complete(self, messages: Messages, model: str, temperature: float, max_tokens: int,
+                 purpose: str = "") -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: Messages, model: str, temperature: float, max_tokens: int,
+               purpose: str = "") -> Iterator[str]:
+        """Yield the completion in chunks (default: complete() as one chunk)."""
+        yield self.complete(messages, model, temperature, max_tokens, purpose)
+
+
+class GroqBackend(LLMBackend):
+    name = "groq"
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            api_key = self.api_key or os.environ.get("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("GROQ_API_KEY environment variable is not set")
+            from groq import Groq
+            self._client = Groq(api_key=api_key)
+        return self._client
+
+    def complete(self, messages, model, temperature, max_tokens, purpose=""):
+        response = self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+    def stream(self, messages, model, temperature, max_tokens, purpose=""):
+        stream = self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens, stream=True
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+def request_key(messages: Messages, model: str, temperature: float, max_tokens: int) -> str:
+    """Recording key: hash of everything that determines the completion."""
+    encoded = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True, separators=(",", ":"),
+    ).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RecordReplayBackend(LLMBackend):
+    """
+    Completions replayed from (and recorded to) one JSON file per request in
+    directory. Streamed recordings keep their chunks, so a replayed stream
+    has the same chunking; complete() and stream() share recordings.
+    """
+
+    name = "replay"
+    MODES = ("replay", "record", "auto")
+
+    def __init__(self, directory: str, mode: str = "replay", inner: Optional[LLMBackend] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"LLM replay mode must be one of {self.MODES}, got {mode!r}")
+        if mode != "replay" and inner is None:
+            raise ValueError(f"LLM replay mode {mode!r} needs a backend to record from")
+        self.directory = directory
+        self.mode = mode
+        self.inner = inner
+        self.hits = 0
+        self.recorded = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.mode == "record":
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as handle:
+                recording = json.load(handle)
+        except FileNotFoundError:
+            if self.mode == "replay":
+                raise LLMBackendError(f"no LLM recording {key} in {self.directory}")
+            return None
+        self.hits += 1
+        return recording
+
+    def save(self, key: str, messages: Messages, model: str, temperature: float, max_tokens: int,
+             purpose: str, content: str, chunks: Optional[List[str]] = None) -> None:
+        recording = {
+            "request": {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+            "purpose": purpose,
+            "content": content,
+        }
+        if chunks is not None:
+            recording["chunks"] = chunks
+        os.makedirs(self.directory, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(recording, handle, indent=1)
+        os.replace(tmp_path, self._path(key))
+        self.recorded += 1
+
+    def complete(self, messages, model, temperature, max_tokens, purpose=""):
+        key = request_key(messages, model, temperature, max_tokens)
+        recording = self.load(key)
+        if recording is not None:
+            return recording["content"]
+        content = self.inner.complete(messages, model, temperature, max_tokens, purpose)
+        self.save(key, messages, model, temperature, max_tokens, purpose, content)
+        return content
+
+    def stream(self, messages, model, temperature, max_tokens, purpose=""):
+        key = request_key(messages, model, temperature, max_tokens)
+        recording = self.load(key)
+        if recording is not None:
+            yield from recording.get("chunks") or [recording["content"]]
+            return
+        chunks = []
+        for chunk in self.inner.stream(messages, model, temperature, max_tokens, purpose):
+            chunks.append(chunk)
+            yield chunk
+        # Only a completed stream is recorded
+        self.save(key, messages, model, temperature, max_tokens, purpose, "".join(chunks), chunks)
+
+
+_QUESTION_LINE_RE = re.compile(r"^User Question: (.*)$", re.MULTILINE)
+_TIME_WORDS = ("month", "week", "average", "trend", "over time")
+_FILLER = (
+    "Based on the simulation data, demand is driven mainly by firm orders with a "
+    "smaller share of overdue and forecasted quantities across the period shown."
+).split()
+
+
+def _question(messages: Messages) -> str:
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    match = _QUESTION_LINE_RE.search(user)
+    return match.group(1) if match else user
+
+
+def fake_completion(messages: Messages, purpose: str, tokens: int) -> str:
+    """
+    Deterministic stand-in output per call site: intent and visualization
+    JSON chosen from time-related keywords in the question, otherwise
+    `tokens` words of answer text.
+    """
+    question = _question(messages).lower()
+    over_time = any(word in question for word in _TIME_WORDS)
+    if purpose == "intent":
+        endpoint = "demandByFulfillmentHistogram" if over_time else "demandByFulfillmentDonut"
+        extraction = "monthly_count" if over_time else "total"
+        return json.dumps({"endpoint": endpoint, "extraction_type": extraction,
+                           "date_range": {"from": None, "until": None}, "confidence": 0.9})
+    if purpose == "visualization":
+        return json.dumps({
+            "visualization_type": "stacked-bar" if over_time else "donut",
+            "endpoint": "demandByFulfillmentHistogram" if over_time else "demandByFulfillmentDonut",
+            "reasoning": "fake backend",
+        })
+    offset = int(hashlib.blake2b(question.encode("utf-8"), digest_size=2).hexdigest(), 16)
+    return " ".join(_FILLER[(offset + i) % len(_FILLER)] for i in range(max(tokens, 1)))
+
+
+class FakeBackend(LLMBackend):
+    """
+    Offline backend with configurable latency: first_token_ms before the
+    first token, token_ms per token after it (both streamed and not).
+    failure_rate of calls raise LLMBackendError before any output.
+    """
+
+    name = "fake"
+
+    def __init__(self, first_token_ms: float = 0.0, token_ms: float = 0.0, tokens: int = 120,
+                 failure_rate: float = 0.0, seed: int = 0,
+                 responder: Callable[[Messages, str, int], str] = fake_completion,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.failure_rate = failure_rate
+        self.responder = responder
+        self.sleep = sleep
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def _start(self, messages: Messages, max_tokens: int, purpose: str) -> List[str]:
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.first_token_ms:
+            self.sleep(self.first_token_ms / 1000)
+        if failed:
+            raise LLMBackendError("simulated LLM failure")
+        text = self.responder(messages, purpose, min(self.tokens, max_tokens))
+        # Whitespace-delimited tokens, each keeping its leading space
+        return re.findall(r"\s*\S+", text) or [text]
+
+    def complete(self, messages, model, temperature, max_tokens, purpose=""):
+        tokens = self._start(messages, max_tokens, purpose)
+        if self.token_ms:
+            self.sleep(self.token_ms * (len(tokens) - 1) / 1000)
+        return "".join(tokens)
+
+    def stream(self, messages, model, temperature, max_tokens, purpose=""):
+        tokens = self._start(messages, max_tokens, purpose)
+        for i, token in enumerate(tokens):
+            if i and self.token_ms:
+                self.sleep(self.token_ms / 1000)
+            yield token
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """Backend named by name (default LLM_BACKEND), configured from the environment."""
+    name = (name or os.environ.get("LLM_BACKEND", "groq")).lower()
+    if name == "groq":
+        return GroqBackend()
+    if name == "fake":
+        return FakeBackend(
+            first_token_ms=float(os.environ.get("LLM_FAKE_FIRST_TOKEN_MS", "0")),
+            token_ms=float(os.environ.get("LLM_FAKE_TOKEN_MS", "0")),
+            tokens=int(os.environ.get("LLM_FAKE_TOKENS", "120")),
+            failure_rate=float(os.environ.get("LLM_FAKE_FAILURE_RATE", "0")),
+            seed=int(os.environ.get("LLM_FAKE_SEED", "0")),
+        )
+    if name == "replay":
+        mode = os.environ.get("LLM_REPLAY_MODE", "replay").lower()
+        return RecordReplayBackend(
+            os.environ.get("LLM_RECORDINGS_DIR", "llm_recordings"),
+            mode=mode,
+            inner=create_backend(os.environ.get("LLM_RECORD_BACKEND", "groq")) if mode != "replay" else None,
+        )
+    raise ValueError(f"Unknown LLM_BACKEND {name!r} (expected groq, replay or fake)")
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> LLMBackend:
+    """Process-wide backend, created from the environment on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_llm_backend(backend: Optional[LLMBackend]) -> None:
+    """Replace the process-wide backend (None: recreate from the environment on next use)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
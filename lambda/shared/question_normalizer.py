@@ -0,0 +1,37 @@
+"""
+Shared: question normalization for cache keys
+
+Folds case, punctuation and whitespace, and rewrites date phrases into one
+canonical spelling, so that "What's my total demand?" and "what's my TOTAL
+demand" share a cache entry and "Dec 25" / "december 2025" do too.
+"""
+
+import re
+import unicodedata
+
+MONTH_ALIASES = {
+    "jan": "january", "feb": "february", "mar": "march", "apr": "april",
+    "jun": "june", "jul": "july", "aug": "august", "sep": "september",
+    "sept": "september", "oct": "october", "nov": "november", "dec": "december",
+}
+
+MONTH_NAMES = (
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december",
+)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+# "december 25" / "december '25" → "december 2025" (two-digit years, matching the classifier prompt rules);
+# left alone when a four-digit year follows, since "december 25, 2025" is a day
+_SHORT_YEAR_RE = re.compile(r"\b(" + "|".join(MONTH_NAMES) + r") (\d{2})\b(?! \d{4}\b)")
+
+
+def normalize_question(question: str) -> str:
+    """Return the canonical form of a question used as a cache key."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = text.replace("’", "'").replace("'", "")
+    text = _PUNCTUATION_RE.sub(" ", text)
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    text = " ".join(MONTH_ALIASES.get(word, word) for word in text.split(" "))
+    return _SHORT_YEAR_RE.sub(lambda m: f"{m.group(1)} 20{m.group(2)}", text)
@@ -0,0 +1,97 @@
+"""
+Shared: single-flight call coalescing
+
+Concurrent callers asking for the same key share one execution of the
+underlying function: the first caller (the leader) runs it, the others wait
+for its result (or exception). Counters report how many calls were coalesced.
+
+do() covers plain functions. Callers whose work cannot run inside a function
+call (a generator relaying events as it runs) use join() / wait() / finish()
+directly.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class AbandonedCall(Exception):
+    """Raised to waiters when the leader gave up without a result; they may retry the call."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key among concurrent callers.
+        Returns (result, shared) where shared is True for callers that
+        received another caller's result.
+        """
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(call), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+
+    def join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """
+        Join the in-flight call for key, or start one. Returns (call, leader);
+        a leader must finish() the call, the others wait() for it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.executions += 1
+            return call, True
+
+    def wait(self, call: _Call) -> Any:
+        """The leader's result for a joined call (or its exception, raised)."""
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def finish(self, key: Hashable, call: _Call, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publish the leader's result or error to the waiters and retire the call."""
+        call.result = result
+        call.error = error
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+        }
@@ -0,0 +1,155 @@
+"""
+Shared: level-gated structured logging
+
+One JSON object per line on stdout (CloudWatch picks each line up as an
+event), tagged with the service name and the current request id.
+
+- LOG_LEVEL (DEBUG / INFO / WARNING / ERROR, default INFO) gates every call
+  before any formatting: a disabled call serializes nothing, and field
+  values passed as zero-argument callables are only evaluated when the line
+  is actually written
+- stage() emits exactly one line per pipeline stage with its status and
+  elapsed time, plus any fields the stage adds while it runs
+- payload() dumps full request/response bodies at DEBUG, only for a sampled
+  fraction of requests (LOG_PAYLOAD_SAMPLE_RATE) and truncated to
+  LOG_PAYLOAD_MAX_CHARS
+- the request id lives in a context variable; the orchestrator binds it once
+  per question and passes it to every stage in the payload ("request_id"),
+  where bind_request() picks it up again
+"""
+
+import contextvars
+import json
+import os
+import random
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+LOG_LEVEL = LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), INFO)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.05"))
+LOG_PAYLOAD_MAX_CHARS = int(os.environ.get("LOG_PAYLOAD_MAX_CHARS", "2000"))
+
+_request_id: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+_payload_sampled: contextvars.ContextVar = contextvars.ContextVar("payload_sampled", default=False)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def bind_request(request_id: Optional[str] = None) -> str:
+    """
+    Make request_id (a new one if not given) the current request id and
+    decide whether this request's payloads are sampled. Returns the id.
+    """
+    request_id = request_id or new_request_id()
+    _request_id.set(request_id)
+    _payload_sampled.set(random.random() < LOG_PAYLOAD_SAMPLE_RATE)
+    return request_id
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def _resolve(value: Any) -> Any:
+    return value() if callable(value) else value
+
+
+class StructuredLogger:
+    """JSON-lines logger for one service (Lambda package)."""
+
+    def __init__(self, service: str, level: Optional[int] = None, write: Callable[[str], Any] = print):
+        self.service = service
+        self.level = LOG_LEVEL if level is None else level
+        self.write = write
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, event: str, **fields: Any) -> None:
+        if level < self.level:
+            return
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": LEVEL_NAMES.get(level, str(level)),
+            "service": self.service,
+            "event": event,
+            "request_id": _request_id.get(),
+        }
+        for name, value in fields.items():
+            record[name] = _resolve(value)
+        self.write(json.dumps(record, default=str))
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log(DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log(INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log(WARNING, event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log(ERROR, event, **fields)
+
+    def exception(self, event: str, error: BaseException, **fields: Any) -> None:
+        """ERROR line with the exception; the traceback is added at DEBUG."""
+        if not self.enabled(ERROR):
+            return
+        if self.enabled(DEBUG):
+            fields["traceback"] = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        self.log(ERROR, event, error=type(error).__name__, message=str(error), **fields)
+
+    def payload(self, event: str, payload: Any) -> None:
+        """Full payload dump at DEBUG, for sampled requests only, truncated (strings are logged as-is)."""
+        if not self.enabled(DEBUG) or not _payload_sampled.get():
+            return
+        payload = _resolve(payload)
+        text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+        self.log(
+            DEBUG, event,
+            payload=text[:LOG_PAYLOAD_MAX_CHARS],
+            payload_chars=len(text),
+            truncated=len(text) > LOG_PAYLOAD_MAX_CHARS,
+        )
+
+    @contextmanager
+    def stage(self, name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Emit one INFO line when the block exits:
+        {"event": "stage", "stage": name, "status": "ok" | "error", "elapsed_ms", ...}.
+        The yielded dict collects extra fields for that line.
+        """
+        record = dict(fields)
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            status = "error"
+            record.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.log(
+                INFO, "stage", stage=name, status=status,
+                elapsed_ms=round((time.perf_counter() - start) * 1000, 2), **record
+            )
+
+
+_loggers: Dict[str, StructuredLogger] = {}
+
+
+def get_logger(service: str) -> StructuredLogger:
+    """Module-scoped logger per service, created on first use."""
+    if service not in _loggers:
+        _loggers[service] = StructuredLogger(service)
+    return _loggers[service]
@@ -0,0 +1,38 @@
+"""
+Shared: approximate LLM token counts
+
+Used for prompt budgets (histogram context, conversation history). No
+tokenizer is bundled with the Lambdas, so counts are estimated at ~4
+characters per token for English text and numbers.
+"""
+
+from typing import Dict, List
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text."""
+    return (len(text) + 3) // 4
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Approximate prompt size of a chat request (content plus ~4 tokens per message)."""
+    return sum(estimate_tokens(message["content"]) + 4 for message in messages)
+
+
+def tail_within_budget(text: str, budget: int) -> str:
+    """
+    The last whole lines of text that fit in budget estimated tokens (the
+    most recent part of a transcript). Text that already fits is returned
+    unchanged.
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
@@ -0,0 +1,269 @@
+"""
+Shared: span-based latency tracing
+
+A trace is one question through the pipeline; spans time the parts of it
+(intent LLM, GraphQL HTTP, value extraction, response LLM, ...), each tagged
+with the service (Lambda package) that recorded it. The current
+trace and span live in context variables, so nested span() blocks record
+their parent automatically and threads started with
+contextvars.copy_context() report into the same trace.
+
+Across Lambda invokes the caller sends trace_context() in the payload
+("trace": {"trace_id", "parent_span_id"}); the callee continues the trace with
+start_trace(**context) and returns its spans ("trace_spans") for the caller to
+merge with add_spans().
+
+Finished root traces are appended to TRACE_EXPORT_PATH (when set) as one
+OTLP/JSON ExportTraceServiceRequest per line, the format of the OpenTelemetry
+collector's file exporter.
+"""
+
+import contextvars
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+
+# OTLP span kinds / status codes
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+_TRACE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_span_id: contextvars.ContextVar = contextvars.ContextVar("span_id", default=None)
+_export_lock = threading.Lock()
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+class Trace:
+    """Spans recorded for one trace id in this process (thread-safe)."""
+
+    def __init__(self, service: str, trace_id: Optional[str] = None, parent_span_id: Optional[str] = None):
+        self.service = service
+        self.trace_id = trace_id if trace_id and _TRACE_ID_RE.match(trace_id) else new_trace_id()
+        self.parent_span_id = parent_span_id
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._tokens = None
+
+    @property
+    def is_root(self) -> bool:
+        return self.parent_span_id is None
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def add_spans(self, spans: List[Dict[str, Any]]) -> None:
+        """Merge spans returned by a downstream stage of the same trace."""
+        with self._lock:
+            self.spans.extend(span for span in spans or [] if span.get("trace_id") == self.trace_id)
+
+    def timings(self) -> Dict[str, Any]:
+        """
+        Span durations for the response: the total covered time, the duration
+        of each stage, and every span in start order with its offset from the
+        first span.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ns"])
+        if not spans:
+            return {"trace_id": self.trace_id, "total_ms": 0.0, "stages": {}, "spans": []}
+        origin = spans[0]["start_ns"]
+        # Stages: direct children of the top-level span(s)
+        top = {span["span_id"] for span in spans if span["parent_span_id"] == self.parent_span_id}
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((max(span["end_ns"] for span in spans) - origin) / 1e6, 2),
+            "stages": {
+                span["name"]: round((span["end_ns"] - span["start_ns"]) / 1e6, 2)
+                for span in spans if span["parent_span_id"] in top
+            },
+            "spans": [
+                {
+                    "name": span["name"],
+                    "service": span["service"],
+                    "span_id": span["span_id"],
+                    "parent_span_id": span["parent_span_id"],
+                    "start_ms": round((span["start_ns"] - origin) / 1e6, 2),
+                    "duration_ms": round((span["end_ns"] - span["start_ns"]) / 1e6, 2),
+                    "status": "error" if span["status"] == STATUS_ERROR else "ok",
+                    "attributes": span["attributes"],
+                }
+                for span in spans
+            ],
+        }
+
+
+def start_trace(service: str, trace_id: Optional[str] = None, parent_span_id: Optional[str] = None) -> Trace:
+    """Make a new trace (or the continuation of a caller's trace) current."""
+    trace = Trace(service, trace_id, parent_span_id)
+    trace._tokens = (_trace.set(trace), _span_id.set(parent_span_id))
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def trace_context() -> Optional[Dict[str, str]]:
+    """{"trace_id", "parent_span_id"} for a downstream payload, or None outside a trace."""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return {"trace_id": trace.trace_id, "parent_span_id": _span_id.get()}
+
+
+@contextmanager
+def span(name: str, service: str = "", kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the block as a child of the current span. The yielded dict takes
+    extra attributes. Outside a trace nothing is recorded.
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield attributes
+        return
+
+    span_id = new_span_id()
+    parent_span_id = _span_id.get()
+    token = _span_id.set(span_id)
+    status, message = STATUS_OK, None
+    start_ns = time.time_ns()
+    try:
+        yield attributes
+    except BaseException as e:
+        status, message = STATUS_ERROR, f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        end_ns = time.time_ns()
+        try:
+            _span_id.reset(token)
+        except ValueError:
+            # Generator spans closed from another context
+            _span_id.set(parent_span_id)
+        trace.add({
+            "trace_id": trace.trace_id,
+            "span_id": span_id,
+            "parent_span_id": parent_span_id,
+            "name": name,
+            "service": service or trace.service,
+            "kind": kind,
+            "start_ns": start_ns,
+            "end_ns": end_ns,
+            "status": status,
+            "status_message": message,
+            "attributes": {key: value for key, value in attributes.items() if value is not None},
+        })
+
+
+class Tracer:
+    """Span factory for one service (Lambda package)."""
+
+    def __init__(self, service: str):
+        self.service = service
+
+    def start_trace(self, trace_id: Optional[str] = None, parent_span_id: Optional[str] = None) -> Trace:
+        return start_trace(self.service, trace_id, parent_span_id)
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+        return span(name, self.service, kind, **attributes)
+
+
+_tracers: Dict[str, Tracer] = {}
+
+
+def get_tracer(service: str) -> Tracer:
+    """Module-scoped tracer per service, created on first use."""
+    if service not in _tracers:
+        _tracers[service] = Tracer(service)
+    return _tracers[service]
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+
+
+def to_otlp(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest with one resource per service."""
+    by_service: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        by_service.setdefault(span["service"], []).append(span)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "factorytwin.tracing"},
+                    "spans": [
+                        {
+                            "traceId": span["trace_id"],
+                            "spanId": span["span_id"],
+                            **({"parentSpanId": span["parent_span_id"]} if span["parent_span_id"] else {}),
+                            "name": span["name"],
+                            "kind": span["kind"],
+                            "startTimeUnixNano": str(span["start_ns"]),
+                            "endTimeUnixNano": str(span["end_ns"]),
+                            "attributes": [
+                                {"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items()
+                            ],
+                            "status": {"code": span["status"], **({"message": span["status_message"]} if span["status_message"] else {})},
+                        }
+                        for span in service_spans
+                    ],
+                }],
+            }
+            for service, service_spans in by_service.items()
+        ]
+    }
+
+
+def export_trace(trace: Trace, path: Optional[str] = None) -> bool:
+    """Append the trace as one OTLP/JSON line to path (default TRACE_EXPORT_PATH)."""
+    path = path or TRACE_EXPORT_PATH
+    if not path or not trace.spans:
+        return False
+    line = json.dumps(to_otlp(list(trace.spans)))
+    with _export_lock, open(path, "a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+    return True
+
+
+def finish_trace(trace: Trace) -> None:
+    """
+    Export a root trace (continuations are returned to the caller instead)
+    and stop recording into it: the trace that was current before
+    start_trace() is current again (none in a fresh Lambda invocation).
+    """
+    if _trace.get() is trace and trace._tokens is not None:
+        trace_token, span_token = trace._tokens
+        try:
+            _span_id.reset(span_token)
+            _trace.reset(trace_token)
+        except ValueError:
+            # Finished from another context than the one that started it
+            _trace.set(None)
+            _span_id.set(None)
+        trace._tokens = None
+    if trace.is_root:
+        export_trace(trace)
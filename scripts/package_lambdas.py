@@ -0,0 +1,169 @@
+"""
+Build deployable zips for the Lambda functions.
+
+Each handler imports its sibling helper modules and the lambda/shared
+helpers (ttl_cache, structured_log, tracing, llm_backend, ...) from its own
+directory, so a function zip holds:
+- every module of lambda/<function>/ (test_*.py excluded)
+- the lambda/shared modules, flat next to lambda_function.py, unless --layer
+  builds them as a separate Lambda layer (python/<module>.py)
+- config/knowledge-graph.json for the intent classifier's local fast path
+- with --install, the function's requirements.txt installed for the Lambda
+  runtime (manylinux wheels for --python-version)
+- with --inprocess, the orchestrator also bundles the three stage packages
+  for PIPELINE_MODE=inprocess (set LAMBDA_ROOT=/var/task on the function)
+
+After building, each zip is extracted and its lambda_function imported in a
+fresh interpreter that cannot see the repository, so a missing helper fails
+the build instead of the first cold start.
+
+Usage:
+    python scripts/package_lambdas.py                      # every function -> dist/<function>.zip
+    python scripts/package_lambdas.py intent-classifier --install
+    python scripts/package_lambdas.py --layer              # plus dist/factorytwin-shared-layer.zip
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+LAMBDA_ROOT = os.path.join(REPO_ROOT, "lambda")
+SHARED_DIR = os.path.join(LAMBDA_ROOT, "shared")
+
+FUNCTIONS = ["orchestrator", "intent-classifier", "graphql-client", "response-generator", "mock-graphql"]
+STAGE_PACKAGES = ["intent-classifier", "graphql-client", "response-generator"]
+LAYER_NAME = "factorytwin-shared-layer"
+
+# Files outside the package directory that a function reads at runtime: source -> name in the zip
+EXTRA_FILES = {
+    "intent-classifier": {os.path.join(REPO_ROOT, "config", "knowledge-graph.json"): "knowledge-graph.json"},
+}
+
+
+def package_modules(directory):
+    """The deployable .py files of a package directory."""
+    return sorted(
+        path for path in glob.glob(os.path.join(directory, "*.py"))
+        if not os.path.basename(path).startswith("test_")
+    )
+
+
+def stage_package(function, target):
+    """Copy a function's modules and extra files into target."""
+    os.makedirs(target, exist_ok=True)
+    for path in package_modules(os.path.join(LAMBDA_ROOT, function)):
+        shutil.copy2(path, target)
+    for source, name in EXTRA_FILES.get(function, {}).items():
+        shutil.copy2(source, os.path.join(target, name))
+
+
+def install_requirements(function, target, python_version):
+    requirements = os.path.join(LAMBDA_ROOT, function, "requirements.txt")
+    if not os.path.exists(requirements):
+        return
+    subprocess.run([
+        sys.executable, "-m", "pip", "install", "--quiet", "-r", requirements, "--target", target,
+        "--platform", "manylinux2014_x86_64", "--implementation", "cp",
+        "--python-version", python_version, "--only-binary=:all:",
+    ], check=True)
+
+
+def write_zip(source_dir, zip_path):
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if name.endswith(".pyc"):
+                    continue
+                path = os.path.join(root, name)
+                archive.write(path, os.path.relpath(path, source_dir))
+
+
+def check_import(function, zip_path, layer_zip=None, inprocess=False):
+    """Import lambda_function from the extracted zip (and layer) in an isolated interpreter."""
+    with tempfile.TemporaryDirectory() as scratch:
+        task_root = os.path.join(scratch, "task")
+        with zipfile.ZipFile(zip_path) as archive:
+            archive.extractall(task_root)
+        path = [task_root]
+        if layer_zip:
+            with zipfile.ZipFile(layer_zip) as archive:
+                archive.extractall(os.path.join(scratch, "opt"))
+            path.append(os.path.join(scratch, "opt", "python"))
+        code = "import sys; sys.path[:0] = %r; import lambda_function" % path
+        if inprocess:
+            code += "; import stage_executors; stage_executors.InProcessStageExecutor()"
+        env = dict(os.environ, LAMBDA_ROOT=task_root, PIPELINE_MODE="inprocess" if inprocess else "remote")
+        env.pop("PYTHONPATH", None)
+        result = subprocess.run([sys.executable, "-I", "-c", code], cwd=task_root, env=env,
+                                capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"{function}: the packaged handler does not import:\n{result.stderr.strip()}")
+
+
+def build_layer(dist):
+    with tempfile.TemporaryDirectory() as staging:
+        target = os.path.join(staging, "python")
+        os.makedirs(target)
+        for path in package_modules(SHARED_DIR):
+            shutil.copy2(path, target)
+        zip_path = os.path.join(dist, f"{LAYER_NAME}.zip")
+        write_zip(staging, zip_path)
+    return zip_path
+
+
+def build_function(function, dist, args, layer_zip=None):
+    inprocess = args.inprocess and function == "orchestrator"
+    with tempfile.TemporaryDirectory() as staging:
+        stage_package(function, staging)
+        if inprocess:
+            for stage in STAGE_PACKAGES:
+                stage_package(stage, os.path.join(staging, stage))
+        if not layer_zip:
+            for path in package_modules(SHARED_DIR):
+                shutil.copy2(path, staging)
+        if args.install:
+            install_requirements(function, staging, args.python_version)
+            if inprocess:
+                for stage in STAGE_PACKAGES:
+                    install_requirements(stage, staging, args.python_version)
+        zip_path = os.path.join(dist, f"{function}.zip")
+        write_zip(staging, zip_path)
+    if args.check:
+        check_import(function, zip_path, layer_zip, inprocess)
+    return zip_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("functions", nargs="*", help=f"any of {', '.join(FUNCTIONS)} (default: all)")
+    parser.add_argument("--dist", default=os.path.join(REPO_ROOT, "dist"), help="output directory")
+    parser.add_argument("--layer", action="store_true", help="put lambda/shared in a layer instead of each zip")
+    parser.add_argument("--install", action="store_true", help="install requirements.txt into each zip")
+    parser.add_argument("--python-version", default="3.11", help="Lambda runtime the wheels are for")
+    parser.add_argument("--inprocess", action="store_true",
+                        help="bundle the stage packages into the orchestrator for PIPELINE_MODE=inprocess")
+    parser.add_argument("--no-check", dest="check", action="store_false", help="skip the import check")
+    args = parser.parse_args()
+    unknown = sorted(set(args.functions) - set(FUNCTIONS))
+    if unknown:
+        parser.error(f"unknown functions: {', '.join(unknown)}")
+
+    os.makedirs(args.dist, exist_ok=True)
+    layer_zip = build_layer(args.dist) if args.layer else None
+    if layer_zip:
+        print(f"{os.path.relpath(layer_zip, REPO_ROOT)}: {os.path.getsize(layer_zip) / 1024:.0f} KiB")
+    for function in args.functions or FUNCTIONS:
+        zip_path = build_function(function, args.dist, args, layer_zip)
+        print(f"{os.path.relpath(zip_path, REPO_ROOT)}: {os.path.getsize(zip_path) / 1024:.0f} KiB"
+              + (", imports cleanly" if args.check else ""))
+
+
+if __name__ == "__main__":
+    main()